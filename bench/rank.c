@@ -0,0 +1,229 @@
+/**
+ * Times the ways of ranking the slots of the few edge and face cubies a
+ * heuristic table tracks, which is done for every lookup of an edge, face or
+ * pieces table (see `rank_edges()` in heuristics.c):
+ *
+ *   * rewrite - The old way: lower every later slot that's larger than each
+ *     one, then take the slots as digits.
+ *   * popcount - Keep a mask of the slots taken, and count the ones lower
+ *     with `__builtin_popcount()`.
+ *   * table - The same, counting with a table of the popcount of every byte.
+ *   * compare - Count the lower slots before each one with comparisons,
+ *     which is what `rank_edges()` does.
+ *
+ * Every way is run on the same random states, and must give the same ranks.
+ * Build and run with `make bench`.
+ */
+
+#define _POSIX_C_SOURCE 200809L
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#define N_STATES (1 << 20)
+#define N_ROUNDS 20
+#define MAX_CUBIES 5
+
+typedef uint64_t (*RankFunc)(const uint8_t* positions, const uint8_t* orients,
+                             int n);
+// Sums the ranks of every state, each of a fixed number of cubies, so the
+// ranker is inlined and its loops unrolled the way `rank_edges()` is.
+typedef uint64_t (*RankAllFunc)(const uint8_t* positions,
+                                const uint8_t* orients);
+
+static uint8_t popcount_table[256];
+
+static uint64_t rank_rewrite(const uint8_t* positions, const uint8_t* orients,
+                             int n) {
+    // The old code rewrote the positions in place, this rewrites a copy
+    uint8_t p[18];
+    memcpy(p, positions, n);
+    uint64_t result = 0;
+    uint64_t max = 1;
+    for(int i=0; i<n; i++) {
+        result += max*p[i];
+        max *= 18-i;
+        for(int j=i+1; j<n; j++) {
+            if(p[j] > p[i]) {
+                p[j]--;
+            }
+        }
+    }
+    for(int i=0; i<n; i++) {
+        result += max*orients[i];
+        max *= 4;
+    }
+    return result;
+}
+
+static uint64_t rank_popcount(const uint8_t* positions,
+                              const uint8_t* orients, int n) {
+    uint64_t result = 0;
+    uint64_t max = 1;
+    uint64_t packed_orients = 0;
+    uint32_t taken = 0;
+    for(int i=0; i<n; i++) {
+        int lower = __builtin_popcount(taken & ((1u << positions[i]) - 1));
+        taken |= 1u << positions[i];
+        result += max*(positions[i] - lower);
+        max *= 18-i;
+        packed_orients |= (uint64_t) orients[i] << 2*i;
+    }
+    return result + max*packed_orients;
+}
+
+static uint64_t rank_table(const uint8_t* positions, const uint8_t* orients,
+                           int n) {
+    uint64_t result = 0;
+    uint64_t max = 1;
+    uint64_t packed_orients = 0;
+    uint32_t taken = 0;
+    for(int i=0; i<n; i++) {
+        uint32_t below = taken & ((1u << positions[i]) - 1);
+        int lower = popcount_table[below & 0xFF] +
+                    popcount_table[(below >> 8) & 0xFF] +
+                    popcount_table[below >> 16];
+        taken |= 1u << positions[i];
+        result += max*(positions[i] - lower);
+        max *= 18-i;
+        packed_orients |= (uint64_t) orients[i] << 2*i;
+    }
+    return result + max*packed_orients;
+}
+
+static uint64_t rank_compare(const uint8_t* positions, const uint8_t* orients,
+                             int n) {
+    uint64_t result = 0;
+    uint64_t max = 1;
+    uint64_t packed_orients = 0;
+    for(int i=0; i<n; i++) {
+        int lower = 0;
+        for(int j=0; j<i; j++) {
+            lower += positions[j] < positions[i];
+        }
+        result += max*(positions[i] - lower);
+        max *= 18-i;
+        packed_orients |= (uint64_t) orients[i] << 2*i;
+    }
+    return result + max*packed_orients;
+}
+
+#define DEFINE_RANK_ALL(name, n) \
+    static uint64_t rank_all_##name##_##n(const uint8_t* positions, \
+                                          const uint8_t* orients) { \
+        uint64_t sum = 0; \
+        for(int s=0; s<N_STATES; s++) { \
+            sum += rank_##name(&positions[s*n], &orients[s*n], n); \
+        } \
+        return sum; \
+    }
+DEFINE_RANK_ALL(rewrite, 4)
+DEFINE_RANK_ALL(rewrite, 5)
+DEFINE_RANK_ALL(popcount, 4)
+DEFINE_RANK_ALL(popcount, 5)
+DEFINE_RANK_ALL(table, 4)
+DEFINE_RANK_ALL(table, 5)
+DEFINE_RANK_ALL(compare, 4)
+DEFINE_RANK_ALL(compare, 5)
+
+static const struct {
+    const char* name;
+    RankFunc func;
+    RankAllFunc rank_all[MAX_CUBIES-3];  // Indexed by the cubies minus 4
+} rankers[] = {
+    {"rewrite", rank_rewrite, {rank_all_rewrite_4, rank_all_rewrite_5}},
+    {"popcount", rank_popcount, {rank_all_popcount_4, rank_all_popcount_5}},
+    {"table", rank_table, {rank_all_table_4, rank_all_table_5}},
+    {"compare", rank_compare, {rank_all_compare_4, rank_all_compare_5}},
+};
+#define N_RANKERS (sizeof(rankers) / sizeof(rankers[0]))
+
+/**
+ * Fills `positions` and `orients` with `N_STATES` random states of `n`
+ * distinct slots out of 18.
+ */
+static void random_states(uint8_t* positions, uint8_t* orients, int n) {
+    for(int s=0; s<N_STATES; s++) {
+        uint8_t slots[18];
+        for(int i=0; i<18; i++) {
+            slots[i] = i;
+        }
+        for(int i=0; i<n; i++) {
+            int j = i + rand() % (18-i);
+            uint8_t tmp = slots[i];
+            slots[i] = slots[j];
+            slots[j] = tmp;
+            positions[s*n + i] = slots[i];
+            orients[s*n + i] = rand() % 4;
+        }
+    }
+}
+
+/**
+ * Nanoseconds `rank_all` takes per state, the best of `N_ROUNDS` runs over
+ * every state. The sum of the ranks is stored in `checksum`.
+ */
+static double time_ranker(RankAllFunc rank_all, const uint8_t* positions,
+                          const uint8_t* orients, uint64_t* checksum) {
+    double best = 0;
+    for(int round=0; round<N_ROUNDS; round++) {
+        struct timespec start, end;
+        clock_gettime(CLOCK_MONOTONIC, &start);
+        *checksum = rank_all(positions, orients);
+        clock_gettime(CLOCK_MONOTONIC, &end);
+        double ns = (end.tv_sec - start.tv_sec) * 1e9 +
+                    (end.tv_nsec - start.tv_nsec);
+        if(round == 0 || ns < best) {
+            best = ns;
+        }
+    }
+    return best / N_STATES;
+}
+
+int main() {
+    for(int i=0; i<256; i++) {
+        popcount_table[i] = __builtin_popcount(i);
+    }
+    srand(0);
+
+    uint8_t* positions = (uint8_t*) malloc(N_STATES * MAX_CUBIES);
+    uint8_t* orients = (uint8_t*) malloc(N_STATES * MAX_CUBIES);
+    bool ok = true;
+    for(int n=4; n<=MAX_CUBIES; n++) {
+        random_states(positions, orients, n);
+        for(int s=0; s<N_STATES; s++) {
+            uint64_t expected = rank_rewrite(&positions[s*n], &orients[s*n],
+                                             n);
+            for(unsigned r=1; r<N_RANKERS; r++) {
+                if(rankers[r].func(&positions[s*n], &orients[s*n], n) !=
+                        expected) {
+                    fprintf(stderr, "%s ranks state %d of %d cubies "
+                            "differently\n", rankers[r].name, s, n);
+                    ok = false;
+                }
+            }
+        }
+
+        printf("%d cubies:", n);
+        uint64_t expected_sum = 0;
+        for(unsigned r=0; r<N_RANKERS; r++) {
+            uint64_t sum;
+            double ns = time_ranker(rankers[r].rank_all[n-4], positions,
+                                    orients, &sum);
+            if(r == 0) {
+                expected_sum = sum;
+            } else if(sum != expected_sum) {
+                ok = false;
+            }
+            printf(" %s %.1f ns%s", rankers[r].name, ns,
+                   r+1 < N_RANKERS ? "," : "\n");
+        }
+    }
+    free(positions);
+    free(orients);
+    return ok ? 0 : 1;
+}
@@ -1,26 +1,91 @@
-
 import os
 import sys
 if sys.version_info < (3, 2):
     raise RuntimeError("Python version 3.2 or greater is required")
 import ctypes
+from concurrent.futures import ThreadPoolExecutor
 
 _LIBMIXUPCUBE_SO = "./libmixupcube.so"
 
 _libcube = ctypes.cdll.LoadLibrary(_LIBMIXUPCUBE_SO)
 
-# bool Heuristic_generate(const char* name);
-_libcube.Heuristic_generate.argtypes = [ctypes.POINTER(ctypes.c_char)]
+# bool Heuristic_generate(const char* name, HeuristicEncoding encoding,
+#                         int n_threads, bool resume);
+_libcube.Heuristic_generate.argtypes = [ctypes.POINTER(ctypes.c_char), ctypes.c_int, ctypes.c_int, ctypes.c_bool]
 _libcube.Heuristic_generate.restype = ctypes.c_bool
 
+# uint64_t Heuristic_get_size(const char* name);
+_libcube.Heuristic_get_size.argtypes = [ctypes.POINTER(ctypes.c_char)]
+_libcube.Heuristic_get_size.restype = ctypes.c_uint64
+
 HEURISTICS_DIR = "heuristics/"
 
+# Values of `HeuristicEncoding`. Byte tables are the largest, but can be read
+# by older versions. Nibble tables are half the size, mod3 tables a quarter.
+# Mod3 tables also take a quarter of the memory to generate, which is the only
+# way the pieces tables fit.
+ENCODINGS = {
+    "byte": 0,
+    "nibble": 1,
+    "mod3": 2,
+}
+DEFAULT_ENCODING = "mod3"
+
+USAGE = """Usage: {} [options] <heuristic_name> [<heuristic_name [...]]
+
+Options:
+    --encoding={}
+        How tables store distances. Default: {}
+    --threads=N
+        Threads to generate with. Default: one per CPU core
+    --memory=MB
+        Generate as many tables at once as fit in this much memory. By
+        default, tables are generated one at a time.
+    --fresh
+        Start over instead of resuming from checkpoints left by
+        generation that was interrupted."""
+
+def generation_memory(name, encoding):
+    """Bytes of memory needed to generate the heuristic `name`."""
+    size = _libcube.Heuristic_get_size(bytes(name, "utf-8"))
+    if encoding == "nibble":
+        return size + (size + 1) // 2
+    elif encoding == "mod3":
+        # Generated packed, 2 bits per entry
+        return (size + 3) // 4
+    return size
+
 def main():
 
-    if len(sys.argv) < 2:
-        print("Usage: {} <heuristic_name> [<heuristic_name [...]]".format(sys.argv[0]))
+    encoding = DEFAULT_ENCODING
+    threads = os.cpu_count() or 1
+    memory = None
+    resume = True
+    names = []
+    try:
+        for arg in sys.argv[1:]:
+            if arg.startswith("--encoding="):
+                encoding = arg[len("--encoding="):]
+                if encoding not in ENCODINGS:
+                    raise ValueError(encoding)
+            elif arg.startswith("--threads="):
+                threads = int(arg[len("--threads="):])
+            elif arg.startswith("--memory="):
+                memory = int(arg[len("--memory="):]) * 1024 * 1024
+            elif arg == "--fresh":
+                resume = False
+            else:
+                names.append(arg)
+    except ValueError:
+        names = []
+    if not names:
+        print(USAGE.format(sys.argv[0], "|".join(ENCODINGS), DEFAULT_ENCODING))
         return -1
-    names = sys.argv[1:]
+
+    for name in names:
+        if _libcube.Heuristic_get_size(bytes(name, "utf-8")) == 0:
+            print('No heuristic by name "{}"'.format(name))
+            return -1
 
     # This makes sure the C code saves heuristics in the correct directory.
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -32,10 +97,23 @@ def main():
             return -1
         os.mkdir(HEURISTICS_DIR)
 
-    for name in names:
-        _libcube.Heuristic_generate(bytes(name, "utf-8"))
+    # Split the threads between as many tables as fit in memory at once. The
+    # C code releases the GIL, so the tables really are generated in
+    # parallel.
+    n_jobs = 1
+    if memory is not None:
+        largest = max(generation_memory(name, encoding) for name in names)
+        n_jobs = max(1, min(len(names), memory // largest))
+    threads_per_job = max(1, threads // n_jobs)
+
+    def generate(name):
+        return _libcube.Heuristic_generate(bytes(name, "utf-8"),
+                                           ENCODINGS[encoding],
+                                           threads_per_job, resume)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        results = list(executor.map(generate, names))
 
-    return 0
+    return 0 if all(results) else -1
 
 if __name__ == "__main__":
     sys.exit(main())
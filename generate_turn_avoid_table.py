@@ -1,12 +1,29 @@
 #!/usr/bin/python3
 """
-Generates "turn_avoid_table" in "src/mixupcube_solve.c". See that file for a
-complete description of the table.
-
-Here are the turns that are currently avoided:
- * Turning the same face or slice twice (ex: LL', L2L)
- * Consistently order turns that don't affect each other (ex: Choose L to
-   always come before R)
+Generates "src/turn_avoid_table.h", the automaton the search uses to avoid
+sequences of turns that can never be part of a shortest solution. See that
+file for how the automaton is used.
+
+Sequences are found on the C engine instead of being listed by hand. Every
+sequence of up to `--max-length` turns is applied to the solved cube, in
+order of length and then of turn IDs. A sequence that reaches the same cube
+as one before it is avoided: any solution containing it could use the
+earlier sequence instead, and be shorter or come first in that order. This
+covers the rules that used to be written out, like never turning the same
+face or slice twice in a row and always turning L before R, as well as
+sequences of slices and faces that equal a single turn.
+
+Only sequences that nothing shorter is avoided in are checked, so the
+avoided sequences are as short as they can be. They are matched with an
+Aho-Corasick automaton: the search keeps the automaton's state along its
+path, and each state has the turns that would complete an avoided sequence.
+
+The turns that keep the cube in cube shape are used on their own by phase 2
+of a two phase solve. A sequence of only those turns is avoided only if an
+earlier sequence of only those turns reaches the same cube, so a search with
+that move set still finds its shortest solutions.
+
+Usage: generate_turn_avoid_table.py [--max-length=N] > src/turn_avoid_table.h
 
 """
 
@@ -14,68 +31,194 @@ import sys
 if sys.version_info < (3, 2):
     raise RuntimeError("Python version 3.2 or greater is required")
 
-from itertools import product
-
-from mixupcube import TURN_IDS
-
-U1= 0; D1= 1; F1= 2; B1= 3; L1= 4; R1= 5;
-U2= 6; D2= 7; F2= 8; B2= 9; L2=10; R2=11;
-U3=12; D3=13; F3=14; B3=15; L3=16; R3=17;
-M1=18; E1=19; S1=20; M2=21; E2=22; S2=23;
-M3=24; E3=25; S3=26; M4=27; E4=28; S4=29;
-M5=30; E5=31; S5=32; M6=33; E6=34; S6=35;
-M7=36; E7=37; S7=38;
-
-U_TURNS = (U1, U2, U3)
-D_TURNS = (D1, D2, D3)
-F_TURNS = (F1, F2, F3)
-B_TURNS = (B1, B2, B3)
-L_TURNS = (L1, L2, L3)
-R_TURNS = (R1, R2, R3)
-M_TURNS = (M1, M2, M3, M4, M5, M6, M7)
-E_TURNS = (E1, E2, E3, E4, E5, E6, E7)
-S_TURNS = (S1, S2, S3, S4, S5, S6, S7)
-
-
-def add_avoid(table, prev_turn, turn):
-    table[prev_turn] |= 1 << turn
-
-def generate_table():
-    table = [0 for turn in range(len(TURN_IDS)+1)]
-
-    # Don't turn the same face or slice twice in a row
-    for turn_set in (U_TURNS, D_TURNS, F_TURNS,
-                     B_TURNS, L_TURNS, R_TURNS,
-                     M_TURNS, E_TURNS, S_TURNS):
-        for t1, t2 in product(turn_set, repeat=2):
-            add_avoid(table, t1, t2)
-
-    # Consistently order turns that don't affect each other
-    for p1, p2, p3 in ((U_TURNS, E_TURNS, D_TURNS),
-                       (L_TURNS, M_TURNS, R_TURNS),
-                       (F_TURNS, S_TURNS, B_TURNS)):
-        for t1, t2 in product(p1, p2):
-            add_avoid(table, t1, t2)
-        for t1, t2 in product(p1, p3):
-            add_avoid(table, t1, t2)
-        for t1, t2 in product(p2, p3):
-            add_avoid(table, t1, t2)
-
-    return table
-
-def table_to_string(table):
-    ret = []
-    hex_fmt = "0x{:0>10x}, "
-    fmt_6 = ("    "+hex_fmt*6).rstrip(" ")
-    fmt_3 = ("    "+hex_fmt*3).rstrip(" ")
-    fmt_1 = ("    "+hex_fmt*1).rstrip(" ")
-    for a in range(0, 18, 6):
-        ret.append(fmt_6.format(*table[a:a+6]))
-    for a in range(18, 39, 3):
-        ret.append(fmt_3.format(*table[a:a+3]))
-    ret.append(fmt_1.format(0))  # Used for "no previous turn"
-
-    return '\n'.join(ret)
+import ctypes
+from collections import deque
+
+from mixupcube import _libcube, _CubeStruct
+
+N_TURNS = 39
+
+# Longer sequences barely lower the number of turns searched from each node,
+# and make the automaton many times larger.
+DEFAULT_MAX_LENGTH = 3
+
+def turned(cube, turn):
+    """Returns a copy of `cube` with `turn` applied."""
+    ret = _CubeStruct.from_buffer_copy(cube)
+    _libcube.Cube_turn(ctypes.pointer(ret), turn)
+    return ret
+
+def find_avoided(max_length):
+    """
+    Returns every sequence of up to `max_length` turns, as a tuple, that
+    reaches the same cube as an earlier sequence, and that no shorter
+    sequence is avoided in.
+    """
+    solved = _libcube.Cube_new_solved().contents
+    shape_turns = set(
+        turn for turn in range(N_TURNS)
+        if _libcube.Cube_is_cube_shape(ctypes.pointer(turned(solved, turn)))
+    )
+
+    # First sequence to reach each cube, of any turns and of only cube
+    # shape turns
+    first = {bytes(solved)}
+    first_shape = {bytes(solved)}
+    avoided = []
+
+    level = [((), solved)]
+    kept = {()}
+    for length in range(1, max_length+1):
+        next_level = []
+        for seq, cube in level:
+            for turn in range(N_TURNS):
+                new_seq = seq + (turn,)
+                # The sequence without its first turn has to be kept too
+                if new_seq[1:] not in kept:
+                    continue
+                new_cube = turned(cube, turn)
+                key = bytes(new_cube)
+                if all(t in shape_turns for t in new_seq):
+                    if key in first_shape:
+                        avoided.append(new_seq)
+                        continue
+                    first_shape.add(key)
+                elif key in first:
+                    avoided.append(new_seq)
+                    continue
+                first.add(key)
+                next_level.append((new_seq, new_cube))
+                kept.add(new_seq)
+        level = next_level
+    return avoided
+
+def build_automaton(avoided):
+    """
+    Builds an Aho-Corasick automaton that matches the sequences in
+    `avoided`. Returns `(avoid, transitions)`: for each state, the mask of
+    turns that complete an avoided sequence, and the state after each turn.
+    State 0 is the start. Transitions on avoided turns are never taken, and
+    go to 0.
+    """
+    # Trie of every sequence, states numbered breadth first
+    children = [{}]
+    ends = [0]
+    for seq in avoided:
+        state = 0
+        for turn in seq[:-1]:
+            if turn not in children[state]:
+                children[state][turn] = len(children)
+                children.append({})
+                ends.append(0)
+            state = children[state][turn]
+        ends[state] |= 1 << seq[-1]
+
+    # Follow each state's failure link, the longest proper suffix that's
+    # also in the trie, filling in transitions and inheriting its avoided
+    # turns.
+    queue = deque([0])
+    order = []
+    fail = {0: 0}
+    transitions = {}
+    avoid = {}
+    while queue:
+        state = queue.popleft()
+        order.append(state)
+        avoid[state] = ends[state] | (avoid[fail[state]] if state else 0)
+        transitions[state] = []
+        for turn in range(N_TURNS):
+            if turn in children[state]:
+                child = children[state][turn]
+                fail[child] = transitions[fail[state]][turn] if state else 0
+                transitions[state].append(child)
+                queue.append(child)
+            elif state:
+                transitions[state].append(transitions[fail[state]][turn])
+            else:
+                transitions[state].append(0)
+
+    renumber = {state: i for i, state in enumerate(order)}
+    avoid_list = [avoid[state] for state in order]
+    transitions_list = []
+    for state in order:
+        transitions_list.append([
+            0 if avoid[state] & (1 << turn) else renumber[next_state]
+            for turn, next_state in enumerate(transitions[state])
+        ])
+    return avoid_list, transitions_list
+
+HEADER = """
+/**
+ * Avoids sequences of turns that can never be part of a shortest solution,
+ * because another sequence no longer than it reaches the same cube.
+ *
+ * This is an automaton. The search keeps its state along the path it's
+ * searching, starting from `TURN_AVOID_START`. In each state,
+ * `turn_avoid_table` has a bit for each turn (from least to most significant
+ * bit), and a 1 means the turn would complete a sequence to avoid.
+ * `turn_avoid_next` is the state after each turn that isn't avoided:
+ *
+ *    if(turn_avoid_table[state] & (1ULL << next_turn)) {{
+ *      // Avoid the turn
+ *    }} else {{
+ *      next_state = turn_avoid_next[state][next_turn];
+ *    }}
+ *
+ * The start state avoids nothing.
+ *
+ * DO NOT MODIFY THESE TABLES DIRECTLY. They are generated by
+ * "generate_turn_avoid_table.py", from every sequence of up to {max_length}
+ * turns. See that file for a full description of which turns are avoided
+ * and why.
+ *
+ */
+
+#ifndef TURN_AVOID_TABLE_H
+#define TURN_AVOID_TABLE_H
+
+#include <stdint.h>
+
+#define TURN_AVOID_START 0
+#define TURN_AVOID_N_STATES {n_states}
+
+static const unsigned long long int turn_avoid_table[TURN_AVOID_N_STATES] = {{
+{avoid}
+}};
+
+static const uint16_t turn_avoid_next[TURN_AVOID_N_STATES][39] = {{
+{transitions}
+}};
+
+#endif"""
+
+def automaton_to_string(avoid, transitions, max_length):
+    avoid_lines = []
+    for a in range(0, len(avoid), 6):
+        avoid_lines.append("    " + " ".join(
+            "0x{:0>10x},".format(mask) for mask in avoid[a:a+6]))
+    transition_lines = []
+    for row in transitions:
+        transition_lines.append("    {{{}}},".format(
+            ", ".join(str(state) for state in row)))
+    return HEADER.format(
+        max_length=max_length,
+        n_states=len(avoid),
+        avoid="\n".join(avoid_lines),
+        transitions="\n".join(transition_lines),
+    )
+
+def main():
+    max_length = DEFAULT_MAX_LENGTH
+    for arg in sys.argv[1:]:
+        if arg.startswith("--max-length="):
+            max_length = int(arg[len("--max-length="):])
+        else:
+            print(__doc__.strip().splitlines()[-1])
+            return -1
+
+    avoid, transitions = build_automaton(find_avoided(max_length))
+    print(automaton_to_string(avoid, transitions, max_length))
+    return 0
 
 if __name__ == "__main__":
-    print(table_to_string(generate_table()))
+    sys.exit(main())
@@ -250,6 +250,19 @@ def _parse_c_ints(c_ints):
     _libc.free(c_ints)
     return raw_turns
 
+def _parse_c_solutions(c_ints):
+    """Same as `_parse_c_ints`, but for a list of several solutions."""
+    solutions = [[]]
+    i = 0
+    while c_ints[i] != -2:
+        if c_ints[i] == -1:
+            solutions.append([])
+        else:
+            solutions[-1].append(c_ints[i])
+        i += 1
+    _libc.free(c_ints)
+    return solutions
+
 #
 # ctypes Definitions
 #
@@ -266,6 +279,51 @@ class _CubeStruct(ctypes.Structure):
     _fields_ = [("cubies", _CubieStruct * 25)]
 _CubeStruct_p = ctypes.POINTER(_CubeStruct)
 
+class _HeuristicsStruct(ctypes.Structure):
+    # Only the fields before the private ones at the end
+    _fields_ = [("n_tables", ctypes.c_int),
+                ("tables", ctypes.c_void_p),
+                ("hugepages", ctypes.c_bool),
+                ("validation", ctypes.c_int),
+                ("symmetries", ctypes.c_bool),
+                ("dual", ctypes.c_bool)]
+_HeuristicsStruct_p = ctypes.POINTER(_HeuristicsStruct)
+
+class _SolverOptionsStruct(ctypes.Structure):
+    _fields_ = [("n_threads", ctypes.c_int),
+                ("verbose", ctypes.c_bool),
+                ("weight", ctypes.c_double),
+                ("transposition_memory", ctypes.c_uint64),
+                ("transposition_replacement", ctypes.c_int)]
+
+class _TranspositionStatsStruct(ctypes.Structure):
+    _fields_ = [("hits", ctypes.c_ulonglong),
+                ("misses", ctypes.c_ulonglong),
+                ("evictions", ctypes.c_ulonglong)]
+
+class _SolverStatsStruct(ctypes.Structure):
+    _fields_ = [("nodes_visited", ctypes.c_ulonglong),
+                ("depth", ctypes.c_int),
+                ("seconds", ctypes.c_double),
+                ("iterations", ctypes.c_int),
+                ("dual_pruned", ctypes.c_ulonglong),
+                ("transpositions", _TranspositionStatsStruct)]
+
+class _PerimeterStruct(ctypes.Structure):
+    _fields_ = [("depth", ctypes.c_int),
+                ("n_states", ctypes.c_uint64),
+                ("n_entries", ctypes.c_uint64),
+                ("entries", ctypes.c_void_p)]
+_PerimeterStruct_p = ctypes.POINTER(_PerimeterStruct)
+
+class _SolverContextStruct(ctypes.Structure):
+    # Only the fields before the private ones at the end
+    _fields_ = [("heuristics", ctypes.c_void_p),
+                ("perimeter", ctypes.c_void_p),
+                ("options", _SolverOptionsStruct),
+                ("stats", _SolverStatsStruct)]
+_SolverContextStruct_p = ctypes.POINTER(_SolverContextStruct)
+
 # Cube* Cube_new_solved();
 _libcube.Cube_new_solved.argtypes = []
 _libcube.Cube_new_solved.restype = _CubeStruct_p
@@ -274,6 +332,10 @@ _libcube.Cube_new_solved.restype = _CubeStruct_p
 _libcube.Cube_turn.argtypes = [_CubeStruct_p, ctypes.c_int]
 _libcube.Cube_turn.restype = None
 
+# void Cube_inverse(Cube* dst, const Cube* src);
+_libcube.Cube_inverse.argtypes = [_CubeStruct_p, _CubeStruct_p]
+_libcube.Cube_inverse.restype = None
+
 # bool Cube_is_cube_shape(const Cube* cube);
 _libcube.Cube_is_cube_shape.argtypes = [_CubeStruct_p]
 _libcube.Cube_is_cube_shape.restype = ctypes.c_bool
@@ -286,15 +348,356 @@ _libcube.Cube_is_solved.restype = ctypes.c_bool
 _libcube.Cube_solve.argtypes = [_CubeStruct_p]
 _libcube.Cube_solve.restype = ctypes.POINTER(ctypes.c_int)
 
+# int* Cube_solve_parallel(const Cube* cube, int n_threads);
+_libcube.Cube_solve_parallel.argtypes = [_CubeStruct_p, ctypes.c_int]
+_libcube.Cube_solve_parallel.restype = ctypes.POINTER(ctypes.c_int)
+
 # int* Cube_solve_to_cube_shape(const Cube* cube);
 _libcube.Cube_solve_to_cube_shape.argtypes = [_CubeStruct_p]
 _libcube.Cube_solve_to_cube_shape.restype = ctypes.POINTER(ctypes.c_int)
 
-
 # void Cube_free(Cube* cube);
 _libcube.Cube_free.argtypes = [_CubeStruct_p]
 _libcube.Cube_free.restype = None
 
+# Heuristics* Heuristics_new();
+_libcube.Heuristics_new.argtypes = []
+_libcube.Heuristics_new.restype = _HeuristicsStruct_p
+
+# bool Heuristic_load(Heuristics* loaded, const char* name);
+_libcube.Heuristic_load.argtypes = [_HeuristicsStruct_p, ctypes.c_char_p]
+_libcube.Heuristic_load.restype = ctypes.c_bool
+
+# void Heuristics_load_all(Heuristics* loaded);
+_libcube.Heuristics_load_all.argtypes = [_HeuristicsStruct_p]
+_libcube.Heuristics_load_all.restype = None
+
+# const Heuristics* Heuristics_get_resident();
+_libcube.Heuristics_get_resident.argtypes = []
+_libcube.Heuristics_get_resident.restype = _HeuristicsStruct_p
+
+# void Heuristics_validate(const Heuristics* loaded);
+_libcube.Heuristics_validate.argtypes = [_HeuristicsStruct_p]
+_libcube.Heuristics_validate.restype = None
+
+# void Heuristics_free(Heuristics* loaded);
+_libcube.Heuristics_free.argtypes = [_HeuristicsStruct_p]
+_libcube.Heuristics_free.restype = None
+
+# uint64_t Perimeter_get_size(int depth);
+_libcube.Perimeter_get_size.argtypes = [ctypes.c_int]
+_libcube.Perimeter_get_size.restype = ctypes.c_uint64
+
+# Perimeter* Perimeter_new(uint64_t max_bytes);
+_libcube.Perimeter_new.argtypes = [ctypes.c_uint64]
+_libcube.Perimeter_new.restype = _PerimeterStruct_p
+
+# void Perimeter_free(Perimeter* perimeter);
+_libcube.Perimeter_free.argtypes = [_PerimeterStruct_p]
+_libcube.Perimeter_free.restype = None
+
+# const Perimeter* Perimeter_get_resident();
+_libcube.Perimeter_get_resident.argtypes = []
+_libcube.Perimeter_get_resident.restype = _PerimeterStruct_p
+
+# bool (*SolutionCallback)(const int* solution, int length, void* data);
+_SOLUTION_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_bool, ctypes.POINTER(ctypes.c_int), ctypes.c_int, ctypes.c_void_p)
+
+# SolverContext* SolverContext_new(const Heuristics* heuristics);
+_libcube.SolverContext_new.argtypes = [_HeuristicsStruct_p]
+_libcube.SolverContext_new.restype = _SolverContextStruct_p
+
+# void SolverContext_free(SolverContext* ctx);
+_libcube.SolverContext_free.argtypes = [_SolverContextStruct_p]
+_libcube.SolverContext_free.restype = None
+
+# int* SolverContext_solve(SolverContext* ctx, const Cube* cube);
+_libcube.SolverContext_solve.argtypes = [_SolverContextStruct_p, _CubeStruct_p]
+_libcube.SolverContext_solve.restype = ctypes.POINTER(ctypes.c_int)
+
+# int* SolverContext_solve_to_cube_shape(SolverContext* ctx, const Cube* cube);
+_libcube.SolverContext_solve_to_cube_shape.argtypes = [_SolverContextStruct_p, _CubeStruct_p]
+_libcube.SolverContext_solve_to_cube_shape.restype = ctypes.POINTER(ctypes.c_int)
+
+# int* SolverContext_solve_two_phase(SolverContext* ctx, const Cube* cube,
+#                                    int target_length, double max_seconds,
+#                                    SolutionCallback callback, void* data);
+_libcube.SolverContext_solve_two_phase.argtypes = [_SolverContextStruct_p, _CubeStruct_p, ctypes.c_int, ctypes.c_double, _SOLUTION_CALLBACK, ctypes.c_void_p]
+_libcube.SolverContext_solve_two_phase.restype = ctypes.POINTER(ctypes.c_int)
+
+
+def _solve_resident(solve_func, threads, weight=1):
+    """
+    Calls `solve_func` with a context using the tables loaded by
+    `load_heuristics()`, the same as `Cube_solve_parallel()` does, but with
+    `weight`.
+    """
+    ctx = _libcube.SolverContext_new(_libcube.Heuristics_get_resident())
+    try:
+        ctx.contents.perimeter = ctypes.cast(
+            _libcube.Perimeter_get_resident(), ctypes.c_void_p)
+        ctx.contents.options.n_threads = threads
+        ctx.contents.options.weight = weight
+        return solve_func(ctx)
+    finally:
+        _libcube.SolverContext_free(ctx)
+
+def load_heuristics():
+    """
+    Loads all available heuristic tables, if they aren't loaded already.
+
+    Solves that aren't given a `SolverContext` use these tables, and a
+    `Perimeter` of the default size. They are loaded by the first such solve
+    and kept in memory until the process exits, so calling this at startup
+    only moves that cost out of the first solve.
+    """
+    _libcube.Heuristics_get_resident()
+    _libcube.Perimeter_get_resident()
+
+
+class Heuristics():
+    """
+    A set of loaded heuristic tables. One set can be shared by any number of
+    `SolverContext`s, including ones solving in different threads at once.
+
+    `names` is a list of heuristic names to load. By default all available
+    heuristics are loaded.
+
+    Tables are mapped from their files rather than copied into memory, so
+    every process using the same tables shares them, and pages are only read
+    from disk when first used. Set `hugepages` to ask the kernel to back the
+    tables with huge pages.
+
+    `validation` is how thoroughly table files are checked: "header" only
+    checks that each file's header matches its heuristic. "background" also
+    checks the checksum of each table on a background thread, and corrupt
+    tables are dropped before the first solve. "full" checks the checksum
+    while loading.
+
+    With `symmetries`, each table of edges or faces is also looked up through
+    the cube's symmetries, which gives the distance of other sets of pieces
+    without any more memory. This expands about a quarter as many nodes, but
+    each node takes about four times as many lookups, which can make solves
+    slower when the tables don't fit in the CPU caches. A table whose pieces
+    are already covered by a symmetry of another table isn't loaded.
+
+    With `dual`, tables are also looked up on the inverse of each state,
+    which is exactly as far from solved but often looks further, so more
+    nodes are pruned without any more memory. Only tables generated with
+    the "byte" or "nibble" encoding can be looked up this way, since a "mod3"
+    table needs the distance of the state one turn before.
+
+    The tables stay in memory until `close()` is called, either directly or
+    by using the set as a context manager:
+
+        with Heuristics() as heuristics:
+            context = SolverContext(heuristics)
+            ...
+    """
+
+    _VALIDATION = {"header": 0, "background": 1, "full": 2}
+
+    def __init__(self, names=None, hugepages=False, validation="background",
+                 symmetries=False, dual=False):
+        self._heuristics = _libcube.Heuristics_new()
+        self._heuristics.contents.hugepages = hugepages
+        self._heuristics.contents.validation = self._VALIDATION[validation]
+        self._heuristics.contents.symmetries = symmetries
+        self._heuristics.contents.dual = dual
+        if names is None:
+            _libcube.Heuristics_load_all(self._heuristics)
+        else:
+            for name in names:
+                if not _libcube.Heuristic_load(self._heuristics, name.encode()):
+                    self.close()
+                    raise MixupCubeException(
+                        'Could not load heuristic "{}"'.format(name))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Number of tables loaded, counting each symmetry looked up."""
+        return self._heuristics.contents.n_tables
+
+    def validate(self):
+        """
+        Waits for background validation to finish, dropping any corrupt
+        tables. Solves do this on their own before using the tables.
+        """
+        _libcube.Heuristics_validate(self._heuristics)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Frees the tables. Neither the set nor any `SolverContext` using it can
+        be used to solve afterwards.
+        """
+        if self._heuristics is not None:
+            _libcube.Heuristics_free(self._heuristics)
+            self._heuristics = None
+
+
+class Perimeter():
+    """
+    Every state within a few turns of solved, with the turns that solve it.
+    Solves given a perimeter stop that many turns short and look the rest of
+    the solution up, instead of searching the last turns.
+
+    The perimeter is generated in memory, as deep as fits in `memory` bytes.
+    Each turn of depth takes about 27 times more memory than the last: 32 MB
+    is enough for 4 turns, 512 MB for 5. Like `Heuristics`, a perimeter can
+    be shared by any number of `SolverContext`s, and is freed by `close()`.
+    """
+
+    DEFAULT_MEMORY = 64 * 1024 * 1024
+
+    def __init__(self, memory=DEFAULT_MEMORY):
+        self._perimeter = _libcube.Perimeter_new(memory)
+        if not self._perimeter:
+            self._perimeter = None
+            raise MixupCubeException(
+                "Not even a perimeter of depth 1 fits in {} bytes".format(memory))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def depth(self):
+        """Turns from solved the perimeter reaches."""
+        return self._perimeter.contents.depth
+
+    def __len__(self):
+        """Number of states in the perimeter."""
+        return self._perimeter.contents.n_states
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Frees the perimeter. No `SolverContext` using it can be used to solve
+        afterwards.
+        """
+        if self._perimeter is not None:
+            _libcube.Perimeter_free(self._perimeter)
+            self._perimeter = None
+
+
+class SolverContext():
+    """
+    Holds the state of a solve: which heuristics and perimeter to use,
+    options, and the statistics of the last solve. Pass to
+    `MixupCube.solve(context=...)`.
+
+    A context must only be used by one solve at a time. To solve in several
+    threads at once, give each thread its own context. They can all share the
+    same `Heuristics` and `Perimeter`.
+
+    A `weight` above 1 trades solution length for speed: the heuristics are
+    multiplied by it, and solutions are at most `weight` times as long as the
+    optimal ones, rounded up to a whole turn.
+
+    With a `transposition_memory` of more than 0 bytes, the search remembers
+    the states it reaches in a table of that size, and cuts off any state it
+    reaches again in more turns, which can't be part of a shorter solution.
+    The table is allocated by the first solve and kept for the next ones.
+    When the table is full, `transposition_replacement` picks which state is
+    forgotten: "always" makes room for every new state, and "shallower" only
+    for states at most as far from the root as the one they replace.
+    """
+
+    _REPLACEMENTS = {"always": 0, "shallower": 1}
+
+    def __init__(self, heuristics=None, threads=1, verbose=True,
+                 perimeter=None, weight=1,
+                 transposition_memory=0, transposition_replacement="always"):
+        self._ctx = None
+        if heuristics is not None and heuristics._heuristics is None:
+            raise MixupCubeException("Heuristics have been closed")
+        if perimeter is not None and perimeter._perimeter is None:
+            raise MixupCubeException("Perimeter has been closed")
+        # Keep references so the tables outlive this context
+        self.heuristics = heuristics
+        self.perimeter = perimeter
+        self._ctx = _libcube.SolverContext_new(
+            heuristics._heuristics if heuristics is not None else None)
+        if perimeter is not None:
+            self._ctx.contents.perimeter = ctypes.cast(
+                perimeter._perimeter, ctypes.c_void_p)
+        self._ctx.contents.options.n_threads = threads
+        self._ctx.contents.options.verbose = verbose
+        self._ctx.contents.options.weight = weight
+        self._ctx.contents.options.transposition_memory = transposition_memory
+        self._ctx.contents.options.transposition_replacement = \
+            self._REPLACEMENTS[transposition_replacement]
+
+    def __del__(self):
+        if self._ctx is not None:
+            _libcube.SolverContext_free(self._ctx)
+
+    @property
+    def nodes_visited(self):
+        """Nodes visited by the last solve."""
+        return self._ctx.contents.stats.nodes_visited
+
+    @property
+    def depth(self):
+        """Length of the solution found by the last solve."""
+        return self._ctx.contents.stats.depth
+
+    @property
+    def seconds(self):
+        """Time the last solve took."""
+        return self._ctx.contents.stats.seconds
+
+    @property
+    def iterations(self):
+        """
+        Depths the last solve searched. Depths that can't have a solution
+        aren't searched, so this can be less than `depth`.
+        """
+        return self._ctx.contents.stats.iterations
+
+    @property
+    def dual_pruned(self):
+        """
+        Nodes the last solve pruned by looking up the inverse state alone
+        (see `Heuristics`).
+        """
+        return self._ctx.contents.stats.dual_pruned
+
+    @property
+    def transposition_hits(self):
+        """
+        States the last solve cut off because it had already reached them in
+        fewer turns (see `transposition_memory`).
+        """
+        return self._ctx.contents.stats.transpositions.hits
+
+    @property
+    def transposition_misses(self):
+        """
+        States the last solve looked up in the transposition table and
+        searched.
+        """
+        return self._ctx.contents.stats.transpositions.misses
+
+    @property
+    def transposition_evictions(self):
+        """
+        States the last solve forgot to make room in the transposition table.
+        """
+        return self._ctx.contents.stats.transpositions.evictions
+
 
 class MixupCube():
 
@@ -391,30 +794,97 @@ class MixupCube():
         """Is this cube solved? Returns True or False accordingly."""
         return _libcube.Cube_is_solved(self._cube)
 
-    def solve(self, _return_turn_list=False):
+    def solve(self, threads=1, context=None, weight=1,
+              _return_turn_list=False):
         """Returns a solution in the form of a string, eg "RU2R'".
 
         Note an empty string is returned when the cube is already solved.
 
+        The search is split between `threads` threads. Pass 0 to use one
+        thread per CPU core. A `weight` above 1 finds a solution faster that
+        is at most that many times longer than optimal (see `SolverContext`).
+
+        If a `SolverContext` is given, its heuristics and options are used
+        instead (`threads` and `weight` are ignored) and the solve's
+        statistics are stored in it. Otherwise the tables loaded by
+        `load_heuristics()` are used, which the first solve loads if needed,
+        along with a 32 MB perimeter it generates in about half a second.
+
         """
-        return self._solve_abstract(
-            _libcube.Cube_solve,
-            _return_turn_list
-        )
+        if context is not None:
+            heuristics = context.heuristics
+            if heuristics is not None and heuristics._heuristics is None:
+                raise MixupCubeException("Heuristics have been closed")
+            perimeter = context.perimeter
+            if perimeter is not None and perimeter._perimeter is None:
+                raise MixupCubeException("Perimeter has been closed")
+            solve_func = lambda cube: \
+                _libcube.SolverContext_solve(context._ctx, cube)
+        elif weight == 1:
+            solve_func = lambda cube: \
+                _libcube.Cube_solve_parallel(cube, threads)
+        else:
+            solve_func = lambda cube: _solve_resident(
+                lambda ctx: _libcube.SolverContext_solve(ctx, cube),
+                threads, weight)
+        return self._solve_abstract(solve_func, _return_turn_list)
+
+    def solve_two_phase(self, max_length=None, max_seconds=1.0, callback=None,
+                        context=None, _return_turn_list=False):
+        """
+        Returns a solution quickly, which is NOT the shortest one in general.
+        Use `solve` for optimal solutions.
+
+        The cube is first brought into cube shape, then solved with only the
+        turns that keep it in cube shape, in at most 2 turns more than they
+        could be. Ways of getting into cube shape are tried shortest first,
+        so the solve keeps finding shorter solutions until one of at most
+        `max_length` turns is found, `max_seconds` have passed, or there are
+        no shorter ones left. Pass None for either to not limit it.
+
+        `callback`, if given, is called with each solution as it's found, and
+        can return False to stop the solve there. The shortest solution found
+        is returned, or None if none was found in time. A `SolverContext` is
+        used the same way as by `solve`.
+        """
+        @_SOLUTION_CALLBACK
+        def c_callback(c_solution, length, data):
+            if callback is None:
+                return True
+            return callback(self._turns_from_ints(c_solution[:length])) is not False
+
+        def solve_func(ctx):
+            return _libcube.SolverContext_solve_two_phase(
+                ctx, self._cube, max_length or 0, max_seconds or 0,
+                c_callback, None)
+        if context is not None:
+            c_solutions = solve_func(context._ctx)
+        else:
+            c_solutions = _solve_resident(solve_func, 1)
+        if not c_solutions:
+            return None
+        return self._turns_from_ints(_parse_c_solutions(c_solutions)[-1])
 
-    def solve_to_cube_shape(self, _return_turn_list=False):
+    def solve_to_cube_shape(self, context=None, _return_turn_list=False):
         """
         Same as `solve`, but solves to a cube shape instead of the final
         solution.
         """
-        return self._solve_abstract(
-            _libcube.Cube_solve_to_cube_shape,
-            _return_turn_list
-        )
+        if context is not None:
+            solve_func = lambda cube: \
+                _libcube.SolverContext_solve_to_cube_shape(context._ctx, cube)
+        else:
+            solve_func = _libcube.Cube_solve_to_cube_shape
+        return self._solve_abstract(solve_func, _return_turn_list)
 
     def _solve_abstract(self, solve_func, _return_turn_list=False):
         c_int_list = solve_func(self._cube)
-        ints = _parse_c_ints(c_int_list)
+        if not c_int_list:
+            raise MixupCubeException("No solution found")
+        return self._turns_from_ints(_parse_c_ints(c_int_list))
+
+    def _turns_from_ints(self, ints):
+        """Converts a solution from the C code to turns of this cube."""
         turns = [TURN_STRINGS[t] for t in ints]
 
         corrected_turns = list(self._axis_turns)
@@ -0,0 +1,309 @@
+#define _POSIX_C_SOURCE 200809L
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdbool.h>
+#include <pthread.h>
+
+#include "coords.h"
+
+// Private Prototypes
+static uint16_t corner_perm_rank(const Cube* cube);
+static void corner_perm_unrank(Cube* cube, uint16_t rank);
+static uint16_t corner_orient_rank(const Cube* cube);
+static void corner_orient_unrank(Cube* cube, uint16_t rank);
+static void init_move_tables();
+static void init_symmetry_tables();
+static bool symmetry_follow_turns(int sym, int seed, uint8_t coord_map[N_PIECE_COORDS]);
+
+// Each symmetry as the face every face (U, D, F, B, L, R) goes to, and
+// whether it is a mirror image, which turns every turn the other way.
+static const struct {
+    uint8_t faces[6];
+    bool mirror;
+} symmetries[N_SYMMETRIES] = {
+    {{0, 1, 2, 3, 4, 5}, false},  // Identity
+    {{2, 3, 4, 5, 0, 1}, false},  // U to F, F to L, L to U
+    {{4, 5, 0, 1, 2, 3}, false},  // U to L, L to F, F to U
+    {{2, 3, 0, 1, 4, 5}, true},   // Swap U and F
+    {{0, 1, 4, 5, 2, 3}, true},   // Swap F and L
+    {{4, 5, 2, 3, 0, 1}, true},   // Swap U and L
+};
+
+// Which way each slice (M, E, S) turns is named after a face: M turns like L,
+// E like D and S like F.
+static const uint8_t slice_faces[3] = {4, 1, 2};
+
+uint16_t corner_perm_move_table[N_CORNER_PERM][39];
+uint16_t corner_orient_move_table[N_CORNER_ORIENT][39];
+uint8_t piece_move_table[N_PIECE_COORDS][39];
+uint8_t symmetry_turn_table[N_SYMMETRIES][39];
+uint8_t symmetry_piece_table[N_SYMMETRIES][18];
+uint8_t symmetry_piece_coord_table[N_SYMMETRIES][18][N_PIECE_COORDS];
+
+static pthread_once_t initialized = PTHREAD_ONCE_INIT;
+
+
+/***** Public Functions *****/
+
+void Coords_init() {
+    pthread_once(&initialized, init_move_tables);
+}
+
+void Coords_from_cube(Coords* coords, const Cube* cube) {
+    coords->corner_perm = corner_perm_rank(cube);
+    coords->corner_orient = corner_orient_rank(cube);
+    for(int i=7; i<25; i++) {
+        Cubie c = cube->cubies[i];
+        coords->pieces[c.id-7] = (i-7)*4 + c.orient;
+    }
+}
+
+void Coords_to_cube(Cube* cube, const Coords* coords) {
+    corner_perm_unrank(cube, coords->corner_perm);
+    corner_orient_unrank(cube, coords->corner_orient);
+    for(int i=0; i<18; i++) {
+        Cubie* c = &cube->cubies[coords->pieces[i]/4 + 7];
+        c->id = i + 7;
+        c->orient = coords->pieces[i] % 4;
+    }
+}
+
+void Coords_inverse(Coords* dst, const Coords* src) {
+    Cube cube, inverse;
+    Coords_to_cube(&cube, src);
+    Cube_inverse(&inverse, &cube);
+    Coords_from_cube(dst, &inverse);
+}
+
+bool Coords_is_solved(const Coords* coords) {
+    if(coords->corner_perm != 0 || coords->corner_orient != 0) {
+        return false;
+    }
+    for(int i=0; i<12; i++) {  // Edges
+        if(coords->pieces[i] != i*4) {
+            return false;
+        }
+    }
+    for(int i=12; i<18; i++) {  // Faces
+        if(coords->pieces[i]/4 != i) {
+            return false;
+        }
+    }
+    return true;
+}
+
+bool Coords_is_cube_shape(const Coords* coords) {
+    // Every edge must be in an edge slot, rotated 0 or 180 degrees. That
+    // leaves only face slots for the faces.
+    for(int i=0; i<12; i++) {
+        if(coords->pieces[i]/4 >= 12 || coords->pieces[i] % 2 != 0) {
+            return false;
+        }
+    }
+    return true;
+}
+
+
+/***** Private Functions *****/
+
+static void init_move_tables() {
+    Cube cube;
+
+    for(int i=0; i<N_CORNER_PERM; i++) {
+        for(int turn=0; turn<N_TURN_TYPES; turn++) {
+            Cube_copy(&cube, &solved_state);
+            corner_perm_unrank(&cube, i);
+            Cube_turn(&cube, turn);
+            corner_perm_move_table[i][turn] = corner_perm_rank(&cube);
+        }
+    }
+
+    for(int i=0; i<N_CORNER_ORIENT; i++) {
+        for(int turn=0; turn<N_TURN_TYPES; turn++) {
+            Cube_copy(&cube, &solved_state);
+            corner_orient_unrank(&cube, i);
+            Cube_turn(&cube, turn);
+            corner_orient_move_table[i][turn] = corner_orient_rank(&cube);
+        }
+    }
+
+    // Follow a single cubie through each turn. Which cubie doesn't matter,
+    // so use the one that belongs in the slot.
+    for(int i=0; i<N_PIECE_COORDS; i++) {
+        int slot = i/4 + 7;
+        for(int turn=0; turn<N_TURN_TYPES; turn++) {
+            Cube_copy(&cube, &solved_state);
+            cube.cubies[slot].orient = i % 4;
+            Cube_turn(&cube, turn);
+            for(int j=7; j<25; j++) {
+                if(cube.cubies[j].id == slot) {
+                    piece_move_table[i][turn] = (j-7)*4 + cube.cubies[j].orient;
+                    break;
+                }
+            }
+        }
+    }
+
+    init_symmetry_tables();
+}
+
+static void init_symmetry_tables() {
+    for(int sym=0; sym<N_SYMMETRIES; sym++) {
+        const uint8_t* faces = symmetries[sym].faces;
+        bool mirror = symmetries[sym].mirror;
+
+        // Face turns: 0-5 clockwise, 6-11 half turns, 12-17 counter-clockwise
+        for(int turn=0; turn<18; turn++) {
+            int quarters = turn/6 + 1;
+            if(mirror) {
+                quarters = 4 - quarters;
+            }
+            symmetry_turn_table[sym][turn] = faces[turn%6] + 6*(quarters-1);
+        }
+
+        // Slice turns: a slice turns the same way as the slice it goes to if
+        // their faces go to each other, and the other way if its face goes
+        // to the opposite face.
+        for(int turn=18; turn<N_TURN_TYPES; turn++) {
+            int eighths = (turn-18)/3 + 1;
+            int face = faces[slice_faces[(turn-18)%3]];
+            int slice = face/2 == 0 ? 1 : face/2 == 1 ? 2 : 0;
+            if(face != slice_faces[slice]) {
+                eighths = 8 - eighths;
+            }
+            if(mirror) {
+                eighths = 8 - eighths;
+            }
+            symmetry_turn_table[sym][turn] = 18 + 3*(eighths-1) + slice;
+        }
+
+        // Which coordinate each coordinate goes to is fixed by where the
+        // first one goes, so try each until the turns agree.
+        uint8_t coord_map[N_PIECE_COORDS];
+        int seed;
+        for(seed=0; seed<N_PIECE_COORDS; seed++) {
+            if(symmetry_follow_turns(sym, seed, coord_map)) {
+                break;
+            }
+        }
+        if(seed == N_PIECE_COORDS) {
+            fprintf(stderr, "Error: Symmetry %d doesn't agree with turns.\n",
+                    sym);
+            abort();
+        }
+
+        // Relabel each piece as the piece whose slot its solved coordinate
+        // goes to. Orientations are relative to the piece, so subtract the
+        // orientation the solved coordinate ends up with from all of them.
+        // Turns add the same to every orientation of a slot, so this doesn't
+        // change how coordinates turn.
+        for(int i=0; i<18; i++) {
+            int solved = coord_map[i*4];
+            symmetry_piece_table[sym][i] = solved / 4;
+            for(int coord=0; coord<N_PIECE_COORDS; coord++) {
+                int mapped = coord_map[coord];
+                symmetry_piece_coord_table[sym][i][coord] =
+                    (mapped/4)*4 + (mapped%4 - solved%4 + 4) % 4;
+            }
+        }
+    }
+}
+
+/**
+ * Finds where symmetry `sym` takes each piece coordinate, given that it takes
+ * coordinate 0 to `seed`: a coordinate turned by some turn must go to where
+ * it went turned by the symmetric turn. Returns false if `seed` doesn't work.
+ */
+static bool symmetry_follow_turns(int sym, int seed,
+                                  uint8_t coord_map[N_PIECE_COORDS]) {
+    bool mapped[N_PIECE_COORDS] = {false};
+    bool used[N_PIECE_COORDS] = {false};
+    uint8_t queue[N_PIECE_COORDS];
+    int n_queued = 1;
+
+    coord_map[0] = seed;
+    mapped[0] = used[seed] = true;
+    queue[0] = 0;
+    for(int i=0; i<n_queued; i++) {
+        int coord = queue[i];
+        for(int turn=0; turn<N_TURN_TYPES; turn++) {
+            int next = piece_move_table[coord][turn];
+            int image = piece_move_table[coord_map[coord]][symmetry_turn_table[sym][turn]];
+            if(mapped[next]) {
+                if(coord_map[next] != image) {
+                    return false;
+                }
+            } else if(used[image]) {
+                return false;
+            } else {
+                coord_map[next] = image;
+                mapped[next] = used[image] = true;
+                queue[n_queued++] = next;
+            }
+        }
+    }
+    return n_queued == N_PIECE_COORDS;
+}
+
+/**
+ * Ranks the IDs of corner slots 0-5 as a mixed radix number. This is the same
+ * as the first part of `hash_corners()`.
+ */
+static uint16_t corner_perm_rank(const Cube* cube) {
+    uint16_t result = 0;
+    uint16_t max = 1;
+
+    for(int i=0; i<6; i++) {
+        int lower = 0;
+        for(int j=0; j<i; j++) {
+            lower += cube->cubies[j].id < cube->cubies[i].id;
+        }
+        result += max*(cube->cubies[i].id - lower);
+        max *= 7-i;
+    }
+
+    return result;
+}
+
+static void corner_perm_unrank(Cube* cube, uint16_t rank) {
+    bool used[7] = {false};
+
+    // Each digit is the index of the ID among the IDs that haven't been used
+    // yet. The last slot gets whichever ID is left over.
+    for(int i=0; i<7; i++) {
+        int digit = rank % (7-i);
+        rank /= 7-i;
+        for(int id=0; id<7; id++) {
+            if(used[id]) {
+                continue;
+            }
+            if(digit == 0) {
+                cube->cubies[i].id = id;
+                used[id] = true;
+                break;
+            }
+            digit--;
+        }
+    }
+}
+
+static uint16_t corner_orient_rank(const Cube* cube) {
+    uint16_t result = 0;
+    for(int i=5; i>=0; i--) {
+        result = result*3 + cube->cubies[i].orient;
+    }
+    return result;
+}
+
+static void corner_orient_unrank(Cube* cube, uint16_t rank) {
+    // Corner twists always add up to a multiple of 3, which determines the
+    // orientation of the last corner.
+    int sum = 0;
+    for(int i=0; i<6; i++) {
+        cube->cubies[i].orient = rank % 3;
+        sum += rank % 3;
+        rank /= 3;
+    }
+    cube->cubies[6].orient = (3 - sum%3) % 3;
+}
@@ -0,0 +1,112 @@
+/**
+ * Coordinates are a compact representation of a cube that can be turned using
+ * small precomputed move tables, instead of permuting all 25 cubies. They
+ * are what the solver's search works with.
+ *
+ * The state is split into three parts:
+ *
+ *   * corner_perm - The permutation of the corners, ranked the same way
+ *     `hash_corners()` ranks it. 0 to 7!-1.
+ *   * corner_orient - The orientation of corner slots 0-5, in base 3 with
+ *     slot 0 as the least significant digit. The orientation of corner slot 6
+ *     is determined by the others. 0 to 3^6-1.
+ *   * pieces - For each edge or face cubie, indexed by cubie ID minus 7, the
+ *     slot the cubie is in (minus 7) times 4, plus the cubie's orientation.
+ *     0 to 18*4-1.
+ *
+ * Notice that, unlike `Cube`, edges and faces are tracked by where each cubie
+ * is, not by which cubie is in each slot. This is what makes it possible to
+ * turn each piece on its own.
+ *
+ * The cube looks the same after being turned around the UFL-DBR diagonal, or
+ * mirrored across a plane through it, since UFL is the corner held in place.
+ * These are the cube's symmetries, and `Coords_symmetry()` applies one to the
+ * pieces of a state. Solving the pieces of a state takes exactly as many
+ * turns as solving the pieces they become, so a table looked up through a
+ * symmetry gives the distance of different pieces than the ones it tracks.
+ *
+ * `Coords_init()` must be called before any of the other functions.
+ */
+
+#ifndef COORDS_H
+#define COORDS_H
+
+#include <stdint.h>
+#include <stdbool.h>
+
+#include "mixupcube.h"
+
+#define N_CORNER_PERM 5040
+#define N_CORNER_ORIENT 729
+#define N_PIECE_COORDS 72
+#define N_SYMMETRIES 6  // Symmetry 0 is the identity
+
+typedef struct {
+    uint16_t corner_perm;
+    uint16_t corner_orient;
+    uint8_t pieces[18];
+} Coords;
+
+extern uint16_t corner_perm_move_table[N_CORNER_PERM][39];
+extern uint16_t corner_orient_move_table[N_CORNER_ORIENT][39];
+extern uint8_t piece_move_table[N_PIECE_COORDS][39];
+
+// The turn a symmetry turns each turn into.
+extern uint8_t symmetry_turn_table[N_SYMMETRIES][39];
+// For each symmetry, the piece each piece becomes, and the coordinate it has
+// as that piece for each coordinate it had.
+extern uint8_t symmetry_piece_table[N_SYMMETRIES][18];
+extern uint8_t symmetry_piece_coord_table[N_SYMMETRIES][18][N_PIECE_COORDS];
+
+/**
+ * Generates the move tables. Does nothing if they have already been
+ * generated.
+ */
+void Coords_init();
+
+void Coords_from_cube(Coords* coords, const Cube* cube);
+void Coords_to_cube(Cube* cube, const Coords* coords);
+
+/**
+ * Sets `dst` to the inverse of `src` (see `Cube_inverse()`).
+ */
+void Coords_inverse(Coords* dst, const Coords* src);
+
+/**
+ * Same as `Cube_is_solved()`, except the orientation of every face is
+ * ignored. Use `Cube_is_solved()` on the cube from `Coords_to_cube()` to
+ * confirm.
+ */
+bool Coords_is_solved(const Coords* coords);
+
+/**
+ * Same as `Cube_is_cube_shape()`.
+ */
+bool Coords_is_cube_shape(const Coords* coords);
+
+/**
+ * Sets `dst` to `src` turned by `turn`. See `Cube_turn()` for turn numbers.
+ */
+static inline void Coords_turn(Coords* dst, const Coords* src, int turn) {
+    dst->corner_perm = corner_perm_move_table[src->corner_perm][turn];
+    dst->corner_orient = corner_orient_move_table[src->corner_orient][turn];
+    for(int i=0; i<18; i++) {
+        dst->pieces[i] = piece_move_table[src->pieces[i]][turn];
+    }
+}
+
+/**
+ * Sets the pieces of `dst` to the pieces of `src` under symmetry `sym`.
+ * Turning the result by `symmetry_turn_table[sym][turn]` is the same as
+ * turning `src` by `turn` first. Corners are copied as they are.
+ */
+static inline void Coords_symmetry(Coords* dst, const Coords* src, int sym) {
+    dst->corner_perm = src->corner_perm;
+    dst->corner_orient = src->corner_orient;
+    for(int i=0; i<18; i++) {
+        dst->pieces[symmetry_piece_table[sym][i]] =
+            symmetry_piece_coord_table[sym][i][src->pieces[i]];
+    }
+}
+
+#endif
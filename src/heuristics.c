@@ -1,39 +1,166 @@
 
+#define _POSIX_C_SOURCE 200809L
+#define _DEFAULT_SOURCE  // For madvise()
+
 #include <stdio.h>
 #include <stdlib.h>
 #include <stdint.h>
 #include <stdbool.h>
 #include <string.h>
+#include <assert.h>
+#include <pthread.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 #include "mixupcube.h"
+#include "coords.h"
 #include "heuristics.h"
-#include "stack.h"
 
 #define N_HEURISTICS (sizeof(heuristics) / sizeof(heuristics[0]))
 
+// Most edge and face cubies one heuristic tracks
+#define MAX_HEURISTIC_CUBIES 5
+
+// Table entry that generation hasn't reached yet, in byte tables and in
+// packed tables
+#define GEN_UNVISITED 0xFF
+#define GEN_UNVISITED_PACKED 0x3
+
+// `Heuristics_get_dists_bounded()` re-sorts its order after this many prunes
+#define ORDER_SORT_INTERVAL 1024
+
 const char FILENAME_FORMAT[] = "heuristics/%s.ht";
+const char CHECKPOINT_FILENAME_FORMAT[] = "heuristics/%s.ht.ckpt";
+
+// Checkpoint files start with this, then a `GenCheckpoint`, then the table
+static const char CHECKPOINT_MAGIC[8] = "MXCKPT03";
+
+// Heuristic files start with a `HeuristicFileHeader`, padded with zeros to
+// `HEURISTIC_HEADER_SIZE` bytes, which keeps the table page aligned when
+// mapped. Files from before there was a header are just the table.
+static const char HEURISTIC_FILE_MAGIC[8] = "MIXUPHT\0";
+#define HEURISTIC_FILE_VERSION 1
+#define HEURISTIC_HEADER_SIZE 4096
+
+typedef struct {
+    char magic[8];
+    uint32_t version;       // HEURISTIC_FILE_VERSION
+    uint32_t hash_version;  // `Heuristic.hash_version` it was generated with
+    char name[32];
+    uint32_t encoding;      // A `HeuristicEncoding`
+    uint32_t n_turns;       // Size of the move set it was generated with
+    uint64_t size;          // Number of entries
+    uint64_t checksum;      // `table_checksum()` of the encoded entries
+} HeuristicFileHeader;
 
 typedef struct {
     const char* name;
 
     // Hash values must be in the range 0 to size-1. The hash function must
     // have zero collisions and cover the entire range without any holes (or
-    // else the table generation will never stop searching for the last hash
-    // value).
+    // else the table generation fails when it can't reach the last hash
+    // values).
     uint64_t (*hash_func)(const Cube* cube);
     uint64_t size;
 
-    // Optimizations should only be enabled after it has been shown they do not
-    // affect the resulting table at all.
-    bool instack_optimization;
-    bool valid_turns_optimization;
+    // Same as `hash_func`, but computed from coordinates. Must always agree
+    // with `hash_func`.
+    uint64_t (*coord_hash_func)(const Coords* coords);
+
+    // The inverse of `coord_hash_func`: sets the coordinates that the hash
+    // covers, leaving the rest untouched.
+    void (*unhash_func)(uint64_t hash, Coords* coords);
+
+    // Stored in generated files. Increment whenever the hash function or the
+    // solved states a table is generated from change, so tables generated
+    // with the old ones aren't loaded.
+    uint32_t hash_version;
+
+    // The edge or face cubies the hash tracks, or NULL if it tracks
+    // corners. Only tables of edges and faces are looked up through
+    // symmetries.
+    const uint8_t* cubies;
+    int n_cubies;
+
+    // The states the table gives the distance to
+    HeuristicGoal goal;
 
 } Heuristic;
 
+// Where table generation is at after finishing a level
+typedef struct {
+    uint64_t size;
+    uint64_t packed;  // Whether the table is packed, see `gen_table_size()`
+    uint64_t depth;   // The next depth to search
+    uint64_t n_visited;
+    uint64_t n_frontier;
+} GenCheckpoint;
+
+// One thread's share of a level of table generation
+typedef struct {
+    const Heuristic* h;
+    uint8_t* table;
+    bool packed;
+    int depth;
+    bool backwards;
+    uint64_t start;  // Range of table entries to scan
+    uint64_t end;
+
+    uint64_t n_new;  // Entries set to `depth+1`
+    bool error;
+    pthread_t thread;
+} GenTableRange;
+
 // Private Prototypes
 static const Heuristic* Heuristic_get_by_name(const char* name);
 static char* Heuristic_get_filename(const char* name);
-static uint8_t* Heuristic_gen_table(const Heuristic* h);
+static uint8_t* Heuristic_gen_table(const Heuristic* h, bool packed,
+                                    int n_threads,
+                                    const char* checkpoint_filename,
+                                    bool resume);
+static uint64_t gen_table_size(uint64_t size, bool packed);
+static inline uint8_t gen_get(const uint8_t* table, bool packed, uint64_t i);
+static inline bool gen_visit(uint8_t* table, bool packed, uint64_t i,
+                             int depth);
+static uint64_t gen_visit_solved(const Heuristic* h, uint8_t* table,
+                                 bool packed);
+static bool save_checkpoint(const char* filename, const GenCheckpoint* ckpt,
+                            const uint8_t* table);
+static bool load_checkpoint(const char* filename, GenCheckpoint* ckpt,
+                            uint8_t* table, uint64_t size, bool packed);
+static char* format_filename(const char* format, const char* name);
+static bool read_header(const Heuristic* h, const char* filename,
+                        const uint8_t* data, uint64_t file_size,
+                        HeuristicFileHeader* header);
+static uint64_t table_checksum(const uint8_t* table, uint64_t size);
+static void* validate_table(void* arg);
+static void free_table(HeuristicTable* t);
+static uint32_t cubies_to_pieces(const uint8_t* cubies, int n_cubies);
+static bool pieces_covered(const Heuristics* loaded, uint32_t pieces);
+static void add_symmetries(Heuristics* loaded, const HeuristicTable* t);
+static void* gen_table_range(void* arg);
+static uint64_t encoded_size(uint64_t size, HeuristicEncoding encoding);
+static uint8_t* encode_table(const uint8_t* table, uint64_t size,
+                             HeuristicEncoding encoding);
+static inline uint8_t HeuristicTable_get(const HeuristicTable* t,
+                                         uint64_t hash);
+static inline uint8_t HeuristicTable_get_dist(const HeuristicTable* t,
+                                              const Coords* coords,
+                                              const uint8_t* parent_dist);
+static inline const Coords* symmetric_coords(const HeuristicTable* t,
+                                             const Coords* coords,
+                                             Coords* symmetric,
+                                             bool* converted);
+static void sort_order(HeuristicsOrder* order);
+static uint8_t HeuristicTable_get_dual_dist(const HeuristicTable* t,
+                                           const Coords* inverse);
+static bool HeuristicTable_is_solved(const HeuristicTable* t,
+                                     const Coords* coords);
+static uint8_t HeuristicTable_walk_dist(const HeuristicTable* t,
+                                        const Coords* coords);
+static void load_resident();
 static uint64_t hash_corners(const Cube* cube);
 static uint64_t hash_edges_1(const Cube* cube);
 static uint64_t hash_edges_2(const Cube* cube);
@@ -43,8 +170,47 @@ static uint64_t hash_edges_5(const Cube* cube);
 static uint64_t hash_edges_6(const Cube* cube);
 static uint64_t hash_faces1(const Cube* cube);
 static uint64_t hash_faces2(const Cube* cube);
-
-// Stores all available heuristics
+static uint64_t hash_pieces_1(const Cube* cube);
+static uint64_t hash_pieces_2(const Cube* cube);
+static uint64_t hash_shape(const Cube* cube);
+static uint64_t coord_hash_corners(const Coords* coords);
+static uint64_t coord_hash_edges_1(const Coords* coords);
+static uint64_t coord_hash_edges_2(const Coords* coords);
+static uint64_t coord_hash_edges_3(const Coords* coords);
+static uint64_t coord_hash_edges_4(const Coords* coords);
+static uint64_t coord_hash_edges_5(const Coords* coords);
+static uint64_t coord_hash_edges_6(const Coords* coords);
+static uint64_t coord_hash_faces1(const Coords* coords);
+static uint64_t coord_hash_faces2(const Coords* coords);
+static uint64_t coord_hash_pieces_1(const Coords* coords);
+static uint64_t coord_hash_pieces_2(const Coords* coords);
+static uint64_t coord_hash_shape(const Coords* coords);
+static void unhash_corners(uint64_t hash, Coords* coords);
+static void unhash_edges_1(uint64_t hash, Coords* coords);
+static void unhash_edges_2(uint64_t hash, Coords* coords);
+static void unhash_edges_3(uint64_t hash, Coords* coords);
+static void unhash_edges_4(uint64_t hash, Coords* coords);
+static void unhash_edges_5(uint64_t hash, Coords* coords);
+static void unhash_edges_6(uint64_t hash, Coords* coords);
+static void unhash_faces1(uint64_t hash, Coords* coords);
+static void unhash_faces2(uint64_t hash, Coords* coords);
+static void unhash_pieces_1(uint64_t hash, Coords* coords);
+static void unhash_pieces_2(uint64_t hash, Coords* coords);
+static void unhash_shape(uint64_t hash, Coords* coords);
+
+static const uint8_t edges_1_cubies[4] = {CUBIE_U, CUBIE_UF, CUBIE_DR, CUBIE_BL};
+static const uint8_t edges_2_cubies[4] = {CUBIE_L, CUBIE_FL, CUBIE_UR, CUBIE_DB};
+static const uint8_t edges_3_cubies[4] = {CUBIE_D, CUBIE_DF, CUBIE_UL, CUBIE_BR};
+static const uint8_t edges_4_cubies[4] = {CUBIE_R, CUBIE_FR, CUBIE_DL, CUBIE_UB};
+static const uint8_t edges_5_cubies[4] = {CUBIE_F, CUBIE_DF, CUBIE_FR, CUBIE_UL};
+static const uint8_t edges_6_cubies[4] = {CUBIE_B, CUBIE_UB, CUBIE_BR, CUBIE_DL};
+static const uint8_t faces1_cubies[4] = {CUBIE_U, CUBIE_D, CUBIE_L, CUBIE_R};
+static const uint8_t faces2_cubies[4] = {CUBIE_U, CUBIE_D, CUBIE_F, CUBIE_B};
+static const uint8_t pieces_1_cubies[5] = {CUBIE_U, CUBIE_F, CUBIE_UF, CUBIE_UL, CUBIE_FR};
+static const uint8_t pieces_2_cubies[5] = {CUBIE_D, CUBIE_B, CUBIE_DB, CUBIE_DR, CUBIE_BL};
+
+// Stores all available heuristics. Checksums are of the tables generated
+// with `HEURISTIC_ENCODING_BYTE`, not counting the header.
 static const Heuristic heuristics[] = {
 
     // Corner Heuristic
@@ -53,81 +219,182 @@ static const Heuristic heuristics[] = {
     // orientation are determined by the others.
     {
         "corners",
-        // sha1sum: b899ecf20a87dc5366225c6e14b9477b4011bcd955cc89c2dcbb2dfffcb225cf
+        // sha256sum: b899ecf20a87dc5366225c6e14b9477b4011bcd955cc89c2dcbb2dfffcb225cf
         hash_corners,
         (7*6*5*4*3*2) * (3*3*3*3*3*3),  // 7! * 3^6 = 3674160
-        true, true
+        coord_hash_corners,
+        unhash_corners,
+        1,
+        NULL,
+        0,
+        HEURISTIC_GOAL_SOLVED
     },
 
     // Edge Heuristics
-    // Each of these includes 4 edges and one face slot. Some edges are covered
-    // more than once, but each face is covered exactly once.
+    // Each of these tracks where 4 cubies are: 3 edges and one face. Some
+    // edges are covered more than once, but each face is covered exactly
+    // once.
     {
         "edges1",
-        // sha1sum: 7b3bed30fdca80832a682a37df203a8ecbab86911ab51c19cd676804dd88e7b0
+        // sha256sum: 628e1866849cc758db1c929319a13e9aa3e297d108e7ee97b38a4962048370ee
         hash_edges_1,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_edges_1,
+        unhash_edges_1,
+        2,
+        edges_1_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
     {
         "edges2",
+        // sha256sum: 432087218a42b81ec2eee0c516ec6e212375bb87b710390183c3b47fb2f756e1
         hash_edges_2,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_edges_2,
+        unhash_edges_2,
+        2,
+        edges_2_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
     {
         "edges3",
+        // sha256sum: 8def951013ae3b6847293b59d22257c187ad1256e0dc30b79fc9b23e58b1071d
         hash_edges_3,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_edges_3,
+        unhash_edges_3,
+        2,
+        edges_3_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
     {
         "edges4",
+        // sha256sum: af8cc7b24728d63c3d2ffc3c79bcb444b850bbf2ed908bef421925e3336b3519
         hash_edges_4,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_edges_4,
+        unhash_edges_4,
+        2,
+        edges_4_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
     {
         "edges5",
+        // sha256sum: 22cf38e91f275b4f3096d9d01e35939d775130ecd883c3e061578ef23be60838
         hash_edges_5,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_edges_5,
+        unhash_edges_5,
+        2,
+        edges_5_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
     {
         "edges6",
+        // sha256sum: 1a03684c23f1405e6fda90b828df4a44ac58f3e3d227ba2392a9384671486de4
         hash_edges_6,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_edges_6,
+        unhash_edges_6,
+        2,
+        edges_6_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
 
     // Faces
     // Numbers are the same as edges, but only faces are included.
     {
         "faces1",
+        // sha256sum: 1ebf13ca34c43d8d512b99f939b2dcff2f6e9dcc3b4f05c3195ce7edb90f99ae
         hash_faces1,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_faces1,
+        unhash_faces1,
+        2,
+        faces1_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
     },
     {
         "faces2",
+        // sha256sum: fc2e27261c4cc75df81eb632b753e507a20c7641afcfdc8649696df621329bde
         hash_faces2,
         (18*17*16*15) * 4*4*4*4,  // 18! / 14! * 4^4 = 18800640
-        false, false
+        coord_hash_faces2,
+        unhash_faces2,
+        2,
+        faces2_cubies,
+        4,
+        HEURISTIC_GOAL_SOLVED
+    },
+
+    // Larger Edge and Face Heuristics
+    // Each of these tracks where 5 cubies are: 3 edges and 2 faces around
+    // one of the two corners on the diagonal the cube's symmetries keep in
+    // place. Looked up through the symmetries, each gives 6 different sets of
+    // pieces, and the two cover every edge and face. Generating one a byte
+    // per entry takes 1 GB of memory, so these are meant to be generated with
+    // the mod3 encoding, which takes a quarter of that. Checksums are of the
+    // mod3 tables.
+    {
+        "pieces1",
+        // sha256sum: 5722cc80c2a91ce58015613e472b0910aa13f6cb5a05710cedc87ee22f412b07
+        hash_pieces_1,
+        (18*17*16*15*14) * 4*4*4*4*4,  // 18! / 13! * 4^5 = 1052835840
+        coord_hash_pieces_1,
+        unhash_pieces_1,
+        2,
+        pieces_1_cubies,
+        5,
+        HEURISTIC_GOAL_SOLVED
+    },
+    {
+        "pieces2",
+        // sha256sum: 36c7704faa27ba0a3ba9921d5b5ba0de308608179cb720be57bb1e1435056d3e
+        hash_pieces_2,
+        (18*17*16*15*14) * 4*4*4*4*4,  // 18! / 13! * 4^5 = 1052835840
+        coord_hash_pieces_2,
+        unhash_pieces_2,
+        2,
+        pieces_2_cubies,
+        5,
+        HEURISTIC_GOAL_SOLVED
+    },
+
+    // Shape Heuristic
+    // Which slots hold faces instead of edges, and which edges are turned 90
+    // degrees. This is all that decides whether the puzzle is a cube shape,
+    // so the distance is exact for `Cube_solve_to_cube_shape()`. It is also
+    // a lower bound for solving, since a solved cube is a cube shape.
+    {
+        "shape",
+        // sha256sum: 134b806b4f37402eb2c9367761969a62b3084f93184f76e12b91f4333b361da4
+        hash_shape,
+        18564 * 4096,  // 18 choose 6 * 2^12 = 76038144
+        coord_hash_shape,
+        unhash_shape,
+        1,
+        NULL,
+        0,
+        HEURISTIC_GOAL_CUBE_SHAPE
     }
 };
 
-// Stores loaded heuristics
-static struct {
-    uint64_t (*hash_func)(const Cube* cube);
-    uint64_t size;
-    uint8_t* table;
-} active[N_HEURISTICS];
-static int n_active;
+// Loaded by the first call to `Heuristics_get_resident()`, never freed.
+static Heuristics* resident;
+static pthread_once_t resident_once = PTHREAD_ONCE_INIT;
 
 
 /***** Public Functions *****/
 
-bool Heuristic_generate(const char* name) {
+bool Heuristic_generate(const char* name, HeuristicEncoding encoding,
+                        int n_threads, bool resume) {
     const Heuristic* h = Heuristic_get_by_name(name);
     if(h == NULL) {
         fprintf(stderr, "Error: No heuristic by name \"%s\"\n", name);
@@ -136,12 +403,32 @@ bool Heuristic_generate(const char* name) {
 
     // Generate
     char* filename = Heuristic_get_filename(name);
+    char* checkpoint_filename = format_filename(CHECKPOINT_FILENAME_FORMAT,
+                                                name);
     printf("Generating %s\n", filename);
-    uint8_t* table = Heuristic_gen_table(h);
+    fflush(stdout);
+    if(n_threads <= 0) {
+        n_threads = sysconf(_SC_NPROCESSORS_ONLN);
+    }
+    // Mod 3 tables are generated packed, already in their encoding
+    bool packed = encoding == HEURISTIC_ENCODING_MOD3;
+    uint8_t* table = Heuristic_gen_table(h, packed, n_threads,
+                                         checkpoint_filename, resume);
     if(table == NULL) {
         free(filename);
+        free(checkpoint_filename);
         return false;
     }
+    if(!packed && encoding != HEURISTIC_ENCODING_BYTE) {
+        uint8_t* encoded = encode_table(table, h->size, encoding);
+        free(table);
+        if(encoded == NULL) {
+            free(filename);
+            free(checkpoint_filename);
+            return false;
+        }
+        table = encoded;
+    }
 
     // Save to file
     FILE* fp = fopen(filename, "w");
@@ -149,33 +436,88 @@ bool Heuristic_generate(const char* name) {
         fprintf(stderr, "Error: Could not open heuristic file \"%s\" for writing.\n",
                 filename);
         free(filename);
+        free(checkpoint_filename);
         free(table);
         return false;
     }
-    if(fwrite(table, sizeof(uint8_t)*h->size, 1, fp) != 1) {
+    uint8_t header_buffer[HEURISTIC_HEADER_SIZE] = {0};
+    HeuristicFileHeader header;
+    memset(&header, 0, sizeof(header));
+    memcpy(header.magic, HEURISTIC_FILE_MAGIC, sizeof(header.magic));
+    header.version = HEURISTIC_FILE_VERSION;
+    header.hash_version = h->hash_version;
+    strncpy(header.name, h->name, sizeof(header.name)-1);
+    header.encoding = encoding;
+    header.n_turns = N_TURN_TYPES;
+    header.size = h->size;
+    header.checksum = table_checksum(table, encoded_size(h->size, encoding));
+    memcpy(header_buffer, &header, sizeof(header));
+
+    bool written =
+        fwrite(header_buffer, sizeof(header_buffer), 1, fp) == 1 &&
+        fwrite(table, encoded_size(h->size, encoding), 1, fp) == 1;
+    if(fclose(fp) != 0 || !written) {
         fprintf(stderr, "Error: Write to heuristic file \"%s\" failed.\n",
                 filename);
-        fclose(fp);
         free(filename);
+        free(checkpoint_filename);
         free(table);
         return false;
     }
-    fclose(fp);
+
+    // The table is safely written, the checkpoint isn't needed anymore.
+    remove(checkpoint_filename);
 
     free(filename);
+    free(checkpoint_filename);
     free(table);
     return true;
 }
 
-bool Heuristic_load(const char* name) {
+uint64_t Heuristic_get_size(const char* name) {
+    const Heuristic* h = Heuristic_get_by_name(name);
+    return h ? h->size : 0;
+}
+
+uint64_t Heuristic_get_hash(const char* name, const Cube* cube) {
+    const Heuristic* h = Heuristic_get_by_name(name);
+    assert(h);
+    return h->hash_func(cube);
+}
+
+Heuristics* Heuristics_new() {
+    assert(N_HEURISTICS * N_SYMMETRIES <= HEURISTICS_MAX_TABLES);
+    Heuristics* loaded = (Heuristics*) malloc(sizeof(Heuristics));
+    loaded->n_tables = 0;
+    loaded->hugepages = false;
+    loaded->validation = HEURISTIC_VALIDATE_BACKGROUND;
+    loaded->symmetries = false;
+    loaded->dual = false;
+    loaded->validated = true;
+    pthread_mutex_init(&loaded->validation_lock, NULL);
+    loaded->tables = (HeuristicTable*) calloc(HEURISTICS_MAX_TABLES,
+                                              sizeof(HeuristicTable));
+    return loaded;
+}
+
+bool Heuristic_load(Heuristics* loaded, const char* name) {
     const Heuristic* h = Heuristic_get_by_name(name);
     if(h == NULL) {
         return false;
     }
+    for(int i=0; i<loaded->n_tables; i++) {
+        if(loaded->tables[i].hash_func == h->hash_func) {
+            return true;  // Already loaded
+        }
+    }
+    uint32_t pieces = cubies_to_pieces(h->cubies, h->n_cubies);
+    if(loaded->symmetries && pieces && pieces_covered(loaded, pieces)) {
+        return true;  // Already looked up through a symmetry of another table
+    }
     char* filename = Heuristic_get_filename(name);
 
-    FILE* fp = fopen(filename, "r");
-    if (fp == NULL) {
+    int fd = open(filename, O_RDONLY);
+    if (fd == -1) {
         fprintf(stderr, "Heuristic file not found: \"%s\"\n", filename);
         free(filename);
         static bool hinted = false;
@@ -186,52 +528,306 @@ bool Heuristic_load(const char* name) {
         }
         return false;
     }
-    uint8_t* table = (uint8_t*) malloc(sizeof(uint8_t)*h->size);
-    if (fread(table, sizeof(uint8_t)*h->size, 1, fp) != 1) {
+    struct stat st;
+    if (fstat(fd, &st) != 0) {
         fprintf(stderr, "Error: Read from heuristic file \"%s\" failed.\n",
                 filename);
         free(filename);
-        fclose(fp);
+        close(fd);
         return false;
     }
-    free(filename);
-    fclose(fp);
 
-    // Save into `active`
-    active[n_active].hash_func = h->hash_func;
-    active[n_active].size = h->size;
-    active[n_active].table = table;
-    n_active++;
+    uint64_t file_size = st.st_size;
+
+    // Map the file instead of reading it, so every process solving on this
+    // machine shares the same pages from the page cache, and pages are only
+    // read from disk as they are first looked up.
+    bool mapped = true;
+    uint8_t* data = mmap(NULL, file_size, PROT_READ, MAP_SHARED, fd, 0);
+    if (data == MAP_FAILED) {
+        // Some filesystems can't be mapped, read a private copy instead.
+        mapped = false;
+        data = (uint8_t*) malloc(sizeof(uint8_t)*file_size);
+        if (pread(fd, data, file_size, 0) != (ssize_t) file_size) {
+            fprintf(stderr, "Error: Read from heuristic file \"%s\" failed.\n",
+                    filename);
+            free(filename);
+            free(data);
+            close(fd);
+            return false;
+        }
+    }
+#ifdef MADV_HUGEPAGE
+    if (mapped && loaded->hugepages) {
+        // Only a hint, it's fine if the kernel or filesystem ignores it.
+        madvise(data, file_size, MADV_HUGEPAGE);
+    }
+#endif
+    close(fd);
+
+    HeuristicTable* t = &loaded->tables[loaded->n_tables];
+    t->name = h->name;
+    t->hash_func = h->hash_func;
+    t->coord_hash_func = h->coord_hash_func;
+    t->size = h->size;
+    t->goal = h->goal;
+    t->data = data;
+    t->data_size = file_size;
+    t->mapped = mapped;
+    t->solved_hash = h->hash_func(&solved_state);
+    t->symmetry = 0;
+    t->pieces = pieces;
+    t->shared = false;
+    t->validating = false;
+
+    HeuristicFileHeader header;
+    if(!read_header(h, filename, data, file_size, &header)) {
+        free_table(t);
+        free(filename);
+        return false;
+    }
+    t->encoding = header.encoding;
+    t->table = data + (header.version ? HEURISTIC_HEADER_SIZE : 0);
+    t->checksum = header.checksum;
+    t->valid = true;
+
+    if(header.version && loaded->validation == HEURISTIC_VALIDATE_FULL) {
+        validate_table(t);
+        if(!t->valid) {
+            fprintf(stderr, "Error: Heuristic file \"%s\" is corrupt. "
+                    "Regenerate it with generate_heuristics.py.\n", filename);
+            free_table(t);
+            free(filename);
+            return false;
+        }
+    }
+    free(filename);
+    loaded->n_tables++;
 
+    // Copied before the validator starts, since it writes to `t`
+    if(loaded->symmetries && pieces) {
+        add_symmetries(loaded, t);
+    }
+    if(header.version && loaded->validation == HEURISTIC_VALIDATE_BACKGROUND) {
+        t->validating = true;
+        loaded->validated = false;
+        pthread_create(&t->validator, NULL, validate_table, t);
+    }
     return true;
 }
 
-void Heuristics_load_all() {
+void Heuristics_load_all(Heuristics* loaded) {
     for(int i=0; i<N_HEURISTICS; i++) {
-        Heuristic_load(heuristics[i].name);
+        Heuristic_load(loaded, heuristics[i].name);
+    }
+}
+
+const Heuristics* Heuristics_get_resident() {
+    pthread_once(&resident_once, load_resident);
+    return resident;
+}
+
+void Heuristics_free(Heuristics* loaded) {
+    for(int i=0; i<loaded->n_tables; i++) {
+        free_table(&loaded->tables[i]);
     }
+    pthread_mutex_destroy(&loaded->validation_lock);
+    free(loaded->tables);
+    free(loaded);
 }
 
-void Heuristics_unload_all() {
-    for(int i=0; i<n_active; i++) {
-        active[i].hash_func = NULL;
-        active[i].size = 0;
-        free(active[i].table);
-        active[i].table = NULL;
+void Heuristics_validate(const Heuristics* loaded) {
+    if(__atomic_load_n(&loaded->validated, __ATOMIC_ACQUIRE)) {
+        return;
+    }
+
+    // This is the only time a set changes after loading. The first solve
+    // to get here does it, and any others wait for it.
+    Heuristics* h = (Heuristics*) loaded;
+    pthread_mutex_lock(&h->validation_lock);
+    if(!h->validated) {
+        for(int i=0; i<h->n_tables; i++) {
+            HeuristicTable* t = &h->tables[i];
+            if(t->validating) {
+                pthread_join(t->validator, NULL);
+                t->validating = false;
+            }
+        }
+
+        // Symmetries of a table come after it, and share its fate
+        for(int i=0; i<h->n_tables; i++) {
+            HeuristicTable* t = &h->tables[i];
+            for(int j=0; t->shared && j<i; j++) {
+                if(!h->tables[j].shared && h->tables[j].data == t->data) {
+                    t->valid = h->tables[j].valid;
+                }
+            }
+        }
+
+        int n_valid = 0;
+        for(int i=0; i<h->n_tables; i++) {
+            HeuristicTable* t = &h->tables[i];
+            if(t->valid) {
+                h->tables[n_valid++] = *t;
+            } else {
+                if(!t->shared) {
+                    fprintf(stderr, "Error: Heuristic table \"%s\" is "
+                            "corrupt, not using it. Regenerate it with "
+                            "generate_heuristics.py.\n", t->name);
+                }
+                free_table(t);
+            }
+        }
+        h->n_tables = n_valid;
+        __atomic_store_n(&h->validated, true, __ATOMIC_RELEASE);
     }
-    n_active = 0;
+    pthread_mutex_unlock(&h->validation_lock);
 }
 
 
-uint8_t Heuristics_get_dist(const Cube* cube) {
+uint8_t Heuristics_get_dist(const Heuristics* loaded, const Cube* cube) {
+    Coords coords;
+    Coords_from_cube(&coords, cube);
+    return Heuristics_get_dist_coords(loaded, &coords);
+}
+
+uint8_t Heuristics_get_dist_coords(const Heuristics* loaded,
+                                   const Coords* coords) {
+    uint8_t dist = Heuristics_get_dists_coords(loaded, HEURISTIC_GOAL_SOLVED,
+                                               coords, NULL, NULL);
+    if(loaded->dual) {
+        uint8_t dual = Heuristics_get_dual_dist_coords(loaded, coords);
+        if(dual > dist) {
+            dist = dual;
+        }
+    }
+    return dist;
+}
+
+uint8_t Heuristics_get_dists_coords(const Heuristics* loaded,
+                                    HeuristicGoal goal,
+                                    const Coords* coords,
+                                    const uint8_t* parent_dists,
+                                    uint8_t* dists) {
     uint8_t dist, max_dist = 0;
-    for(int i=0; i<n_active; i++) {
+    Coords symmetric[N_SYMMETRIES];
+    bool converted[N_SYMMETRIES] = {false};
+    for(int i=0; i<loaded->n_tables; i++) {
+        const HeuristicTable* t = &loaded->tables[i];
+        if(t->goal != goal && t->goal != HEURISTIC_GOAL_CUBE_SHAPE) {
+            continue;
+        }
 
-        dist = active[i].table[active[i].hash_func(cube)];
+        const Coords* lookup = symmetric_coords(t, coords, symmetric,
+                                                converted);
+        dist = HeuristicTable_get_dist(t, lookup,
+                                       parent_dists ? &parent_dists[i] : NULL);
+        if(dists) {
+            dists[i] = dist;
+        }
+        if(dist > max_dist) {
+            max_dist = dist;
+        }
+
+    }
+    return max_dist;
+}
+
+void HeuristicsOrder_init(HeuristicsOrder* order, const Heuristics* loaded,
+                          HeuristicGoal goal) {
+    order->n_tables = 0;
+    for(int i=0; i<loaded->n_tables; i++) {
+        HeuristicGoal table_goal = loaded->tables[i].goal;
+        if(table_goal == goal || table_goal == HEURISTIC_GOAL_CUBE_SHAPE) {
+            order->tables[order->n_tables++] = i;
+        }
+        order->prunes[i] = 0;
+    }
+    order->prunes_since_sort = 0;
+}
+
+uint8_t Heuristics_get_dists_bounded(const Heuristics* loaded,
+                                     HeuristicsOrder* order,
+                                     const Coords* coords,
+                                     const uint8_t* parent_dists,
+                                     uint8_t* dists,
+                                     int bound) {
+    uint8_t dist, max_dist = 0;
+    Coords symmetric[N_SYMMETRIES];
+    bool converted[N_SYMMETRIES] = {false};
+    for(int j=0; j<order->n_tables; j++) {
+        int i = order->tables[j];
+        const HeuristicTable* t = &loaded->tables[i];
+        const Coords* lookup = symmetric_coords(t, coords, symmetric,
+                                                converted);
+        dist = HeuristicTable_get_dist(t, lookup, &parent_dists[i]);
+        dists[i] = dist;
+        if(dist > bound) {
+            order->prunes[i]++;
+            if(++order->prunes_since_sort == ORDER_SORT_INTERVAL) {
+                sort_order(order);
+            }
+            return dist;
+        }
         if(dist > max_dist) {
             max_dist = dist;
         }
+    }
+    return max_dist;
+}
+
+void Heuristics_prefetch(const Heuristics* loaded,
+                         const HeuristicsOrder* order,
+                         const Coords* coords) {
+    if(order->n_tables == 0) {
+        return;
+    }
+    const HeuristicTable* t = &loaded->tables[order->tables[0]];
+    Coords symmetric;
+    const Coords* lookup = coords;
+    if(t->symmetry) {
+        Coords_symmetry(&symmetric, coords, t->symmetry);
+        lookup = &symmetric;
+    }
+    uint64_t hash = t->coord_hash_func(lookup);
+    switch(t->encoding) {
+        case HEURISTIC_ENCODING_NIBBLE:
+            hash /= 2;
+            break;
+        case HEURISTIC_ENCODING_MOD3:
+            hash /= 4;
+            break;
+        default:
+            break;
+    }
+    __builtin_prefetch(&t->table[hash]);
+}
+
+uint8_t Heuristics_get_dual_dist_coords(const Heuristics* loaded,
+                                        const Coords* coords) {
+    uint8_t dist, max_dist = 0;
+    Coords inverse;
+    Coords symmetric[N_SYMMETRIES];
+    bool converted[N_SYMMETRIES] = {false};
+    bool inverted = false;
+    for(int i=0; i<loaded->n_tables; i++) {
+        const HeuristicTable* t = &loaded->tables[i];
+        if(t->goal != HEURISTIC_GOAL_SOLVED ||
+                t->encoding == HEURISTIC_ENCODING_MOD3) {
+            continue;
+        }
 
+        // Only inverted once there's a table to look it up in
+        if(!inverted) {
+            Coords_inverse(&inverse, coords);
+            inverted = true;
+        }
+        const Coords* lookup = symmetric_coords(t, &inverse, symmetric,
+                                                converted);
+        dist = HeuristicTable_get_dual_dist(t, lookup);
+        if(dist > max_dist) {
+            max_dist = dist;
+        }
     }
     return max_dist;
 }
@@ -239,6 +835,208 @@ uint8_t Heuristics_get_dist(const Cube* cube) {
 
 /***** Private Functions *****/
 
+static uint64_t encoded_size(uint64_t size, HeuristicEncoding encoding) {
+    switch(encoding) {
+        case HEURISTIC_ENCODING_NIBBLE:
+            return (size + 1) / 2;
+        case HEURISTIC_ENCODING_MOD3:
+            return (size + 3) / 4;
+        default:
+            return size;
+    }
+}
+
+/**
+ * Packs a table of one byte per entry into `encoding`. Returns NULL if a
+ * distance doesn't fit.
+ */
+static uint8_t* encode_table(const uint8_t* table, uint64_t size,
+                             HeuristicEncoding encoding) {
+    uint8_t* encoded = (uint8_t*) calloc(encoded_size(size, encoding),
+                                         sizeof(uint8_t));
+    for(uint64_t i=0; i<size; i++) {
+        if(encoding == HEURISTIC_ENCODING_NIBBLE) {
+            if(table[i] > 15) {
+                fprintf(stderr, "Error: Distance %d does not fit in 4 bits.\n",
+                        table[i]);
+                free(encoded);
+                return NULL;
+            }
+            encoded[i/2] |= table[i] << (i%2)*4;
+        } else {
+            encoded[i/4] |= (table[i] % 3) << (i%4)*2;
+        }
+    }
+    return encoded;
+}
+
+/**
+ * Returns the stored entry for `hash`. For mod 3 tables, this is the distance
+ * mod 3.
+ */
+static inline uint8_t HeuristicTable_get(const HeuristicTable* t,
+                                         uint64_t hash) {
+    switch(t->encoding) {
+        case HEURISTIC_ENCODING_NIBBLE:
+            return (t->table[hash/2] >> (hash%2)*4) & 0xF;
+        case HEURISTIC_ENCODING_MOD3:
+            return (t->table[hash/4] >> (hash%4)*2) & 0x3;
+        default:
+            return t->table[hash];
+    }
+}
+
+/**
+ * The distance of `inverse`, the inverse state already under the table's
+ * symmetry, for a table that stores exact distances.
+ *
+ * Solving a state with some turns only gets its faces into some orientation.
+ * The inverse of those turns, which the inverse state is a lower bound for,
+ * is the inverse state with whatever sits in the face slots turned the same
+ * way. So the smallest distance over every orientation of the tracked pieces
+ * in face slots is taken.
+ */
+static uint8_t HeuristicTable_get_dual_dist(const HeuristicTable* t,
+                                           const Coords* inverse) {
+    Coords turned = *inverse;
+    int in_face_slots[MAX_HEURISTIC_CUBIES];
+    int n = 0;
+    for(int i=0; i<18; i++) {
+        // The symmetry takes tracked piece i to where the hash reads it
+        int piece = symmetry_piece_table[t->symmetry][i];
+        if(t->pieces & 1 << i && inverse->pieces[piece]/4 >= CUBIE_U-7) {
+            in_face_slots[n++] = piece;
+        }
+    }
+
+    uint8_t min_dist = UINT8_MAX;
+    for(int orients=0; orients < 1 << 2*n; orients++) {
+        for(int j=0; j<n; j++) {
+            uint8_t* piece = &turned.pieces[in_face_slots[j]];
+            *piece = *piece - *piece%4 + ((orients >> 2*j) & 0x3);
+        }
+        uint8_t dist = HeuristicTable_get(t, t->coord_hash_func(&turned));
+        if(dist < min_dist) {
+            min_dist = dist;
+        }
+    }
+    return min_dist;
+}
+
+/**
+ * The distance of `coords`, already under the table's symmetry. Mod 3 tables
+ * need `parent_dist`, the table's distance for a state one turn away, or walk
+ * to the solved state without it.
+ */
+static inline uint8_t HeuristicTable_get_dist(const HeuristicTable* t,
+                                              const Coords* coords,
+                                              const uint8_t* parent_dist) {
+    if(t->encoding != HEURISTIC_ENCODING_MOD3) {
+        return HeuristicTable_get(t, t->coord_hash_func(coords));
+    } else if(parent_dist) {
+        // The distance is one of parent-1, parent or parent+1, which all
+        // have a different value mod 3.
+        uint8_t parent = *parent_dist;
+        uint8_t mod3 = HeuristicTable_get(t, t->coord_hash_func(coords));
+        return parent - 1 + (mod3 + 4 - parent%3) % 3;
+    } else {
+        return HeuristicTable_walk_dist(t, coords);
+    }
+}
+
+/**
+ * Returns `coords` as table `t` looks it up. Each symmetry is applied once,
+ * into `symmetric`, for all tables that need it, and `converted` marks which
+ * have been.
+ */
+static inline const Coords* symmetric_coords(const HeuristicTable* t,
+                                             const Coords* coords,
+                                             Coords* symmetric,
+                                             bool* converted) {
+    if(!t->symmetry) {
+        return coords;
+    }
+    if(!converted[t->symmetry]) {
+        Coords_symmetry(&symmetric[t->symmetry], coords, t->symmetry);
+        converted[t->symmetry] = true;
+    }
+    return &symmetric[t->symmetry];
+}
+
+/**
+ * Sorts the tables of `order` by how many states they've pruned, most first,
+ * and halves the counts. An insertion sort, since the order barely changes
+ * from one sort to the next.
+ */
+static void sort_order(HeuristicsOrder* order) {
+    for(int j=1; j<order->n_tables; j++) {
+        uint8_t table = order->tables[j];
+        int k = j;
+        while(k > 0 &&
+                order->prunes[order->tables[k-1]] < order->prunes[table]) {
+            order->tables[k] = order->tables[k-1];
+            k--;
+        }
+        order->tables[k] = table;
+    }
+    for(int j=0; j<order->n_tables; j++) {
+        order->prunes[order->tables[j]] /= 2;
+    }
+    order->prunes_since_sort = 0;
+}
+
+/**
+ * Whether table `t` gives `coords` a distance of 0: whether it's solved, in
+ * the pieces the table tracks, with faces in any orientation (see
+ * `gen_visit_solved()`).
+ */
+static bool HeuristicTable_is_solved(const HeuristicTable* t,
+                                     const Coords* coords) {
+    Coords solved = *coords;
+    for(int i=CUBIE_U-7; i<18; i++) {
+        solved.pieces[i] -= solved.pieces[i] % 4;
+    }
+    return t->coord_hash_func(&solved) == t->solved_hash;
+}
+
+/**
+ * Finds the exact distance of a mod 3 table with no neighboring distance to
+ * go from. Any state but a solved one has a neighbor one turn closer, whose
+ * entry is one less mod 3, so keep turning to such a neighbor and count the
+ * turns until a solved state is reached.
+ */
+static uint8_t HeuristicTable_walk_dist(const HeuristicTable* t,
+                                        const Coords* coords) {
+    Coords current = *coords, next;
+    uint64_t hash = t->coord_hash_func(&current);
+    uint8_t dist = 0;
+
+    Coords_init();
+    while(!HeuristicTable_is_solved(t, &current)) {
+        uint8_t closer = (HeuristicTable_get(t, hash) + 2) % 3;
+        int turn;
+        for(turn=0; turn<N_TURN_TYPES; turn++) {
+            Coords_turn(&next, &current, turn);
+            hash = t->coord_hash_func(&next);
+            if(HeuristicTable_get(t, hash) == closer) {
+                break;
+            }
+        }
+        if(turn == N_TURN_TYPES) {
+            fprintf(stderr, "Error: Heuristic table is inconsistent.\n");
+            return dist;
+        }
+        current = next;
+        dist++;
+    }
+    return dist;
+}
+
+static void load_resident() {
+    resident = Heuristics_new();
+    Heuristics_load_all(resident);
+}
+
 static const Heuristic* Heuristic_get_by_name(const char* name) {
     for(int i=0; i<N_HEURISTICS; i++) {
         if(strcmp(name, heuristics[i].name) == 0) {
@@ -250,110 +1048,463 @@ static const Heuristic* Heuristic_get_by_name(const char* name) {
 }
 
 static char* Heuristic_get_filename(const char* name) {
-    int length = strlen(name)+strlen(FILENAME_FORMAT);
-    char* filename = malloc(sizeof(char)*length);
-    snprintf(filename, length, FILENAME_FORMAT, name);
-    return filename;
+    return format_filename(FILENAME_FORMAT, name);
 }
 
-static uint8_t* Heuristic_gen_table(const Heuristic* h) {
-    Cube cube, tmp_cube;
-    int depth, turn, n_visited=0;
-    uint64_t hash;
-    uint8_t* table = (uint8_t*) calloc(h->size, sizeof(uint8_t));
-    Stack* stack = Stack_new(1000);
-
-    // Keeps track of which entries in the table are filled
-    bool* visited = (bool*) calloc(h->size, sizeof(bool));
-
-    // At each max_depth, keep track of which hashes have already been visited
-    // and at what depth. We don't have to search further if a cube's hash has
-    // been visited at a lesser depth. This reduces the number of states
-    // searched significantly.
-    //
-    // This works like brownan's Rubik's Cube solver:
-    //     https://github.com/brownan/Rubiks-Cube-Solver/blob/master/cornertable.c#L138
-    uint8_t* instack = NULL;
-    if(h->instack_optimization) {
-        instack = (uint8_t*) calloc(h->size, sizeof(uint8_t));
-    }
-
-    // Figure out which turns actually change the hash value. Only consider
-    // those turns.
-    bool valid_turns[N_TURN_TYPES];
-    if(h->valid_turns_optimization) {
-        for(int i=0; i<N_TURN_TYPES; i++) {
-            Cube_copy(&tmp_cube, &solved_state);
-            Cube_turn(&tmp_cube, i);
-            if(h->hash_func(&tmp_cube) == h->hash_func(&solved_state)) {
-                valid_turns[i] = false;
-            } else {
-                valid_turns[i] = true;
+/**
+ * Reads the header at the start of `data`, the contents of heuristic `h`'s
+ * file, and checks that it matches `h`. Files without a header are told
+ * apart by their size, and are returned with a `version` of 0.
+ *
+ * Returns false, after printing why, if the file can't be used.
+ */
+static bool read_header(const Heuristic* h, const char* filename,
+                        const uint8_t* data, uint64_t file_size,
+                        HeuristicFileHeader* header) {
+    const char* problem = NULL;
+
+    memset(header, 0, sizeof(HeuristicFileHeader));
+    if(file_size < HEURISTIC_HEADER_SIZE ||
+            memcmp(data, HEURISTIC_FILE_MAGIC, sizeof(header->magic)) != 0) {
+        // No header, the size of the file tells which encoding it uses.
+        for(int e=HEURISTIC_ENCODING_BYTE; e<=HEURISTIC_ENCODING_MOD3; e++) {
+            if(file_size == encoded_size(h->size, e)) {
+                header->encoding = e;
+                header->size = h->size;
+                printf("Warning: Heuristic file \"%s\" has no header, so it "
+                       "can't be checked.\n", filename);
+                return true;
             }
         }
+        problem = "it has an unexpected size";
+
+    } else {
+        memcpy(header, data, sizeof(HeuristicFileHeader));
+        if(header->version != HEURISTIC_FILE_VERSION) {
+            problem = "its format version is not supported";
+        } else if(strncmp(header->name, h->name, sizeof(header->name)) != 0) {
+            problem = "it is for a different heuristic";
+        } else if(header->hash_version != h->hash_version) {
+            problem = "it was generated with a different hash function";
+        } else if(header->n_turns != N_TURN_TYPES) {
+            problem = "it was generated with a different set of turns";
+        } else if(header->size != h->size) {
+            problem = "it has the wrong number of entries";
+        } else if(header->encoding > HEURISTIC_ENCODING_MOD3) {
+            problem = "its encoding is not supported";
+        } else if(file_size != HEURISTIC_HEADER_SIZE +
+                               encoded_size(h->size, header->encoding)) {
+            problem = "it is truncated";
+        }
+    }
+
+    if(problem) {
+        fprintf(stderr, "Error: Can't use heuristic file \"%s\", %s. "
+                "Regenerate it with generate_heuristics.py.\n",
+                filename, problem);
+        return false;
+    }
+    return true;
+}
+
+/**
+ * 64 bit FNV-1a, fed 8 bytes at a time to keep up with reading the table.
+ * Words are read in native byte order, like the rest of the file.
+ */
+static uint64_t table_checksum(const uint8_t* table, uint64_t size) {
+    const uint64_t prime = 0x100000001b3ULL;
+    uint64_t hash = 0xcbf29ce484222325ULL;
+    uint64_t i;
+    for(i=0; i+8 <= size; i+=8) {
+        uint64_t word;
+        memcpy(&word, table+i, sizeof(word));
+        hash = (hash ^ word) * prime;
+    }
+    for(; i<size; i++) {
+        hash = (hash ^ table[i]) * prime;
     }
+    return hash;
+}
+
+/**
+ * Checks a loaded table against the checksum from its header, storing the
+ * result in `valid`. Runs on its own thread for background validation.
+ */
+static void* validate_table(void* arg) {
+    HeuristicTable* t = (HeuristicTable*) arg;
+    uint64_t checksum = table_checksum(t->table,
+                                       encoded_size(t->size, t->encoding));
+    t->valid = checksum == t->checksum;
+    return NULL;
+}
+
+static void free_table(HeuristicTable* t) {
+    if(t->shared) {
+        return;  // Freed with the table it shares data with
+    }
+    if(t->validating) {
+        pthread_join(t->validator, NULL);
+        t->validating = false;
+    }
+    if(t->mapped) {
+        munmap(t->data, t->data_size);
+    } else {
+        free(t->data);
+    }
+}
 
-    // Iterative deepening breadth-first search
-    for(int max_depth=0; n_visited < h->size; max_depth++) {
-        printf("%d / %lu\n", n_visited, h->size);
-        printf("Searching Depth %d\n", max_depth);
-        Stack_push(stack, &solved_state, 0, 0);
+/**
+ * Returns which pieces `cubies` are, as in `HeuristicTable.pieces`.
+ */
+static uint32_t cubies_to_pieces(const uint8_t* cubies, int n_cubies) {
+    uint32_t pieces = 0;
+    for(int i=0; i<n_cubies; i++) {
+        pieces |= 1 << (cubies[i]-7);
+    }
+    return pieces;
+}
 
-        if(instack) {
-            memset(instack, 0, h->size*sizeof(uint8_t));
+/**
+ * Returns true if a table in `loaded` already gives the distance of `pieces`.
+ */
+static bool pieces_covered(const Heuristics* loaded, uint32_t pieces) {
+    for(int i=0; i<loaded->n_tables; i++) {
+        if(loaded->tables[i].pieces == pieces) {
+            return true;
         }
+    }
+    return false;
+}
 
-        while(Stack_pop(stack, &cube, &turn, &depth)) {
+/**
+ * Adds a lookup of `t`, which must be loaded already, through each symmetry
+ * that gives pieces no table in `loaded` covers yet.
+ */
+static void add_symmetries(Heuristics* loaded, const HeuristicTable* t) {
+    Coords_init();
+    for(int sym=1; sym<N_SYMMETRIES; sym++) {
+        // A piece is covered if the symmetry takes it to one `t` tracks
+        uint32_t pieces = 0;
+        for(int i=0; i<18; i++) {
+            if(t->pieces & 1 << symmetry_piece_table[sym][i]) {
+                pieces |= 1 << i;
+            }
+        }
+        if(pieces_covered(loaded, pieces)) {
+            continue;
+        }
 
-            hash = h->hash_func(&cube);
-            if(hash >= h->size) {
-                fprintf(stderr, "Error: Hash value too large: %lu\n", hash);
-                if(instack) { free(instack); }
-                free(table);
-                free(visited);
-                return NULL;
+        HeuristicTable* s = &loaded->tables[loaded->n_tables++];
+        *s = *t;
+        s->symmetry = sym;
+        s->pieces = pieces;
+        s->shared = true;
+    }
+}
+
+static char* format_filename(const char* format, const char* name) {
+    int length = strlen(name)+strlen(format);
+    char* filename = malloc(sizeof(char)*length);
+    snprintf(filename, length, format, name);
+    return filename;
+}
+
+/**
+ * Generates a table with a breadth first search over hash values, starting
+ * from every solved state (see `gen_visit_solved()`). Each level is found by scanning the table itself
+ * for entries at the previous depth, so no memory is needed besides the
+ * table. The scan is split into `n_threads` ranges, one per thread.
+ *
+ * A byte table stores the depth of each entry. A `packed` table stores it
+ * mod 3 in 2 bits, the same as `HEURISTIC_ENCODING_MOD3`, which takes a
+ * quarter of the memory and is what makes tables of more than 4 pieces
+ * possible to generate. See `gen_table_range()` for how levels are told
+ * apart.
+ *
+ * After each level, the partial table is saved to `checkpoint_filename`. If
+ * `resume` is set, generation picks up from that checkpoint if there is one.
+ */
+static uint8_t* Heuristic_gen_table(const Heuristic* h, bool packed,
+                                    int n_threads,
+                                    const char* checkpoint_filename,
+                                    bool resume) {
+    GenTableRange ranges[n_threads];
+    GenCheckpoint ckpt;
+    uint64_t n_visited, n_frontier;
+    int start_depth = 0;
+    uint64_t table_size = gen_table_size(h->size, packed);
+    uint8_t* table = (uint8_t*) malloc(table_size * sizeof(uint8_t));
+    if(table == NULL) {
+        fprintf(stderr, "Error: Not enough memory to generate %s\n", h->name);
+        return NULL;
+    }
+
+    Coords_init();
+    if(resume && load_checkpoint(checkpoint_filename, &ckpt, table, h->size,
+                                 packed)) {
+        printf("%s: Resuming from checkpoint\n", h->name);
+        start_depth = ckpt.depth;
+        n_visited = ckpt.n_visited;
+        n_frontier = ckpt.n_frontier;
+    } else {
+        // All ones is unvisited either way
+        memset(table, GEN_UNVISITED, table_size * sizeof(uint8_t));
+        n_visited = n_frontier = gen_visit_solved(h, table, packed);
+    }
+
+    for(int depth=start_depth; n_visited < h->size; depth++) {
+        printf("%s: %lu / %lu\n", h->name, n_visited, h->size);
+        printf("%s: Searching Depth %d\n", h->name, depth);
+        fflush(stdout);
+
+        // Once the frontier is bigger than what's left, it's faster to look
+        // for a neighbor at `depth` from each unvisited entry than to expand
+        // every frontier entry. Every turn can be undone by another turn, so
+        // both find the same entries.
+        bool backwards = n_frontier > h->size - n_visited;
+
+        for(int i=0; i<n_threads; i++) {
+            ranges[i].h = h;
+            ranges[i].table = table;
+            ranges[i].packed = packed;
+            ranges[i].depth = depth;
+            ranges[i].backwards = backwards;
+            ranges[i].start = h->size * i / n_threads;
+            ranges[i].end = h->size * (i+1) / n_threads;
+            if(n_threads > 1) {
+                pthread_create(&ranges[i].thread, NULL, gen_table_range,
+                               &ranges[i]);
+            } else {
+                gen_table_range(&ranges[i]);
             }
+        }
 
-            if(instack) {
-                if(instack[hash] != 0 && instack[hash] <= depth) {
-                    continue;
-                }
-                instack[hash] = depth;
+        uint64_t n_new = 0;
+        bool error = false;
+        for(int i=0; i<n_threads; i++) {
+            if(n_threads > 1) {
+                pthread_join(ranges[i].thread, NULL);
             }
+            n_new += ranges[i].n_new;
+            error = error || ranges[i].error;
+        }
+        if(error) {
+            free(table);
+            return NULL;
+        }
+        if(n_new == 0) {
+            fprintf(stderr, "Error: %lu hash values can't be reached\n",
+                    h->size - n_visited);
+            free(table);
+            return NULL;
+        }
+        n_visited += n_new;
+        n_frontier = n_new;
+
+        ckpt.size = h->size;
+        ckpt.packed = packed;
+        ckpt.depth = depth+1;
+        ckpt.n_visited = n_visited;
+        ckpt.n_frontier = n_frontier;
+        if(n_visited < h->size &&
+                !save_checkpoint(checkpoint_filename, &ckpt, table)) {
+            fprintf(stderr, "Warning: Could not save checkpoint \"%s\"\n",
+                    checkpoint_filename);
+        }
+    }
+    printf("%s: %lu / %lu\n", h->name, n_visited, h->size);
 
-            if(depth != max_depth) {
+    // Entries past the end of the last byte are zero in encoded tables
+    if(packed && h->size % 4) {
+        table[table_size-1] &= (1 << (h->size%4)*2) - 1;
+    }
+    return table;
+}
 
-                // Push turned cubes to the stack
-                for(int i=N_TURN_TYPES-1; i>=0; i--) {
-                    if(h->valid_turns_optimization && !valid_turns[i]) {
-                        continue;
-                    }
-                    Cube_copy(&tmp_cube, &cube);
-                    Cube_turn(&tmp_cube, i);
-                    Stack_push(stack, &tmp_cube, i, depth+1);
-                }
+/**
+ * Bytes needed for a table of `size` entries while it is generated.
+ */
+static uint64_t gen_table_size(uint64_t size, bool packed) {
+    return packed ? encoded_size(size, HEURISTIC_ENCODING_MOD3) : size;
+}
 
-            } else if (!visited[hash]) {
+/**
+ * Returns entry `i` of a table being generated: the depth, the depth mod 3
+ * if `packed`, or unvisited. Entries can be set by other threads at the same
+ * time.
+ */
+static inline uint8_t gen_get(const uint8_t* table, bool packed, uint64_t i) {
+    if(packed) {
+        uint8_t byte = __atomic_load_n(&table[i/4], __ATOMIC_RELAXED);
+        return (byte >> (i%4)*2) & 0x3;
+    }
+    return __atomic_load_n(&table[i], __ATOMIC_RELAXED);
+}
 
-                visited[hash] = true;
-                table[hash] = depth;
-                n_visited += 1;
+/**
+ * Sets entry `i` of a table being generated to the entry for `depth`, if it
+ * is unvisited. Returns false if it was visited already, maybe by another
+ * thread.
+ */
+static inline bool gen_visit(uint8_t* table, bool packed, uint64_t i,
+                             int depth) {
+    if(!packed) {
+        uint8_t unvisited = GEN_UNVISITED;
+        return __atomic_load_n(&table[i], __ATOMIC_RELAXED) == GEN_UNVISITED &&
+               __atomic_compare_exchange_n(&table[i], &unvisited, depth,
+                   false, __ATOMIC_RELAXED, __ATOMIC_RELAXED);
+    }
 
-                if(n_visited % 100000 == 0) {
-                    printf("%d / %lu\n", n_visited, h->size);
-                }
-                if(n_visited >= h->size) {
+    // Other entries in the same byte may change under us, so retry until the
+    // byte is swapped with only this entry changed.
+    int shift = (i%4)*2;
+    uint8_t byte = __atomic_load_n(&table[i/4], __ATOMIC_RELAXED);
+    do {
+        if(((byte >> shift) & 0x3) != GEN_UNVISITED_PACKED) {
+            return false;
+        }
+    } while(!__atomic_compare_exchange_n(&table[i/4], &byte,
+                (byte & ~(0x3 << shift)) | (depth%3) << shift,
+                true, __ATOMIC_RELAXED, __ATOMIC_RELAXED));
+    return true;
+}
+
+/**
+ * Visits every solved state at depth 0 and returns how many entries that
+ * set. `Cube_is_solved()` ignores the orientation of every face but U, and
+ * symmetries move U onto those faces, so the orientation of all six faces is
+ * left free. That keeps the table a lower bound looked up through any
+ * symmetry, and on the inverse state.
+ */
+static uint64_t gen_visit_solved(const Heuristic* h, uint8_t* table,
+                                 bool packed) {
+    Cube cube = solved_state;
+    uint64_t n_visited = 0;
+    for(int orients=0; orients < 1<<12; orients++) {
+        for(int face=0; face<6; face++) {
+            cube.cubies[CUBIE_U+face].orient = (orients >> face*2) & 0x3;
+        }
+        if(gen_visit(table, packed, h->hash_func(&cube), 0)) {
+            n_visited++;
+        }
+    }
+    return n_visited;
+}
+
+/**
+ * Writes a checkpoint to a temporary file first, then renames it over
+ * `filename`, so being killed halfway through leaves the last checkpoint
+ * intact.
+ */
+static bool save_checkpoint(const char* filename, const GenCheckpoint* ckpt,
+                            const uint8_t* table) {
+    char* tmp_filename = malloc(sizeof(char)*(strlen(filename)+5));
+    strcpy(tmp_filename, filename);
+    strcat(tmp_filename, ".tmp");
+
+    FILE* fp = fopen(tmp_filename, "w");
+    if(fp == NULL) {
+        free(tmp_filename);
+        return false;
+    }
+    bool ok = fwrite(CHECKPOINT_MAGIC, sizeof(CHECKPOINT_MAGIC), 1, fp) == 1 &&
+              fwrite(ckpt, sizeof(GenCheckpoint), 1, fp) == 1 &&
+              fwrite(table, gen_table_size(ckpt->size, ckpt->packed), 1,
+                     fp) == 1;
+    ok = fclose(fp) == 0 && ok;
+    ok = ok && rename(tmp_filename, filename) == 0;
+    if(!ok) {
+        remove(tmp_filename);
+    }
+    free(tmp_filename);
+    return ok;
+}
+
+/**
+ * Reads a checkpoint saved by `save_checkpoint()` into `ckpt` and `table`.
+ * Returns false if there is no checkpoint, or it isn't for a table of `size`
+ * entries, `packed` or not.
+ */
+static bool load_checkpoint(const char* filename, GenCheckpoint* ckpt,
+                            uint8_t* table, uint64_t size, bool packed) {
+    char magic[sizeof(CHECKPOINT_MAGIC)];
+
+    FILE* fp = fopen(filename, "r");
+    if(fp == NULL) {
+        return false;
+    }
+    bool ok = fread(magic, sizeof(magic), 1, fp) == 1 &&
+              memcmp(magic, CHECKPOINT_MAGIC, sizeof(magic)) == 0 &&
+              fread(ckpt, sizeof(GenCheckpoint), 1, fp) == 1 &&
+              ckpt->size == size &&
+              ckpt->packed == packed &&
+              fread(table, gen_table_size(size, packed), 1, fp) == 1;
+    fclose(fp);
+    if(!ok) {
+        fprintf(stderr, "Warning: Ignoring invalid checkpoint \"%s\"\n",
+                filename);
+    }
+    return ok;
+}
+
+/**
+ * Finds the entries at `depth+1` reached from one range of the table. Ranges
+ * can be searched at the same time: entries only ever change from unvisited
+ * to `depth+1` during a level, so whichever order threads see those changes
+ * in, the same entries end up at `depth+1`.
+ *
+ * In a packed table, entries at `depth` can't be told apart from entries at
+ * `depth-3`, `depth-6` and so on. Going forwards, those are expanded again,
+ * which wastes time but finds nothing new, since all their neighbors were
+ * visited by now. Going backwards, a visited neighbor of an unvisited entry
+ * can only be at `depth`, so no time is wasted.
+ */
+static void* gen_table_range(void* arg) {
+    GenTableRange* r = (GenTableRange*) arg;
+    const Heuristic* h = r->h;
+    uint8_t* table = r->table;
+    bool packed = r->packed;
+    int depth = r->depth;
+    uint8_t unvisited = packed ? GEN_UNVISITED_PACKED : GEN_UNVISITED;
+    uint8_t frontier = packed ? depth % 3 : depth;
+    Coords coords, child;
+    uint64_t hash;
+
+    // Coordinates that a hash doesn't cover are left solved by `unhash_func`.
+    // They don't affect the hash of any turned state.
+    Coords_from_cube(&coords, &solved_state);
+
+    r->n_new = 0;
+    r->error = false;
+    for(uint64_t i=r->start; i<r->end; i++) {
+        uint8_t entry = gen_get(table, packed, i);
+        if(entry != (r->backwards ? unvisited : frontier)) {
+            continue;
+        }
+        h->unhash_func(i, &coords);
+        for(int turn=0; turn<N_TURN_TYPES; turn++) {
+            Coords_turn(&child, &coords, turn);
+            hash = h->coord_hash_func(&child);
+            if(r->backwards) {
+                if(gen_get(table, packed, hash) == frontier) {
+                    // Only this thread visits entries in its own range, but
+                    // a packed byte can be shared with the next range.
+                    gen_visit(table, packed, i, depth+1);
+                    r->n_new++;
                     break;
                 }
-
+            } else if(hash >= h->size) {
+                fprintf(stderr, "Error: Hash value too large: %lu\n", hash);
+                r->error = true;
+                return NULL;
+            } else if(gen_visit(table, packed, hash, depth+1)) {
+                // Another thread may reach the same entry, only count it
+                // once.
+                r->n_new++;
             }
-
         }
     }
-
-    if(instack) { free(instack); }
-    free(visited);
-    return table;
+    return NULL;
 }
 
 
@@ -363,112 +1514,328 @@ static uint64_t hash_corners(const Cube* cube) {
     uint64_t result = 0;
     uint64_t max = 1;
 
-    uint8_t ids[6];
-    uint8_t orients[6];
+    // Each ID is ranked among the IDs the slots before it haven't taken
     for(int i=0; i<6; i++) {
-        ids[i] = cube->cubies[i].id;
-        orients[i] = cube->cubies[i].orient;
-    }
-
-    for(int i=0; i<6; i++) {
-        result += max*ids[i];
-        max *= 7-i;
-        for(int j=i+1; j<6; j++) {
-            if(ids[j] > ids[i]) {
-                ids[j]--;
-            }
+        int lower = 0;
+        for(int j=0; j<i; j++) {
+            lower += cube->cubies[j].id < cube->cubies[i].id;
         }
+        result += max*(cube->cubies[i].id - lower);
+        max *= 7-i;
     }
 
     for(int i=0; i<6; i++) {
-        result += max*orients[i];
+        result += max*cube->cubies[i].orient;
         max *= 3;
     }
 
     return result;
 }
 
-static uint64_t hash_edges_generic(const Cube* cube, const uint8_t cubie_ids[4]) {
+static uint64_t coord_hash_corners(const Coords* coords) {
+    return coords->corner_perm + (uint64_t) N_CORNER_PERM*coords->corner_orient;
+}
+
+static void unhash_corners(uint64_t hash, Coords* coords) {
+    coords->corner_perm = hash % N_CORNER_PERM;
+    coords->corner_orient = hash / N_CORNER_PERM;
+}
+
+/**
+ * Ranks the slots (minus 7) and orientations of `n` edge or face cubies.
+ *
+ * Each slot is ranked among the slots the cubies before it haven't taken,
+ * which is the slot minus how many of those are lower. For the few cubies a
+ * table tracks, counting them with comparisons is faster than a popcount of
+ * the slots taken, which isn't an instruction without -mpopcnt, or a table of
+ * popcounts (see bench/rank.c). Orientations are 2 bits each, so they're
+ * packed with shifts.
+ */
+static inline uint64_t rank_edges(const uint8_t* positions,
+                                  const uint8_t* orients, int n) {
     uint64_t result = 0;
     uint64_t max = 1;
+    uint64_t packed_orients = 0;
 
-    uint8_t ids[4];
-    uint8_t orients[4];
-    for(int i=0; i<4; i++) {
-        ids[i] = cube->cubies[cubie_ids[i]].id - 7;
-        orients[i] = cube->cubies[cubie_ids[i]].orient;
+    for(int i=0; i<n; i++) {
+        int lower = 0;
+        for(int j=0; j<i; j++) {
+            lower += positions[j] < positions[i];
+        }
+        result += max*(positions[i] - lower);
+        max *= 18-i;
+        packed_orients |= (uint64_t) orients[i] << 2*i;
     }
 
-    for(int i=0; i<4; i++) {
-        result += max*ids[i];
-        max *= 18-i;
-        for(int j=i+1; j<4; j++) {
-            if(ids[j] > ids[i]) {
-                ids[j]--;
+    return result + max*packed_orients;
+}
+
+/**
+ * The inverse of `rank_edges()`.
+ */
+static void unrank_edges(uint64_t rank, uint8_t* positions, uint8_t* orients,
+                         int n) {
+    for(int i=0; i<n; i++) {
+        positions[i] = rank % (18-i);
+        rank /= 18-i;
+    }
+    for(int i=0; i<n; i++) {
+        orients[i] = rank % 4;
+        rank /= 4;
+    }
+
+    // Each position was ranked among the slots not taken by the ones before
+    // it. Undo that from the back, skipping over the slots taken.
+    for(int i=n-2; i>=0; i--) {
+        for(int j=i+1; j<n; j++) {
+            if(positions[j] >= positions[i]) {
+                positions[j]++;
             }
         }
     }
+}
 
-    for(int i=0; i<4; i++) {
-        result += max*orients[i];
-        max *= 4;
+/**
+ * Hashes where the cubies `cubie_ids` are and how they are oriented.
+ */
+static uint64_t hash_edges_generic(const Cube* cube, const uint8_t* cubie_ids,
+                                   int n) {
+    // Slot of every edge and face cubie, indexed by cubie ID
+    uint8_t slots[25];
+    for(int i=7; i<25; i++) {
+        slots[cube->cubies[i].id] = i;
     }
 
-    return result;
+    uint8_t positions[MAX_HEURISTIC_CUBIES];
+    uint8_t orients[MAX_HEURISTIC_CUBIES];
+    for(int i=0; i<n; i++) {
+        positions[i] = slots[cubie_ids[i]] - 7;
+        orients[i] = cube->cubies[slots[cubie_ids[i]]].orient;
+    }
+    return rank_edges(positions, orients, n);
+}
+
+static uint64_t coord_hash_edges_generic(const Coords* coords,
+                                         const uint8_t* cubie_ids, int n) {
+    uint8_t positions[MAX_HEURISTIC_CUBIES];
+    uint8_t orients[MAX_HEURISTIC_CUBIES];
+    for(int i=0; i<n; i++) {
+        uint8_t piece = coords->pieces[cubie_ids[i]-7];
+        positions[i] = piece / 4;
+        orients[i] = piece % 4;
+    }
+    return rank_edges(positions, orients, n);
+}
+
+static void unhash_edges_generic(uint64_t hash, Coords* coords,
+                                 const uint8_t* cubie_ids, int n) {
+    uint8_t positions[MAX_HEURISTIC_CUBIES];
+    uint8_t orients[MAX_HEURISTIC_CUBIES];
+    unrank_edges(hash, positions, orients, n);
+    for(int i=0; i<n; i++) {
+        coords->pieces[cubie_ids[i]-7] = positions[i]*4 + orients[i];
+    }
 }
 
 static uint64_t hash_edges_1(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_U, CUBIE_UF, CUBIE_DR, CUBIE_BL
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, edges_1_cubies, 4);
+}
+
+static uint64_t coord_hash_edges_1(const Coords* coords) {
+    return coord_hash_edges_generic(coords, edges_1_cubies, 4);
+}
+
+static void unhash_edges_1(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, edges_1_cubies, 4);
 }
 
 static uint64_t hash_edges_2(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_L, CUBIE_FL, CUBIE_UR, CUBIE_DB
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, edges_2_cubies, 4);
+}
+
+static uint64_t coord_hash_edges_2(const Coords* coords) {
+    return coord_hash_edges_generic(coords, edges_2_cubies, 4);
+}
+
+static void unhash_edges_2(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, edges_2_cubies, 4);
 }
 
 static uint64_t hash_edges_3(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_D, CUBIE_DF, CUBIE_UL, CUBIE_BR
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, edges_3_cubies, 4);
+}
+
+static uint64_t coord_hash_edges_3(const Coords* coords) {
+    return coord_hash_edges_generic(coords, edges_3_cubies, 4);
+}
+
+static void unhash_edges_3(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, edges_3_cubies, 4);
 }
 
 static uint64_t hash_edges_4(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_R, CUBIE_FR, CUBIE_DL, CUBIE_UB
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, edges_4_cubies, 4);
+}
+
+static uint64_t coord_hash_edges_4(const Coords* coords) {
+    return coord_hash_edges_generic(coords, edges_4_cubies, 4);
+}
+
+static void unhash_edges_4(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, edges_4_cubies, 4);
 }
 
 static uint64_t hash_edges_5(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_F, CUBIE_DF, CUBIE_FR, CUBIE_UL,
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, edges_5_cubies, 4);
+}
+
+static uint64_t coord_hash_edges_5(const Coords* coords) {
+    return coord_hash_edges_generic(coords, edges_5_cubies, 4);
+}
+
+static void unhash_edges_5(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, edges_5_cubies, 4);
 }
 
 static uint64_t hash_edges_6(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_B, CUBIE_UB, CUBIE_BR, CUBIE_DL,
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, edges_6_cubies, 4);
+}
+
+static uint64_t coord_hash_edges_6(const Coords* coords) {
+    return coord_hash_edges_generic(coords, edges_6_cubies, 4);
+}
+
+static void unhash_edges_6(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, edges_6_cubies, 4);
 }
 
 static uint64_t hash_faces1(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_U, CUBIE_D, CUBIE_L, CUBIE_R
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, faces1_cubies, 4);
+}
+
+static uint64_t coord_hash_faces1(const Coords* coords) {
+    return coord_hash_edges_generic(coords, faces1_cubies, 4);
+}
+
+static void unhash_faces1(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, faces1_cubies, 4);
 }
 
 static uint64_t hash_faces2(const Cube* cube) {
-    const uint8_t cubies[4] = {
-        CUBIE_U, CUBIE_D, CUBIE_F, CUBIE_B
-    };
-    return hash_edges_generic(cube, cubies);
+    return hash_edges_generic(cube, faces2_cubies, 4);
+}
+
+static uint64_t coord_hash_faces2(const Coords* coords) {
+    return coord_hash_edges_generic(coords, faces2_cubies, 4);
+}
+
+static void unhash_faces2(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, faces2_cubies, 4);
+}
+
+static uint64_t hash_pieces_1(const Cube* cube) {
+    return hash_edges_generic(cube, pieces_1_cubies, 5);
+}
+
+static uint64_t coord_hash_pieces_1(const Coords* coords) {
+    return coord_hash_edges_generic(coords, pieces_1_cubies, 5);
+}
+
+static void unhash_pieces_1(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, pieces_1_cubies, 5);
+}
+
+static uint64_t hash_pieces_2(const Cube* cube) {
+    return hash_edges_generic(cube, pieces_2_cubies, 5);
+}
+
+static uint64_t coord_hash_pieces_2(const Coords* coords) {
+    return coord_hash_edges_generic(coords, pieces_2_cubies, 5);
+}
+
+static void unhash_pieces_2(uint64_t hash, Coords* coords) {
+    unhash_edges_generic(hash, coords, pieces_2_cubies, 5);
+}
+
+static uint64_t n_choose_k(int n, int k) {
+    if(k > n) {
+        return 0;
+    }
+    uint64_t result = 1;
+    for(int i=1; i<=k; i++) {
+        result = result * (n-k+i) / i;
+    }
+    return result;
+}
+
+/**
+ * Ranks which of the 18 edge and face slots (minus 7) hold faces, and
+ * whether the edge in each of the other slots is turned 90 degrees, in the
+ * order of the slots.
+ */
+static uint64_t rank_shape(const bool is_face[18], const uint8_t orients[18]) {
+    uint64_t faces = 0;
+    uint64_t turned = 0;
+    int n_faces = 0, n_edges = 0;
+    for(int i=0; i<18; i++) {
+        if(is_face[i]) {
+            n_faces++;
+            faces += n_choose_k(i, n_faces);
+        } else {
+            turned |= (uint64_t) (orients[i] % 2) << n_edges;
+            n_edges++;
+        }
+    }
+    return faces + 18564*turned;
+}
+
+static uint64_t hash_shape(const Cube* cube) {
+    bool is_face[18];
+    uint8_t orients[18];
+    for(int i=0; i<18; i++) {
+        is_face[i] = cube->cubies[i+7].id >= CUBIE_U;
+        orients[i] = cube->cubies[i+7].orient;
+    }
+    return rank_shape(is_face, orients);
+}
+
+static uint64_t coord_hash_shape(const Coords* coords) {
+    bool is_face[18];
+    uint8_t orients[18];
+    for(int i=0; i<18; i++) {
+        uint8_t slot = coords->pieces[i] / 4;
+        is_face[slot] = i+7 >= CUBIE_U;
+        orients[slot] = coords->pieces[i] % 4;
+    }
+    return rank_shape(is_face, orients);
+}
+
+/**
+ * The inverse of `coord_hash_shape()`. Which face or edge goes in which slot
+ * doesn't matter, so they are put in slots in order.
+ */
+static void unhash_shape(uint64_t hash, Coords* coords) {
+    uint64_t faces = hash % 18564;
+    uint64_t turned = hash / 18564;
+
+    bool is_face[18] = {false};
+    int slot = 17;
+    for(int n_faces=6; n_faces>0; n_faces--) {
+        while(n_choose_k(slot, n_faces) > faces) {
+            slot--;
+        }
+        faces -= n_choose_k(slot, n_faces);
+        is_face[slot] = true;
+        slot--;
+    }
+
+    int face = CUBIE_U - 7, edge = 0;
+    for(int i=0; i<18; i++) {
+        if(is_face[i]) {
+            coords->pieces[face++] = i*4;
+        } else {
+            coords->pieces[edge] = i*4 + (turned >> edge & 1);
+            edge++;
+        }
+    }
 }
@@ -5,47 +5,277 @@
  * These heuristics are expensive to compute, so naturally they are precomputed
  * and stored in a table.
  *
- * Internally, a list of active heuristics is stored. Calling
- * `Heuristic_load()` or `Heuristics_load_all()` can be used to load a specific
- * heuristic, or all. In order to load a heuristic, the heuristic table must be
- * generated and stored on disk using `Heuristic_generate()`, which only needs
- * to be done once.
+ * Loaded tables are kept in a `Heuristics` set, created with
+ * `Heuristics_new()`. Calling `Heuristic_load()` or `Heuristics_load_all()`
+ * can be used to load a specific heuristic, or all. In order to load a
+ * heuristic, the heuristic table must be generated and stored on disk using
+ * `Heuristic_generate()`, which only needs to be done once.
+ *
+ * A table can also be looked up through each of the cube's symmetries (see
+ * coords.h), which gives the distance of a different set of pieces for free.
+ * With `symmetries` set, loading a table adds a lookup for each symmetry that
+ * gives a set of pieces no other table in the set covers, and a table whose
+ * pieces are already covered that way isn't loaded at all.
+ *
+ * With `dual`, tables are also looked up on the inverse of the state (see
+ * `Cube_inverse()`), which is exactly as far from solved, but whose pieces are
+ * often further from their own solved slots. Since a cube is also solved with
+ * its faces turned, the pieces the inverse has in face slots are looked up in
+ * every orientation, and the smallest distance is kept. Only tables that
+ * store exact distances can be: a mod 3 table finds its distance from the
+ * state one turn before, and the inverses of two states a turn apart aren't a
+ * turn apart.
+ *
+ * Once loaded, a set is never modified by lookups, so any number of threads
+ * can share one set. Tables are mapped read-only from their files, so
+ * processes loading the same tables share one copy in the page cache.
  */
 
 #ifndef HEURISTICS_H
 #define HEURISTICS_H
 
+#include <pthread.h>
+
+#include "coords.h"
+
+// The most tables one `Heuristics` set can hold, counting each symmetry a
+// table is looked up through.
+#define HEURISTICS_MAX_TABLES 128
+
+/**
+ * How distances are stored in a table file. The encoding of a file is told
+ * apart by its size.
+ */
+typedef enum {
+    HEURISTIC_ENCODING_BYTE,    // One byte per entry
+    HEURISTIC_ENCODING_NIBBLE,  // 4 bits per entry, the low nibble first
+    // 2 bits per entry, the low bits first, storing the distance mod 3. Turns
+    // change a table's distance by at most one, so the exact distance can be
+    // recovered from the exact distance of a neighboring state.
+    HEURISTIC_ENCODING_MOD3,
+} HeuristicEncoding;
+
+/**
+ * What a table gives the distance to. Every solved state is a cube shape, so
+ * cube shape tables are lower bounds for solving as well.
+ */
+typedef enum {
+    HEURISTIC_GOAL_SOLVED,      // `Cube_is_solved()`
+    HEURISTIC_GOAL_CUBE_SHAPE,  // `Cube_is_cube_shape()`
+} HeuristicGoal;
+
+/**
+ * How much of a table file is checked when loading it. The header is always
+ * checked against the heuristic it's loaded as. The checksum of the entries
+ * takes a read of the whole table.
+ */
+typedef enum {
+    HEURISTIC_VALIDATE_HEADER,      // Only check the header
+    // Check the checksum on a background thread. Tables that fail are
+    // dropped by `Heuristics_validate()`, before any solve uses them.
+    HEURISTIC_VALIDATE_BACKGROUND,
+    HEURISTIC_VALIDATE_FULL,        // Check the checksum before loading
+} HeuristicValidation;
+
+typedef struct {
+    const char* name;
+    uint64_t (*hash_func)(const Cube* cube);
+    uint64_t (*coord_hash_func)(const Coords* coords);
+    uint64_t size;
+    const uint8_t* table;
+    HeuristicEncoding encoding;
+    HeuristicGoal goal;
+    uint64_t solved_hash;  // Of the solved state, with every face unturned
+
+    // Looked up with the state under this symmetry, 0 for none
+    int symmetry;
+    // Bit i is set if the table gives the distance of piece i (cubie ID
+    // minus 7), after the symmetry. 0 for tables of corners.
+    uint32_t pieces;
+    // `data` belongs to the table this one is a symmetry of
+    bool shared;
+
+    // The whole file, header included, and whether it's mapped from the file
+    // or malloc()ed.
+    void* data;
+    uint64_t data_size;
+    bool mapped;
+
+    uint64_t checksum;  // From the header
+    bool validating;    // `validator` is checking the checksum
+    bool valid;
+    pthread_t validator;
+} HeuristicTable;
+
+typedef struct {
+    int n_tables;
+    HeuristicTable* tables;
+
+    // Options, set before loading
+    bool hugepages;  // Ask the kernel to back tables with huge pages
+    HeuristicValidation validation;
+    bool symmetries;  // Also look tables up through the cube's symmetries
+    bool dual;        // Also look tables up on the inverse state
+
+    // False while tables are being validated in the background
+    bool validated;
+    pthread_mutex_t validation_lock;
+} Heuristics;
+
+/**
+ * The order one search looks the tables of a set up in, with
+ * `Heuristics_get_dists_bounded()`. The tables that prune the most states
+ * come first, so a state that's pruned usually takes one lookup. Each search
+ * thread keeps its own order, and it's re-sorted as the search goes.
+ */
+typedef struct {
+    int n_tables;
+    uint8_t tables[HEURISTICS_MAX_TABLES];  // Indices into `Heuristics.tables`
+
+    // The number of states each table pruned, by index, halved at every
+    // sort so the order follows the part of the tree being searched.
+    unsigned long long int prunes[HEURISTICS_MAX_TABLES];
+    int prunes_since_sort;
+} HeuristicsOrder;
+
 /**
  * Generates and saves heuristic tables to disk. `name` should be the name of a
- * heuristic table.
+ * heuristic table, and `encoding` is how the file stores distances.
+ * Generation is split between `n_threads` threads, or one thread per CPU core
+ * if `n_threads` is 0 or less. The table is the same for any number of
+ * threads. Different tables can be generated at the same time.
+ *
+ * A checkpoint is saved next to the table after each level of the search,
+ * and removed once the table is written. If `resume` is set and a checkpoint
+ * exists, generation continues from it instead of starting over.
  *
  * Returns true if all tables were generated successfully.
  */
-bool Heuristic_generate(const char* name);
+bool Heuristic_generate(const char* name, HeuristicEncoding encoding,
+                        int n_threads, bool resume);
+
+/**
+ * Returns the number of entries in the heuristic `name`, or 0 if there is no
+ * heuristic by that name.
+ */
+uint64_t Heuristic_get_size(const char* name);
 
 /**
- * Loads one heuristic identified by name.
+ * Returns the index of `cube`'s entry in the table of the heuristic `name`,
+ * which must exist.
+ */
+uint64_t Heuristic_get_hash(const char* name, const Cube* cube);
+
+/**
+ * Returns a new, empty set of heuristics. Free with `Heuristics_free()`.
+ */
+Heuristics* Heuristics_new();
+
+/**
+ * Loads one heuristic identified by name into `loaded`. Table pages are read
+ * from disk lazily, the first time they're looked up.
  *
  * Returns true on success or false on failure.
  */
-bool Heuristic_load(const char* name);
+bool Heuristic_load(Heuristics* loaded, const char* name);
 
 /**
- * Load all heuristics.
+ * Load all heuristics into `loaded`.
  *
  * If a heuristic is not available, it is ignored.
  */
-void Heuristics_load_all();
+void Heuristics_load_all(Heuristics* loaded);
+
+/**
+ * Returns a set of all available heuristics that is loaded once, by the first
+ * call, and then stays in memory for the life of the process. This is what
+ * `Cube_solve()` uses, so only the first solve pays for reading the tables.
+ *
+ * Tables generated after the first call are not picked up.
+ */
+const Heuristics* Heuristics_get_resident();
 
 /**
- * Unloads all heuristics.
+ * Waits for background validation of the tables in `loaded` to finish, and
+ * drops any table that turned out to be corrupt. Solves call this before
+ * using a set, so it only needs to be called to find out early.
  */
-void Heuristics_unload_all();
+void Heuristics_validate(const Heuristics* loaded);
+
+/**
+ * Frees `loaded` and all of its tables.
+ */
+void Heuristics_free(Heuristics* loaded);
 
 /**
  * Gets a lower bound on the distance `cube` is from the solved state using the
- * currently active heuristics.
+ * heuristics in `loaded`, and their lookups on the inverse state if
+ * `loaded->dual` is set.
+ */
+uint8_t Heuristics_get_dist(const Heuristics* loaded, const Cube* cube);
+
+/**
+ * Same as `Heuristics_get_dist()`, but for a cube given as coordinates.
+ */
+uint8_t Heuristics_get_dist_coords(const Heuristics* loaded,
+                                   const Coords* coords);
+
+/**
+ * Same as `Heuristics_get_dist_coords()`, but gets the distance to `goal`,
+ * using only the tables that are lower bounds for it. Also stores the
+ * distance from each of those tables in `dists`, at the table's index.
+ *
+ * `parent_dists` are the `dists` of a state one turn away from `coords`, or
+ * NULL if there is none. Mod 3 tables need these to find their exact
+ * distance. Without them, the distance is found by walking to the solved
+ * state, which is much slower.
+ */
+uint8_t Heuristics_get_dists_coords(const Heuristics* loaded,
+                                    HeuristicGoal goal,
+                                    const Coords* coords,
+                                    const uint8_t* parent_dists,
+                                    uint8_t* dists);
+
+/**
+ * Starts `order` out with the tables of `loaded` that are lower bounds for
+ * `goal`, in the order they were loaded.
+ */
+void HeuristicsOrder_init(HeuristicsOrder* order, const Heuristics* loaded,
+                          HeuristicGoal goal);
+
+/**
+ * Same as `Heuristics_get_dists_coords()`, for the goal `order` was made for,
+ * but stops at the first table whose distance is more than `bound`, and
+ * returns that distance. Only then, `dists` is left incomplete, which is fine
+ * for a state that's pruned: nothing is looked up from it again. Otherwise
+ * the distance returned is the largest.
+ *
+ * `parent_dists` must not be NULL if there are mod 3 tables, since walking to
+ * the solved state would cost far more than the lookups this saves.
+ */
+uint8_t Heuristics_get_dists_bounded(const Heuristics* loaded,
+                                     HeuristicsOrder* order,
+                                     const Coords* coords,
+                                     const uint8_t* parent_dists,
+                                     uint8_t* dists,
+                                     int bound);
+
+/**
+ * Prefetches the entry of `coords` in the table `order` looks up first, so
+ * a batch of states can be prefetched before any of them is looked up, and
+ * their cache misses overlap.
+ */
+void Heuristics_prefetch(const Heuristics* loaded,
+                         const HeuristicsOrder* order,
+                         const Coords* coords);
+
+/**
+ * Gets a lower bound on the distance `coords` is from the solved state by
+ * looking up its inverse in the tables of `loaded` that store exact distances
+ * to solved, whether or not `loaded->dual` is set. Returns 0 if there are no
+ * such tables.
  */
-uint8_t Heuristics_get_dist(const Cube* cube);
+uint8_t Heuristics_get_dual_dist_coords(const Heuristics* loaded,
+                                        const Coords* coords);
 
 #endif
@@ -65,6 +65,17 @@ bool Cube_is_solved(const Cube* cube) {
     return false;
 }
 
+void Cube_inverse(Cube* dst, const Cube* src) {
+    // Orientations add up as cubies move between slots, so a cubie that was
+    // rotated on its way to a slot is rotated back on the way out.
+    for(int i=0; i<25; i++) {
+        Cubie c = src->cubies[i];
+        int n_orients = i < 7 ? 3 : 4;
+        dst->cubies[c.id].id = i;
+        dst->cubies[c.id].orient = (n_orients - c.orient) % n_orients;
+    }
+}
+
 void Cube_print(FILE* out, const Cube* cube) {
     fprintf(out, "[");
     for(int i=0; i<25; i++) {
@@ -171,6 +171,14 @@ bool Cube_is_cube_shape(const Cube* cube);
  */
 bool Cube_is_solved(const Cube* cube);
 
+/**
+ * Sets `dst` to the inverse of `src`: the state that the turns which scramble
+ * the solved cube into `src` solve. Every cubie of `src` is in the slot of
+ * the other's ID, rotated the other way. Solving either takes the same number
+ * of turns. `dst` and `src` must not be the same cube.
+ */
+void Cube_inverse(Cube* dst, const Cube* src);
+
 /**
  * Return one or more solutions to the cube.
  *
@@ -178,10 +186,27 @@ bool Cube_is_solved(const Cube* cube);
  * which turns the integers correspond to). Solutions are -1 delimited, with -2
  * at the very end.
  *
+ * Returns NULL if the search gives up without finding a solution, which only
+ * happens if the heuristic tables overestimate.
+ *
+ * The heuristic tables are read from disk by the first solve and kept in
+ * memory for later ones (see `Heuristics_get_resident()`), and so is the
+ * perimeter of states near solved (see `Perimeter_get_resident()`). The
+ * first solve generates the perimeter with a breadth first search, which
+ * takes about half a second, and it then keeps 32 MB for the life of the
+ * process. To solve without it, or with a different one, use
+ * `SolverContext_solve()`.
+ *
  * TODO: Option to return more than one solution.
  */
 int* Cube_solve(const Cube* cube);
 
+/**
+ * Same as Cube_solve(), but the search is split between `n_threads` threads.
+ * If `n_threads` is 0 or less, one thread is used per CPU core.
+ */
+int* Cube_solve_parallel(const Cube* cube, int n_threads);
+
 /**
  * Same as Cube_solve(), but gets the puzzle into a cube shape, instead of a
  * completely solved cube.
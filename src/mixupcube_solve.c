@@ -1,137 +1,1078 @@
+#define _POSIX_C_SOURCE 200809L
 
 #include <stdlib.h>
 #include <string.h>
 #include <stdio.h>
-#include <assert.h>
 #include <stdint.h>
+#include <time.h>
+#include <unistd.h>
+#include <pthread.h>
 
 #include "mixupcube.h"
-#include "stack.h"
+#include "coords.h"
 #include "solution_list.h"
 #include "turn_avoid_table.h"
 #include "heuristics.h"
+#include "perimeter.h"
+#include "transposition.h"
+#include "solver.h"
+
+// No solution is anywhere near this long. This bounds the per-ply arrays in
+// `Search`, so the search never has to allocate memory.
+#define MAX_SEARCH_DEPTH 40
+
+#if MAX_SEARCH_DEPTH > TRANSPOSITION_MAX_DEPTH || \
+    TURN_AVOID_N_STATES > TRANSPOSITION_MAX_AVOID_STATES
+#error "Transposition table entries are too small for the search"
+#endif
+
+// Parallel searches split the tree into at least this many work units per
+// thread, so threads that finish early have something to steal.
+#define MIN_UNITS_PER_THREAD 16
+
+// Phase 2 of a two phase solve searches at most this many turns past its
+// lower bound (see `SolverContext_solve_two_phase()`).
+#define PHASE2_MAX_EXTRA_LENGTH 2
+
+/**
+ * Everything one depth first search needs. `states[d]` is the state `d` turns
+ * into the search and `path[d]` is the turn made from it, so each ply works
+ * in its own slot and nothing is ever copied back.
+ */
+typedef struct Search {
+    int max_depth;
+
+    // `is_goal` is checked on coordinates. Since coordinates can't always
+    // tell everything `is_solved_func` can (see `Coords_is_solved()`), a
+    // cube is rebuilt and checked with `is_solved_func` to confirm.
+    bool (*is_goal)(const Coords* coords);
+    bool (*is_solved_func)(const Cube* cube);
+    const Heuristics* heuristics;  // NULL for no heuristics
+    HeuristicGoal goal;            // What `is_goal` checks for
+    const Perimeter* perimeter;    // NULL for none
+    bool verbose;
+
+    // Shared between all threads of a parallel search. NULL for none.
+    TranspositionTable* transpositions;
+
+    // Above 1, solutions are taken at any depth up to `max_depth` (see
+    // `SolverOptions`), not only at `max_depth`.
+    double weight;
+
+    // Children are pruned once their depth plus their heuristic distance,
+    // times `weight`, is more than `max_depth`. The smallest such sum, rounded
+    // up, is kept here: no `max_depth` below it can find anything new, so
+    // it's the next one to search.
+    int next_max_depth;
+
+    // Turns outside the move set, one bit per turn like `turn_avoid_table`
+    unsigned long long int excluded_turns;
+
+    // Called with each solution, of `max_depth` turns, stored in `path`.
+    // Returns true to end the search, or false to keep looking for others.
+    // NULL ends the search at the first solution.
+    bool (*found)(struct Search* s);
+    void* found_data;
+
+    Coords states[MAX_SEARCH_DEPTH+1];
+    int path[MAX_SEARCH_DEPTH];
+    int length;  // Of the solution in `path`, once one is found
+    unsigned long long int nodes_visited;
+    unsigned long long int dual_pruned;  // See `SolverStats`
+    TranspositionStats transposition_stats;
+
+    // The distance from each heuristic table for `states[d]`. Mod 3 tables
+    // need the exact distance of the parent to find a child's (see
+    // `Heuristics_get_dists_coords()`).
+    uint8_t dists[MAX_SEARCH_DEPTH+1][HEURISTICS_MAX_TABLES];
+
+    // The order this search looks the tables up in, which each thread of a
+    // parallel search adapts to its own part of the tree
+    HeuristicsOrder order;
+
+    // The search gives up as soon as this is nonzero, or once `max_seconds`
+    // have passed since `start` unless it's 0. Shared between all threads of
+    // a parallel search.
+    int* stop;
+    double max_seconds;
+    struct timespec start;
+} Search;
+
+/**
+ * A subtree of a parallel search: the state `depth` turns from the root, the
+ * turns that lead to it, and the state of the automaton in
+ * turn_avoid_table.h after them.
+ */
+typedef struct {
+    Coords state;
+    uint8_t dists[HEURISTICS_MAX_TABLES];
+    int depth;
+    int path[MAX_SEARCH_DEPTH];
+    int avoid_state;
+} WorkUnit;
+
+/**
+ * A work stealing queue. Each thread starts out with a contiguous block of
+ * work units. The owner takes units from the front, which keeps it close to
+ * the order a single thread would search in, and other threads steal from
+ * the back.
+ */
+typedef struct {
+    pthread_mutex_t lock;
+    int head;
+    int tail;
+} WorkQueue;
+
+typedef struct {
+    const Search* root;
+    WorkUnit* units;
+    WorkQueue* queues;
+    int n_threads;
+
+    int stop;
+    pthread_mutex_t solution_lock;
+    bool found;
+    int path[MAX_SEARCH_DEPTH];
+    int length;
+} ParallelSearch;
+
+typedef struct {
+    ParallelSearch* ps;
+    int id;
+    pthread_t thread;
+    Search search;
+} Worker;
+
+/**
+ * A two phase solve. Phase 1 searches for every way to get the cube into
+ * cube shape, shortest first, and phase 2 solves each of them using only the
+ * turns that keep the cube shape.
+ */
+typedef struct {
+    const SolverContext* ctx;
+    Search phase1;
+    Search phase2;
+    int phase2_extra;  // How many turns phase 2 searches past its lower bound
+    int stop;
+
+    int target_length;
+    SolutionCallback callback;
+    void* data;
+
+    // The distances of the cube from solved, which phase 2 finds its own
+    // from along the path of phase 1 (see `Heuristics_get_dists_coords()`)
+    uint8_t root_dists[HEURISTICS_MAX_TABLES];
+    int root_dist;
+
+    // Every solution found, each shorter than the one before
+    SolutionList* solutions;
+    int best_length;  // MAX_SEARCH_DEPTH+1 until there is a solution
+} TwoPhase;
 
 // Private Prototypes
-static int* solve(const Cube* cube, bool (*is_solved_func)(const Cube* cube));
-static SolutionList* search_at_depth(
-    const Cube* to_solve,
-    int max_depth,
-    Stack* stack,
+static int* solve(
+    SolverContext* ctx,
+    const Cube* cube,
+    bool (*is_goal)(const Coords* coords),
     bool (*is_solved_func)(const Cube* cube),
-    bool multiple_solutions);
-
-static unsigned long long int nodes_visited;
+    HeuristicGoal goal);
+static void init_search(
+    Search* s,
+    const SolverContext* ctx,
+    bool (*is_goal)(const Coords* coords),
+    bool (*is_solved_func)(const Cube* cube),
+    HeuristicGoal goal,
+    int* stop);
+static TranspositionTable* get_transpositions(SolverContext* ctx);
+static inline int f_cost(const Search* s, int depth, int dist);
+static inline bool is_pruned(Search* s, int depth, int dist);
+static int max_unpruned_dist(const Search* s, int depth);
+static bool is_child_pruned(Search* s, int depth, int bound);
+static inline void exceeded(Search* s, int f);
+static bool is_solution(const Search* s, const Coords* state);
+static bool search_node(Search* s, int depth, int avoid_state);
+static int turn_avoid_state(const int* path, int length);
+static bool search_perimeter(Search* s, int depth);
+static bool solution_found(Search* s);
+static bool two_phase_found(Search* phase1);
+static void search_phase2(TwoPhase* tp, const Coords* states,
+                          const int* path1, int length1);
+static bool search_parallel(Search* root, int n_threads);
+static int split_node(
+    Search* s,
+    int depth,
+    int avoid_state,
+    int split_depth,
+    WorkUnit* units,
+    int max_units);
+static void* worker_main(void* arg);
+static bool take_unit(ParallelSearch* ps, int id, WorkUnit* unit_out);
+static double seconds_since(const struct timespec* start);
 
 
 int* Cube_solve(const Cube* cube) {
-    Heuristics_load_all();
-    int* solution = solve(cube, Cube_is_solved);
-    Heuristics_unload_all();
+    return Cube_solve_parallel(cube, 1);
+}
+
+int* Cube_solve_parallel(const Cube* cube, int n_threads) {
+    SolverContext* ctx = SolverContext_new(Heuristics_get_resident());
+    ctx->perimeter = Perimeter_get_resident();
+    ctx->options.n_threads = n_threads;
+    int* solution = SolverContext_solve(ctx, cube);
+    SolverContext_free(ctx);
     return solution;
 }
 
 int* Cube_solve_to_cube_shape(const Cube* cube) {
-    //TODO: Heuristics only supported for regular solving.
-    return solve(cube, &Cube_is_cube_shape);
+    SolverContext* ctx = SolverContext_new(Heuristics_get_resident());
+    int* solution = SolverContext_solve_to_cube_shape(ctx, cube);
+    SolverContext_free(ctx);
+    return solution;
+}
+
+SolverContext* SolverContext_new(const Heuristics* heuristics) {
+    SolverContext* ctx = (SolverContext*) calloc(1, sizeof(SolverContext));
+    ctx->heuristics = heuristics;
+    ctx->options.n_threads = 1;
+    ctx->options.verbose = true;
+    ctx->options.weight = 1;
+    return ctx;
 }
 
-static int* solve(const Cube* cube, bool (*is_solved_func)(const Cube* cube)) {
-    // Depth first search implemented with iterative deepening
-    nodes_visited = 0;
-    Stack* stack = Stack_new(1000);
+void SolverContext_free(SolverContext* ctx) {
+    if(ctx->transpositions) {
+        TranspositionTable_free(ctx->transpositions);
+    }
+    free(ctx);
+}
+
+int* SolverContext_solve(SolverContext* ctx, const Cube* cube) {
+    return solve(ctx, cube, Coords_is_solved, Cube_is_solved,
+                 HEURISTIC_GOAL_SOLVED);
+}
+
+int* SolverContext_solve_to_cube_shape(SolverContext* ctx, const Cube* cube) {
+    return solve(ctx, cube, Coords_is_cube_shape, Cube_is_cube_shape,
+                 HEURISTIC_GOAL_CUBE_SHAPE);
+}
+
+/**
+ * Depth first search implemented with iterative deepening. The search itself
+ * only works with coordinates (see coords.h).
+ */
+static int* solve(
+    SolverContext* ctx,
+    const Cube* cube,
+    bool (*is_goal)(const Coords* coords),
+    bool (*is_solved_func)(const Cube* cube),
+    HeuristicGoal goal)
+{
+    const Heuristics* heuristics = ctx->heuristics;
+    Search s;
     SolutionList* solutions;
+    struct timespec solve_start, start;
+    int stop = 0;
     int* ret;
 
+    int n_threads = ctx->options.n_threads;
+    if(n_threads <= 0) {
+        n_threads = sysconf(_SC_NPROCESSORS_ONLN);
+    }
+
+    clock_gettime(CLOCK_MONOTONIC, &solve_start);
+    memset(&ctx->stats, 0, sizeof(SolverStats));
+
     if(is_solved_func(cube)) {
         ret = (int*) calloc(1, sizeof(int));
         ret[0] = -2;
-        Stack_free(stack);
         return ret;
     }
 
-    for(int depth=1; ; depth++) {
-        printf("Searching Depth %d...\n", depth);
-        solutions = search_at_depth(cube, depth, stack, is_solved_func, false);
-        printf("%llu nodes visited\n", nodes_visited);
-        if(SolutionList_count(solutions) > 0) {
+    Coords_init();
+    init_search(&s, ctx, is_goal, is_solved_func, goal, &stop);
+    if(ctx->options.weight > 1) {
+        s.weight = ctx->options.weight;
+    }
+    s.transpositions = get_transpositions(ctx);
+    Coords_from_cube(&s.states[0], cube);
+
+    // The first depth worth searching is the root's own lower bound, from
+    // the heuristics or the perimeter. After that, each iteration says which
+    // depth is next (see `Search.next_max_depth`).
+    int depth = 1;
+    if(heuristics) {
+        int dist = Heuristics_get_dists_coords(heuristics, goal, &s.states[0],
+                                               NULL, s.dists[0]);
+        if(dist > depth) {
+            depth = dist;
+        }
+    }
+    if(s.perimeter) {
+        int dist = Perimeter_get_dist(s.perimeter, &s.states[0], NULL);
+        if(dist < 0) {
+            dist = s.perimeter->depth + 1;
+        }
+        if(dist > depth) {
+            depth = dist;
+        }
+    }
+
+    for(int last_depth=0; depth<=MAX_SEARCH_DEPTH; depth=s.next_max_depth) {
+        if(s.verbose) {
+            printf("Searching Depth %d", depth);
+            if(depth > last_depth+1) {
+                printf(", %d skipped", depth - last_depth-1);
+            }
+            printf("...\n");
+        }
+        last_depth = depth;
+        ctx->stats.iterations++;
+        clock_gettime(CLOCK_MONOTONIC, &start);
+        unsigned long long int nodes_before = s.nodes_visited;
+        s.max_depth = depth;
+        s.next_max_depth = MAX_SEARCH_DEPTH+1;
+        bool found;
+        if(n_threads > 1) {
+            found = search_parallel(&s, n_threads);
+        } else {
+            found = search_node(&s, 0, TURN_AVOID_START);
+        }
+        if(s.verbose) {
+            printf("%llu nodes visited (%.0f nodes/s)\n", s.nodes_visited,
+                   (s.nodes_visited - nodes_before) / seconds_since(&start));
+        }
+        if(found) {
+            ctx->stats.nodes_visited = s.nodes_visited;
+            ctx->stats.dual_pruned = s.dual_pruned;
+            ctx->stats.transpositions = s.transposition_stats;
+            ctx->stats.depth = s.length;
+            ctx->stats.seconds = seconds_since(&solve_start);
+
+            solutions = SolutionList_new();
+            SolutionList_add(solutions, s.path, s.length);
             ret = SolutionList_get_int_list(solutions);
             SolutionList_free(solutions);
-            Stack_free(stack);
             return ret;
         }
-        SolutionList_free(solutions);
     }
+
+    // No solution within MAX_SEARCH_DEPTH turns, which only happens if the
+    // heuristics overestimate
+    ctx->stats.nodes_visited = s.nodes_visited;
+    ctx->stats.dual_pruned = s.dual_pruned;
+    ctx->stats.transpositions = s.transposition_stats;
+    ctx->stats.seconds = seconds_since(&solve_start);
+    return NULL;
+}
+
+int* SolverContext_solve_two_phase(
+    SolverContext* ctx,
+    const Cube* cube,
+    int target_length,
+    double max_seconds,
+    SolutionCallback callback,
+    void* data)
+{
+    TwoPhase tp;
+    Coords solved, turned;
+    int* ret = NULL;
+
+    Coords_init();
+    memset(&ctx->stats, 0, sizeof(SolverStats));
+    tp.ctx = ctx;
+    tp.stop = 0;
+    tp.target_length = target_length;
+    tp.callback = callback;
+    tp.data = data;
+    tp.solutions = SolutionList_new();
+    tp.best_length = MAX_SEARCH_DEPTH+1;
+
+    init_search(&tp.phase1, ctx, Coords_is_cube_shape, Cube_is_cube_shape,
+                HEURISTIC_GOAL_CUBE_SHAPE, &tp.stop);
+    tp.phase1.max_seconds = max_seconds;
+    tp.phase1.found = two_phase_found;
+    tp.phase1.found_data = &tp;
+    tp.phase1.transpositions = get_transpositions(ctx);
+    init_search(&tp.phase2, ctx, Coords_is_solved, Cube_is_solved,
+                HEURISTIC_GOAL_SOLVED, &tp.stop);
+    tp.phase2.max_seconds = max_seconds;
+    tp.phase2.start = tp.phase1.start;
+
+    // Phase 2 turns are the ones that keep the solved cube in cube shape,
+    // which keep any cube in cube shape: the face turns and the slice turns
+    // of 90 degrees.
+    Coords_from_cube(&solved, &solved_state);
+    tp.phase2.excluded_turns = 0;
+    for(int turn=0; turn<N_TURN_TYPES; turn++) {
+        Coords_turn(&turned, &solved, turn);
+        if(!Coords_is_cube_shape(&turned)) {
+            tp.phase2.excluded_turns |= 1ULL << turn;
+        }
+    }
+
+    Coords_from_cube(&tp.phase1.states[0], cube);
+    int first_depth = 1;
+    if(ctx->heuristics) {
+        int dist = Heuristics_get_dists_coords(ctx->heuristics,
+                                               HEURISTIC_GOAL_CUBE_SHAPE,
+                                               &tp.phase1.states[0], NULL,
+                                               tp.phase1.dists[0]);
+        if(dist > first_depth) {
+            first_depth = dist;
+        }
+        tp.root_dist = Heuristics_get_dists_coords(
+            ctx->heuristics, HEURISTIC_GOAL_SOLVED, &tp.phase1.states[0],
+            NULL, tp.root_dists);
+    }
+    // Phase 2 takes exponentially longer the further its solution is past
+    // its lower bound, and each depth of phase 1 has many more ways into cube
+    // shape than the one before. So each new depth of phase 1 is searched
+    // with the shortest phase 2, and the depths before it again with one
+    // more turn of phase 2 than the last time, which costs a lot less. Phase
+    // 2 is at least `extra` turns, so the searches for a `total` only find
+    // solutions of at least `total` turns. This is why two phase solutions
+    // aren't optimal: one whose phase 2 is more than
+    // `PHASE2_MAX_EXTRA_LENGTH` turns past its lower bound is never found.
+    for(int total=0; total < tp.best_length && !tp.stop; total++) {
+        for(int extra=0; extra<=PHASE2_MAX_EXTRA_LENGTH && extra<=total &&
+                !tp.stop; extra++) {
+            int depth = total - extra;
+            tp.phase2_extra = extra;
+            if(depth == 0 && Cube_is_cube_shape(cube)) {
+                search_phase2(&tp, tp.phase1.states, tp.phase1.path, 0);
+            }
+            if(depth < first_depth) {
+                continue;
+            }
+            // The depth was searched before, through states the table
+            // would cut off as searched already
+            if(extra > 0 && tp.phase1.transpositions) {
+                TranspositionTable_clear(tp.phase1.transpositions);
+            }
+            tp.phase1.max_depth = depth;
+            tp.phase1.next_max_depth = MAX_SEARCH_DEPTH+1;
+            search_node(&tp.phase1, 0, TURN_AVOID_START);
+        }
+    }
+
+    ctx->stats.nodes_visited = tp.phase1.nodes_visited +
+                               tp.phase2.nodes_visited;
+    ctx->stats.dual_pruned = tp.phase1.dual_pruned + tp.phase2.dual_pruned;
+    ctx->stats.transpositions = tp.phase1.transposition_stats;
+    ctx->stats.seconds = seconds_since(&tp.phase1.start);
+    if(SolutionList_count(tp.solutions) > 0) {
+        ctx->stats.depth = tp.best_length;
+        ret = SolutionList_get_int_list(tp.solutions);
+    }
+    SolutionList_free(tp.solutions);
+    return ret;
 }
 
-static SolutionList* search_at_depth(
-    const Cube* to_solve,
-    int max_depth,
-    Stack* stack,
+/**
+ * Sets up a search from `ctx`, with nothing searched yet and the clock
+ * started. The heuristics are validated before the search orders them. The
+ * states, depth and dists are left to the caller.
+ */
+static void init_search(
+    Search* s,
+    const SolverContext* ctx,
+    bool (*is_goal)(const Coords* coords),
     bool (*is_solved_func)(const Cube* cube),
-    bool multiple_solutions)
+    HeuristicGoal goal,
+    int* stop)
 {
-    Cube current, tmp;
-    int depth, turn;
-    bool pop_successful;
-    int path[max_depth];
-    SolutionList* solutions = SolutionList_new();
-
-    assert(max_depth >= 0);
-
-    current = *to_solve;
-    depth = 0;
-    turn = 39;
-    Stack_clear(stack);
-    while(1) {
-        nodes_visited++;
-
-        if(depth == max_depth-1) {
-            // Don't push cubes at the last depth to the stack, just check if
-            // they're solved.
-            for(int i=0; i<N_TURN_TYPES; i++) {
-                if(turn_avoid_table[turn] & (1L << i)) {
-                    continue;
-                }
-                Cube_copy(&tmp, &current);
-                Cube_turn(&tmp, i);
-                if(is_solved_func(&tmp)) {
+    s->is_goal = is_goal;
+    s->is_solved_func = is_solved_func;
+    s->heuristics = ctx->heuristics;
+    s->goal = goal;
+    if(ctx->heuristics) {
+        // Validation may drop tables, so it's done before they're ordered
+        Heuristics_validate(ctx->heuristics);
+        HeuristicsOrder_init(&s->order, ctx->heuristics, goal);
+    }
+    // Perimeter distances are to the solved state only
+    s->perimeter = goal == HEURISTIC_GOAL_SOLVED ? ctx->perimeter : NULL;
+    s->verbose = ctx->options.verbose;
+    s->transpositions = NULL;
+    s->weight = 1;
+    s->next_max_depth = MAX_SEARCH_DEPTH+1;
+    s->excluded_turns = 0;
+    s->found = NULL;
+    s->found_data = NULL;
+    s->length = 0;
+    s->nodes_visited = 0;
+    s->dual_pruned = 0;
+    memset(&s->transposition_stats, 0, sizeof(TranspositionStats));
+    s->stop = stop;
+    s->max_seconds = 0;
+    clock_gettime(CLOCK_MONOTONIC, &s->start);
+}
+
+/**
+ * Returns the transposition table `ctx->options` ask for, emptied for a new
+ * solve, or NULL for none. The context keeps the table between solves, and
+ * only allocates a new one when the memory asked for changes.
+ */
+static TranspositionTable* get_transpositions(SolverContext* ctx) {
+    TranspositionTable* table = ctx->transpositions;
+    uint64_t memory = ctx->options.transposition_memory;
+    if(table && table->max_bytes != memory) {
+        TranspositionTable_free(table);
+        table = NULL;
+    }
+    if(!table && memory > 0) {
+        table = TranspositionTable_new(memory,
+                                       ctx->options.transposition_replacement);
+    } else if(table) {
+        table->replacement = ctx->options.transposition_replacement;
+        TranspositionTable_clear(table);
+    }
+    ctx->transpositions = table;
+    return table;
+}
+
+/**
+ * The `max_depth` a state `depth` turns into the search, with a heuristic
+ * distance of `dist`, needs to lead to a solution.
+ */
+static inline int f_cost(const Search* s, int depth, int dist) {
+    int f = depth + dist;
+    if(s->weight > 1) {
+        double weighted = depth + s->weight * dist;
+        f = (int) weighted;
+        if(f < weighted) {
+            f++;
+        }
+    }
+    return f;
+}
 
-                    // Solution Found!
-                    path[max_depth-1] = i;
-                    SolutionList_add(solutions, path, max_depth);
-                    if(!multiple_solutions) {
-                        return solutions;
-                    }
+/**
+ * Whether a state `depth` turns into the search, with a heuristic distance of
+ * `dist`, can't lead to a solution within `s->max_depth`. If so, it's counted
+ * towards `s->next_max_depth`.
+ */
+static inline bool is_pruned(Search* s, int depth, int dist) {
+    int f = f_cost(s, depth, dist);
+    if(f <= s->max_depth) {
+        return false;
+    }
+    exceeded(s, f);
+    return true;
+}
+
+/**
+ * The largest heuristic distance a state `depth` turns into the search can
+ * have without being pruned.
+ */
+static int max_unpruned_dist(const Search* s, int depth) {
+    int bound = s->max_depth - depth;
+    if(s->weight > 1) {
+        // Rounding makes the division only a first guess
+        bound = (int) (bound / s->weight);
+        while(f_cost(s, depth, bound+1) <= s->max_depth) {
+            bound++;
+        }
+        while(bound > 0 && f_cost(s, depth, bound) > s->max_depth) {
+            bound--;
+        }
+    }
+    return bound;
+}
+
+/**
+ * Whether `s->states[depth]`, just turned into from the state before it, is
+ * pruned by the heuristics, given `bound`, its `max_unpruned_dist()`. The
+ * tables are looked up in `s->order` until one is over the bound, and unless
+ * the state is pruned its distances are stored in `s->dists[depth]`. The
+ * inverse state is only looked up if the state itself isn't pruned, so
+ * `s->dual_pruned` counts the states only the inverse prunes.
+ *
+ * A pruned state counts towards `s->next_max_depth` with the first distance
+ * over the bound, not the largest, so an iteration the largest would rule out
+ * is sometimes searched anyway.
+ */
+static bool is_child_pruned(Search* s, int depth, int bound) {
+    if(!s->heuristics) {
+        return false;
+    }
+    const Coords* state = &s->states[depth];
+    if(is_pruned(s, depth, Heuristics_get_dists_bounded(s->heuristics,
+                                &s->order, state, s->dists[depth-1],
+                                s->dists[depth], bound))) {
+        return true;
+    }
+    if(s->heuristics->dual && s->goal == HEURISTIC_GOAL_SOLVED &&
+            is_pruned(s, depth, Heuristics_get_dual_dist_coords(s->heuristics,
+                                                                state))) {
+        s->dual_pruned++;
+        return true;
+    }
+    return false;
+}
 
+/**
+ * Counts a state that needs a `max_depth` of at least `f` towards
+ * `s->next_max_depth`.
+ */
+static inline void exceeded(Search* s, int f) {
+    if(f < s->next_max_depth) {
+        s->next_max_depth = f;
+    }
+}
+
+/**
+ * Whether `state` is what `s` is searching for, confirmed on a cube.
+ */
+static bool is_solution(const Search* s, const Coords* state) {
+    Cube cube;
+    if(!s->is_goal(state)) {
+        return false;
+    }
+    Coords_to_cube(&cube, state);
+    return s->is_solved_func(&cube);
+}
+
+/**
+ * Searches below `s->states[depth]`, where the path to it left the automaton
+ * in turn_avoid_table.h in `avoid_state`. On success, returns true and the
+ * solution is stored in `s->path`, `s->length` turns long.
+ *
+ * Children are searched from the last turn to the first. This is the order
+ * the old stack based search popped them in, which keeps node counts and
+ * solutions the same.
+ */
+static bool search_node(Search* s, int depth, int avoid_state) {
+    const Coords* current = &s->states[depth];
+    Coords* child = &s->states[depth+1];
+    unsigned long long int avoid = turn_avoid_table[avoid_state] |
+                                   s->excluded_turns;
+    s->nodes_visited++;
+
+    // Checking the clock is slow, so only do it every so many nodes
+    if(s->max_seconds > 0 && s->nodes_visited % 4096 == 0 &&
+            seconds_since(&s->start) > s->max_seconds) {
+        __atomic_store_n(s->stop, 1, __ATOMIC_RELAXED);
+    }
+    if(__atomic_load_n(s->stop, __ATOMIC_RELAXED)) {
+        return false;
+    }
+
+    // A weighted search may have pruned this state at the depth it's at in
+    // every earlier iteration, so it has to take it now.
+    if(s->weight > 1 && depth > 0 && is_solution(s, current)) {
+        s->length = depth;
+        return solution_found(s);
+    }
+
+    if(s->perimeter && s->max_depth - depth <= s->perimeter->depth) {
+        return search_perimeter(s, depth);
+    }
+
+    if(depth == s->max_depth-1) {
+        // Last turn, just check if the children are solved. Those that
+        // aren't need at least one more turn.
+        exceeded(s, s->max_depth+1);
+        for(int i=0; i<N_TURN_TYPES; i++) {
+            if(avoid & (1ULL << i)) {
+                continue;
+            }
+            Coords_turn(child, current, i);
+            if(is_solution(s, child)) {
+                s->path[depth] = i;
+                s->length = s->max_depth;
+                if(solution_found(s)) {
+                    return true;
                 }
             }
+        }
+        return false;
+    }
 
-        } else {
+    // Only states whose children are looked up in the heuristics are worth
+    // the lookup, not the ones checked by the last turn or the perimeter.
+    if(s->transpositions &&
+            TranspositionTable_visit(s->transpositions, current, depth,
+                                     s->max_depth, avoid_state,
+                                     &s->transposition_stats)) {
+        return false;
+    }
 
-            // Push all possible turned cubes to the stack
-            for(int i=0; i<N_TURN_TYPES; i++) {
-                if(turn_avoid_table[turn] & (1L << i)) {
-                    continue;
-                }
+    // Every child is turned into first, and the entry it's looked up in
+    // first is prefetched, so the cache misses of the lookups overlap
+    // instead of each one stalling the search in turn.
+    Coords children[N_TURN_TYPES];
+    for(int i=N_TURN_TYPES-1; i>=0; i--) {
+        if(avoid & (1ULL << i)) {
+            continue;
+        }
+        Coords_turn(&children[i], current, i);
+        if(s->heuristics) {
+            Heuristics_prefetch(s->heuristics, &s->order, &children[i]);
+        }
+    }
+
+    int bound = max_unpruned_dist(s, depth+1);
+    for(int i=N_TURN_TYPES-1; i>=0; i--) {
+        if(avoid & (1ULL << i)) {
+            continue;
+        }
+        *child = children[i];
+        if(is_child_pruned(s, depth+1, bound)) {
+            continue;
+        }
+        s->path[depth] = i;
+        if(search_node(s, depth+1, turn_avoid_next[avoid_state][i])) {
+            return true;
+        }
+    }
+    return false;
+}
 
-                Cube_copy(&tmp, &current);
-                Cube_turn(&tmp, i);
+/**
+ * Looks `s->states[depth]` up in the perimeter, which reaches at least as many
+ * turns as are left to search. On success, returns true and the rest of the
+ * solution is read off the perimeter into `s->path`. A weighted search takes
+ * solutions shorter than `max_depth` too.
+ */
+static bool search_perimeter(Search* s, int depth) {
+    Coords state = s->states[depth];
+    Coords next;
+    int turn;
 
-                if(Heuristics_get_dist(&tmp) + depth > max_depth+1) {
-                    continue;
-                } else {
-                    Stack_push(stack, &tmp, i, depth+1);
-                }
+    int remaining = s->max_depth - depth;
+    int dist = Perimeter_get_dist(s->perimeter, &state, &turn);
+    if(dist < 0 || dist > remaining) {
+        exceeded(s, depth + (dist < 0 ? s->perimeter->depth+1 : dist));
+        return false;
+    }
+    if(dist < remaining && s->weight <= 1) {
+        return false;
+    }
+    s->length = depth + dist;
+    for(int d=depth; d<s->length; d++) {
+        Perimeter_get_dist(s->perimeter, &state, &turn);
+        s->path[d] = turn;
+        Coords_turn(&next, &state, turn);
+        state = next;
+    }
+    return solution_found(s);
+}
 
-            }
+/**
+ * Called with each solution `s` finds. Returns true if the search should end.
+ */
+static bool solution_found(Search* s) {
+    return s->found == NULL || s->found(s);
+}
+
+/**
+ * Called with each way phase 1 finds to get the cube into cube shape, which
+ * is solved by phase 2.
+ */
+static bool two_phase_found(Search* phase1) {
+    TwoPhase* tp = (TwoPhase*) phase1->found_data;
 
+    // If the last turn is a phase 2 turn, the cube was already in cube shape
+    // before it, and phase 2 was searched from there.
+    int last_turn = phase1->path[phase1->max_depth-1];
+    if(!(tp->phase2.excluded_turns & (1ULL << last_turn))) {
+        return false;
+    }
+    search_phase2(tp, phase1->states, phase1->path, phase1->max_depth);
+    return __atomic_load_n(&tp->stop, __ATOMIC_RELAXED);
+}
+
+/**
+ * Searches phase 2 from the cube shape reached by the `length1` turns of
+ * `path1`, for a solution exactly `tp->phase2_extra` turns longer than its
+ * lower bound, if that's shorter than any found so far. `states[i]` is the
+ * cube after `i` turns of `path1`.
+ */
+static void search_phase2(TwoPhase* tp, const Coords* states,
+                          const int* path1, int length1) {
+    Search* s = &tp->phase2;
+    const Coords* start = &states[length1];
+    int avoid_state = turn_avoid_state(path1, length1);
+    bool found;
+
+    // A lower bound on the length of phase 2, from the perimeter and the
+    // heuristics, which prune phase 2 as well as any search for solved.
+    int lower_bound = 0;
+    if(s->perimeter) {
+        lower_bound = Perimeter_get_dist(s->perimeter, start, NULL);
+        if(lower_bound < 0) {
+            lower_bound = s->perimeter->depth + 1;
+        }
+    }
+    if(tp->ctx->heuristics) {
+        uint8_t path_dists[2][HEURISTICS_MAX_TABLES];
+        const uint8_t* parent_dists = tp->root_dists;
+        int dist = 0;
+        for(int i=1; i<=length1; i++) {
+            uint8_t* dists = i == length1 ? s->dists[0] : path_dists[i%2];
+            dist = Heuristics_get_dists_coords(tp->ctx->heuristics, s->goal,
+                                               &states[i], parent_dists,
+                                               dists);
+            parent_dists = dists;
+        }
+        if(length1 == 0) {
+            memcpy(s->dists[0], tp->root_dists, sizeof(tp->root_dists));
+            dist = tp->root_dist;
         }
+        if(dist > lower_bound) {
+            lower_bound = dist;
+        }
+    }
+
+    int max_depth = lower_bound + tp->phase2_extra;
+    if(length1 + max_depth >= tp->best_length ||
+            __atomic_load_n(&tp->stop, __ATOMIC_RELAXED)) {
+        return;
+    }
+    s->states[0] = *start;
+    s->length = 0;
+    if(max_depth == 0) {
+        found = is_solution(s, start);
+    } else {
+        s->max_depth = max_depth;
+        s->next_max_depth = MAX_SEARCH_DEPTH+1;
+        found = search_node(s, 0, avoid_state);
+    }
+    if(!found) {
+        return;
+    }
+    int length2 = s->length;
 
-        pop_successful = Stack_pop(stack, &current, &turn, &depth);
-        if(!pop_successful) {
-            return solutions;
+    int solution[MAX_SEARCH_DEPTH];
+    memcpy(solution, path1, length1 * sizeof(int));
+    memcpy(solution + length1, s->path, length2 * sizeof(int));
+    tp->best_length = length1 + length2;
+    SolutionList_add(tp->solutions, solution, tp->best_length);
+    if(s->verbose) {
+        printf("Found a solution of %d turns (%d + %d) after %.3fs\n",
+               tp->best_length, length1, length2, seconds_since(&s->start));
+    }
+    bool keep_going = tp->callback == NULL ||
+                      tp->callback(solution, tp->best_length, tp->data);
+    if(!keep_going || tp->best_length <= tp->target_length) {
+        __atomic_store_n(&tp->stop, 1, __ATOMIC_RELAXED);
+    }
+}
+
+/**
+ * The state of the automaton in turn_avoid_table.h after the `length` turns
+ * of `path`.
+ */
+static int turn_avoid_state(const int* path, int length) {
+    int state = TURN_AVOID_START;
+    for(int i=0; i<length; i++) {
+        state = turn_avoid_next[state][path[i]];
+    }
+    return state;
+}
+
+/**
+ * Same as `search_node(root, 0, TURN_AVOID_START)`, but the tree is split
+ * into work units a few turns below the root, which `n_threads` threads then
+ * search. Returns as soon as any thread finds a solution.
+ */
+static bool search_parallel(Search* root, int n_threads) {
+    ParallelSearch ps;
+    Worker workers[n_threads];
+    int max_units = MIN_UNITS_PER_THREAD * n_threads;
+    int n_units;
+
+    // Split deep enough that there's plenty of units to go around, but leave
+    // the workers at least one turn to search above the last turns, which are
+    // either checked directly or looked up in the perimeter. Nodes above the
+    // split are only counted once, when the units are stored.
+    unsigned long long int nodes_before = root->nodes_visited;
+    unsigned long long int dual_pruned_before = root->dual_pruned;
+    int last_turns = root->perimeter ? root->perimeter->depth : 1;
+    int split_depth = 0;
+    while(split_depth < root->max_depth - last_turns - 1) {
+        split_depth++;
+        if(split_node(root, 0, TURN_AVOID_START, split_depth, NULL,
+                      max_units) >= max_units) {
+            break;
         }
-        path[depth-1] = turn;
+    }
+    if(split_depth == 0) {
+        return search_node(root, 0, TURN_AVOID_START);
+    }
+    n_units = split_node(root, 0, TURN_AVOID_START, split_depth, NULL, -1);
+    root->nodes_visited = nodes_before;
+    root->dual_pruned = dual_pruned_before;
+    if(n_units == 0) {
+        return search_node(root, 0, TURN_AVOID_START);
+    }
+    ps.units = (WorkUnit*) malloc(n_units * sizeof(WorkUnit));
+    split_node(root, 0, TURN_AVOID_START, split_depth, ps.units, n_units);
+
+    ps.root = root;
+    ps.n_threads = n_threads;
+    ps.queues = (WorkQueue*) malloc(n_threads * sizeof(WorkQueue));
+    ps.stop = 0;
+    ps.found = false;
+    pthread_mutex_init(&ps.solution_lock, NULL);
+    for(int i=0; i<n_threads; i++) {
+        pthread_mutex_init(&ps.queues[i].lock, NULL);
+        ps.queues[i].head = (long long) n_units * i / n_threads;
+        ps.queues[i].tail = (long long) n_units * (i+1) / n_threads;
+    }
 
+    for(int i=0; i<n_threads; i++) {
+        workers[i].ps = &ps;
+        workers[i].id = i;
+        pthread_create(&workers[i].thread, NULL, worker_main, &workers[i]);
+    }
+    for(int i=0; i<n_threads; i++) {
+        pthread_join(workers[i].thread, NULL);
+        root->nodes_visited += workers[i].search.nodes_visited;
+        root->dual_pruned += workers[i].search.dual_pruned;
+        TranspositionStats* stats = &workers[i].search.transposition_stats;
+        root->transposition_stats.hits += stats->hits;
+        root->transposition_stats.misses += stats->misses;
+        root->transposition_stats.evictions += stats->evictions;
+        exceeded(root, workers[i].search.next_max_depth);
+        if(root->verbose) {
+            printf("    Thread %d: %llu nodes visited\n", i,
+                   workers[i].search.nodes_visited);
+        }
+    }
+
+    if(ps.found) {
+        memcpy(root->path, ps.path, ps.length * sizeof(int));
+        root->length = ps.length;
+    }
+
+    for(int i=0; i<n_threads; i++) {
+        pthread_mutex_destroy(&ps.queues[i].lock);
+    }
+    pthread_mutex_destroy(&ps.solution_lock);
+    free(ps.queues);
+    free(ps.units);
+    return ps.found;
+}
+
+/**
+ * Walks the tree the same way as `search_node()` down to `split_depth`, and
+ * stores each surviving state at that depth in `units`, in the order
+ * `search_node()` would visit them. Returns the number of units. If `units`
+ * is NULL, they are only counted, and counting stops after `max_units` unless
+ * `max_units` is negative.
+ */
+static int split_node(
+    Search* s,
+    int depth,
+    int avoid_state,
+    int split_depth,
+    WorkUnit* units,
+    int max_units)
+{
+    const Coords* current = &s->states[depth];
+    Coords* child = &s->states[depth+1];
+    int n_units = 0;
+
+    // A weighted search takes solutions above the split too, which are left
+    // for the workers to find as units of their own.
+    if(depth == split_depth ||
+            (s->weight > 1 && depth > 0 && is_solution(s, current))) {
+        if(units) {
+            units[0].state = *current;
+            memcpy(units[0].dists, s->dists[depth], sizeof(units[0].dists));
+            units[0].depth = depth;
+            units[0].avoid_state = avoid_state;
+            memcpy(units[0].path, s->path, depth * sizeof(int));
+        }
+        return 1;
     }
+    s->nodes_visited++;
+
+    int bound = max_unpruned_dist(s, depth+1);
+    for(int i=N_TURN_TYPES-1; i>=0; i--) {
+        if((turn_avoid_table[avoid_state] | s->excluded_turns) & (1ULL << i)) {
+            continue;
+        }
+        Coords_turn(child, current, i);
+        if(is_child_pruned(s, depth+1, bound)) {
+            continue;
+        }
+        s->path[depth] = i;
+        n_units += split_node(s, depth+1, turn_avoid_next[avoid_state][i],
+                              split_depth,
+                              units ? units + n_units : NULL, max_units);
+        if(!units && max_units >= 0 && n_units >= max_units) {
+            break;
+        }
+    }
+    return n_units;
+}
+
+static void* worker_main(void* arg) {
+    Worker* w = (Worker*) arg;
+    ParallelSearch* ps = w->ps;
+    Search* s = &w->search;
+    WorkUnit unit;
+
+    *s = *ps->root;
+    s->nodes_visited = 0;
+    s->dual_pruned = 0;
+    memset(&s->transposition_stats, 0, sizeof(TranspositionStats));
+    s->stop = &ps->stop;
+
+    while(take_unit(ps, w->id, &unit)) {
+        s->states[unit.depth] = unit.state;
+        memcpy(s->dists[unit.depth], unit.dists, sizeof(unit.dists));
+        memcpy(s->path, unit.path, unit.depth * sizeof(int));
+
+        if(search_node(s, unit.depth, unit.avoid_state)) {
+            pthread_mutex_lock(&ps->solution_lock);
+            if(!ps->found) {
+                ps->found = true;
+                memcpy(ps->path, s->path, s->length * sizeof(int));
+                ps->length = s->length;
+            }
+            pthread_mutex_unlock(&ps->solution_lock);
+            __atomic_store_n(&ps->stop, 1, __ATOMIC_RELAXED);
+        }
+        if(__atomic_load_n(&ps->stop, __ATOMIC_RELAXED)) {
+            break;
+        }
+    }
+    return NULL;
+}
+
+/**
+ * Takes the next unit from thread `id`'s own queue, or steals one from the
+ * back of another thread's queue. Returns false when there is no work left.
+ */
+static bool take_unit(ParallelSearch* ps, int id, WorkUnit* unit_out) {
+    for(int i=0; i<ps->n_threads; i++) {
+        WorkQueue* q = &ps->queues[(id + i) % ps->n_threads];
+        bool taken = false;
+
+        pthread_mutex_lock(&q->lock);
+        if(q->head < q->tail) {
+            if(i == 0) {
+                *unit_out = ps->units[q->head++];
+            } else {
+                *unit_out = ps->units[--q->tail];
+            }
+            taken = true;
+        }
+        pthread_mutex_unlock(&q->lock);
+
+        if(taken) {
+            return true;
+        }
+    }
+    return false;
+}
+
+static double seconds_since(const struct timespec* start) {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (now.tv_sec - start->tv_sec) + (now.tv_nsec - start->tv_nsec) / 1e9;
 }
@@ -1,5 +1,10 @@
 
+#define _POSIX_C_SOURCE 200809L
+
 #include <assert.h>
+#include <stdint.h>
+#include <string.h>
+#include <pthread.h>
 
 #include <mixupcube.h>
 
@@ -22,6 +27,33 @@ static void Cube_turn_R(Cube* cube);
 static void Cube_turn_M(Cube* cube);
 static void Cube_turn_E(Cube* cube);
 static void Cube_turn_S(Cube* cube);
+static void Cube_turn_composed(Cube* cube, int turn);
+static void TurnTables_init();
+
+/**
+ * Every turn is a permutation of the cubie slots followed by a rotation of
+ * each slot's cubie. Instead of composing turns out of the basic turns below
+ * every time (one L' is 21 8-cycles), `Cube_turn()` applies this precomputed
+ * form of each turn in a single pass:
+ *
+ *     new.cubies[i].id     = old.cubies[src[i]].id
+ *     new.cubies[i].orient = orient[i][old.cubies[src[i]].orient]
+ *
+ * `orient[i]` maps an old orientation directly to the new one, so no modulo
+ * is needed. Only the `n_changed` slots listed in `changed` are touched;
+ * every other slot keeps its cubie. The tables are generated from the composed
+ * turns the first time a turn is made.
+ */
+typedef struct {
+    uint8_t n_changed;
+    uint8_t changed[25];
+    uint8_t src[25];
+    uint8_t orient[25][4];
+} TurnTable;
+
+static TurnTable turn_tables[39];
+static pthread_once_t turn_tables_once = PTHREAD_ONCE_INIT;
+static bool turn_tables_ready = false;
 
 
 static void Cube_rotate_cubie(Cube* cube, enum CubieId idx, int amount) {
@@ -160,6 +192,74 @@ static void Cube_turn_S(Cube* cube) {
 void Cube_turn(Cube* cube, int turn) {
     assert(turn >= 0 && turn < 39);
 
+    // The flag lets the check at the end of `TurnTables_init()` turn cubes
+    // without waiting on itself, and skips `pthread_once()` afterwards.
+    if(!__atomic_load_n(&turn_tables_ready, __ATOMIC_ACQUIRE)) {
+        pthread_once(&turn_tables_once, TurnTables_init);
+    }
+
+    const TurnTable* t = &turn_tables[turn];
+    Cube old = *cube;
+    for(int j=0; j<t->n_changed; j++) {
+        int i = t->changed[j];
+        Cubie c = old.cubies[t->src[i]];
+        cube->cubies[i].id = c.id;
+        cube->cubies[i].orient = t->orient[i][c.orient];
+    }
+}
+
+static void TurnTables_init() {
+    Cube labeled, composed, tabled;
+
+    for(int turn=0; turn<N_TURN_TYPES; turn++) {
+        TurnTable* t = &turn_tables[turn];
+
+        // Label every slot with its own index, then turn. The ID that ends up
+        // in each slot is where that slot's cubie came from, and the
+        // orientation is how much it was rotated along the way.
+        for(int i=0; i<25; i++) {
+            labeled.cubies[i].id = i;
+            labeled.cubies[i].orient = 0;
+        }
+        Cube_turn_composed(&labeled, turn);
+
+        t->n_changed = 0;
+        for(int i=0; i<25; i++) {
+            int modulus = i < 7 ? 3 : 4;
+            t->src[i] = labeled.cubies[i].id;
+            for(int o=0; o<4; o++) {
+                t->orient[i][o] = (o + labeled.cubies[i].orient) % modulus;
+            }
+            if(t->src[i] != i || labeled.cubies[i].orient != 0) {
+                t->changed[t->n_changed++] = i;
+            }
+        }
+    }
+    __atomic_store_n(&turn_tables_ready, true, __ATOMIC_RELEASE);
+
+    // Check the tables against the composed turns, starting from a state
+    // where every kind of cubie has a nonzero orientation.
+    Cube_copy(&composed, &solved_state);
+    Cube_turn_composed(&composed, 18);  // M
+    Cube_turn_composed(&composed, 5);   // R
+    Cube_turn_composed(&composed, 19);  // E
+    Cube_turn_composed(&composed, 2);   // F
+    Cube_turn_composed(&composed, 20);  // S
+    for(int turn=0; turn<N_TURN_TYPES; turn++) {
+        Cube_copy(&tabled, &composed);
+        Cube_turn(&tabled, turn);
+        Cube_turn_composed(&composed, turn);
+        assert(memcmp(&tabled, &composed, sizeof(Cube)) == 0);
+    }
+}
+
+/**
+ * Reference implementation of `Cube_turn()`, built out of the basic turns.
+ * Only used to generate `turn_tables`.
+ */
+static void Cube_turn_composed(Cube* cube, int turn) {
+    assert(turn >= 0 && turn < 39);
+
     if(turn < 18) {  // Face Turns
         // The moves are ordered such that 6-11 is the same 0-5, but repeated
         // twice. Same with 12-17, except repeated thrice. That makes this code
@@ -0,0 +1,261 @@
+#define _POSIX_C_SOURCE 200809L
+
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <pthread.h>
+
+#include "mixupcube.h"
+#include "coords.h"
+#include "perimeter.h"
+
+// Each state is stored as two words. The first is the permutation of the
+// edge and face slots, ranked, plus 18! times the corner orientation. The
+// second has the corner permutation in the low 13 bits, then the orientation
+// of each edge and of the U face, 2 bits each, then the entry's distance and
+// turn. The other faces' orientations don't matter to `Cube_is_solved()`, so
+// they're left out, and states that differ only in those are one entry.
+#define KEY_ORIENT_SHIFT 13
+#define KEY_N_ORIENTED 13  // Edges, then the U face
+#define KEY_DIST_SHIFT 48
+#define KEY_TURN_SHIFT 56
+#define KEY_MASK ((1ULL << KEY_DIST_SHIFT) - 1)
+#define EMPTY_ENTRY UINT64_MAX  // As the second word
+
+#define FACTORIAL_18 6402373705728000ULL
+
+// The number of states within each distance of solved, counted by generating
+// each perimeter.
+static const uint64_t perimeter_n_states[PERIMETER_MAX_DEPTH+1] = {
+    1, 40, 1105, 29840, 799820, 21305959,
+};
+
+// Loaded by the first call to `Perimeter_get_resident()`, never freed.
+static Perimeter* resident;
+static pthread_once_t resident_once = PTHREAD_ONCE_INIT;
+
+// Private Prototypes
+static uint64_t n_entries_for(int depth);
+static void generate(Perimeter* perimeter);
+static void state_key(const Coords* coords, uint64_t key[2]);
+static void key_to_state(const uint64_t key[2], Coords* coords);
+static const uint64_t* lookup(const Perimeter* perimeter,
+                              const uint64_t key[2]);
+static bool insert(Perimeter* perimeter, const uint64_t key[2], int dist,
+                   int turn);
+static void load_resident();
+
+
+/***** Public Functions *****/
+
+uint64_t Perimeter_get_size(int depth) {
+    if(depth < 0 || depth > PERIMETER_MAX_DEPTH) {
+        return 0;
+    }
+    return n_entries_for(depth) * 2 * sizeof(uint64_t);
+}
+
+Perimeter* Perimeter_new(uint64_t max_bytes) {
+    int depth = 0;
+    while(depth < PERIMETER_MAX_DEPTH &&
+            Perimeter_get_size(depth+1) <= max_bytes) {
+        depth++;
+    }
+    if(depth == 0) {
+        return NULL;
+    }
+
+    Perimeter* perimeter = (Perimeter*) malloc(sizeof(Perimeter));
+    perimeter->depth = depth;
+    perimeter->n_states = 0;
+    perimeter->n_entries = n_entries_for(depth);
+    perimeter->entries = (uint64_t*) malloc(
+        perimeter->n_entries * 2 * sizeof(uint64_t));
+    if(perimeter->entries == NULL) {
+        free(perimeter);
+        return NULL;
+    }
+    memset(perimeter->entries, 0xFF,
+           perimeter->n_entries * 2 * sizeof(uint64_t));
+    generate(perimeter);
+    return perimeter;
+}
+
+void Perimeter_free(Perimeter* perimeter) {
+    free(perimeter->entries);
+    free(perimeter);
+}
+
+const Perimeter* Perimeter_get_resident() {
+    pthread_once(&resident_once, load_resident);
+    return resident;
+}
+
+int Perimeter_get_dist(const Perimeter* perimeter, const Coords* coords,
+                       int* turn_out) {
+    uint64_t key[2];
+    state_key(coords, key);
+    const uint64_t* entry = lookup(perimeter, key);
+    if(entry[1] == EMPTY_ENTRY) {
+        return -1;
+    }
+    if(turn_out) {
+        *turn_out = (entry[1] >> KEY_TURN_SHIFT) & 0x3F;
+    }
+    return (entry[1] >> KEY_DIST_SHIFT) & 0x7;
+}
+
+
+/***** Private Functions *****/
+
+/**
+ * Entries are a power of two, at least a third more than there are states.
+ */
+static uint64_t n_entries_for(int depth) {
+    uint64_t n_entries = 1;
+    while(n_entries < perimeter_n_states[depth] / 3 * 4) {
+        n_entries *= 2;
+    }
+    return n_entries;
+}
+
+/**
+ * Breadth first search from the solved state. Each level is found by
+ * scanning the table for the states of the level before it.
+ */
+static void generate(Perimeter* perimeter) {
+    Coords solved, state, child;
+    uint64_t key[2];
+    int inverse[N_TURN_TYPES];
+
+    Coords_init();
+    Coords_from_cube(&solved, &solved_state);
+
+    // The turn that undoes each turn, found on a scrambled state, which only
+    // the real inverse brings back.
+    Coords_turn(&state, &solved, 0);
+    Coords_turn(&child, &state, 4);
+    Coords_turn(&state, &child, 18);
+    Coords_turn(&child, &state, 25);
+    Coords_turn(&state, &child, 2);
+    for(int turn=0; turn<N_TURN_TYPES; turn++) {
+        Coords_turn(&child, &state, turn);
+        for(int undo=0; undo<N_TURN_TYPES; undo++) {
+            Coords back;
+            Coords_turn(&back, &child, undo);
+            if(memcmp(&back, &state, sizeof(Coords)) == 0) {
+                inverse[turn] = undo;
+                break;
+            }
+        }
+    }
+
+    state_key(&solved, key);
+    insert(perimeter, key, 0, 0);
+    for(int dist=0; dist<perimeter->depth; dist++) {
+        for(uint64_t i=0; i<perimeter->n_entries; i++) {
+            const uint64_t* entry = &perimeter->entries[2*i];
+            if(entry[1] == EMPTY_ENTRY ||
+                    ((entry[1] >> KEY_DIST_SHIFT) & 0x7) != (uint64_t) dist) {
+                continue;
+            }
+            key_to_state(entry, &state);
+            for(int turn=0; turn<N_TURN_TYPES; turn++) {
+                Coords_turn(&child, &state, turn);
+                state_key(&child, key);
+                insert(perimeter, key, dist+1, inverse[turn]);
+            }
+        }
+    }
+}
+
+static void state_key(const Coords* coords, uint64_t key[2]) {
+    uint32_t used = 0;
+    uint64_t perm = 0;
+    for(int i=0; i<18; i++) {
+        int slot = coords->pieces[i] / 4;
+        perm = perm * (18 - i) +
+               slot - __builtin_popcount(used & ((1U << slot) - 1));
+        used |= 1U << slot;
+    }
+    key[0] = perm + FACTORIAL_18 * coords->corner_orient;
+
+    uint64_t orient = 0;
+    for(int i=KEY_N_ORIENTED-1; i>=0; i--) {
+        orient = (orient << 2) | (coords->pieces[i] % 4);
+    }
+    key[1] = coords->corner_perm | (orient << KEY_ORIENT_SHIFT);
+}
+
+/**
+ * The inverse of `state_key()`. Faces other than U get orientation 0.
+ */
+static void key_to_state(const uint64_t key[2], Coords* coords) {
+    int digits[18];
+    uint64_t perm = key[0] % FACTORIAL_18;
+    coords->corner_orient = key[0] / FACTORIAL_18;
+    for(int i=17; i>=0; i--) {
+        digits[i] = perm % (18 - i);
+        perm /= 18 - i;
+    }
+    uint32_t used = 0;
+    for(int i=0; i<18; i++) {
+        // The digit is the number of free slots before this one
+        int slot = 0;
+        for(int free_before=0; ; slot++) {
+            if(!(used & (1U << slot))) {
+                if(free_before == digits[i]) {
+                    break;
+                }
+                free_before++;
+            }
+        }
+        used |= 1U << slot;
+        coords->pieces[i] = slot * 4;
+    }
+
+    uint64_t orient = (key[1] & KEY_MASK) >> KEY_ORIENT_SHIFT;
+    for(int i=0; i<KEY_N_ORIENTED; i++) {
+        coords->pieces[i] += (orient >> (2*i)) & 0x3;
+    }
+    coords->corner_perm = key[1] & ((1 << KEY_ORIENT_SHIFT) - 1);
+}
+
+/**
+ * Returns the entry holding `key`, or the empty entry where it would go.
+ */
+static const uint64_t* lookup(const Perimeter* perimeter,
+                              const uint64_t key[2]) {
+    uint64_t h = key[0] * 0x9E3779B97F4A7C15ULL ^
+                 key[1] * 0xC2B2AE3D27D4EB4FULL;
+    h ^= h >> 29;
+    uint64_t mask = perimeter->n_entries - 1;
+    for(uint64_t i=h & mask; ; i=(i+1) & mask) {
+        const uint64_t* entry = &perimeter->entries[2*i];
+        if(entry[1] == EMPTY_ENTRY ||
+                (entry[0] == key[0] && (entry[1] & KEY_MASK) == key[1])) {
+            return entry;
+        }
+    }
+}
+
+/**
+ * Adds `key` unless it's already there. Returns true if it was added.
+ */
+static bool insert(Perimeter* perimeter, const uint64_t key[2], int dist,
+                   int turn) {
+    uint64_t* entry = (uint64_t*) lookup(perimeter, key);
+    if(entry[1] != EMPTY_ENTRY) {
+        return false;
+    }
+    entry[0] = key[0];
+    entry[1] = key[1] | ((uint64_t) dist << KEY_DIST_SHIFT) |
+               ((uint64_t) turn << KEY_TURN_SHIFT);
+    perimeter->n_states++;
+    return true;
+}
+
+static void load_resident() {
+    resident = Perimeter_new(PERIMETER_DEFAULT_MEMORY);
+}
@@ -0,0 +1,71 @@
+/**
+ * A perimeter is a hash table of every state within a few turns of solved,
+ * each stored with its exact distance and the turn that brings it one turn
+ * closer. The search stops that many turns short of the depth it's searching
+ * at and looks the state up instead: either the state is in the perimeter at
+ * exactly the remaining distance, and the rest of the solution is read off
+ * the table, or the subtree can't reach a solution and is pruned.
+ *
+ * Each extra turn of depth makes the perimeter about 27 times larger, so the
+ * depth is picked to fit in a memory budget. The perimeter is generated in
+ * memory, with a breadth first search from the solved state, when it's
+ * created.
+ *
+ * Distances are to `Cube_is_solved()`, which ignores the orientation of every
+ * face except U. A perimeter is never modified once created, so any number of
+ * threads can share one.
+ */
+
+#ifndef PERIMETER_H
+#define PERIMETER_H
+
+#include <stdint.h>
+
+#include "coords.h"
+
+// The deepest perimeter there is a size for
+#define PERIMETER_MAX_DEPTH 5
+
+// Memory budget of the perimeter `Cube_solve()` uses
+#define PERIMETER_DEFAULT_MEMORY (64 * 1024 * 1024)
+
+typedef struct {
+    int depth;
+    uint64_t n_states;
+
+    // Open addressing with linear probing. Each entry is two words, see
+    // perimeter.c.
+    uint64_t n_entries;  // A power of two
+    uint64_t* entries;
+} Perimeter;
+
+/**
+ * Returns the bytes of memory a perimeter of `depth` takes, or 0 if `depth`
+ * is out of range.
+ */
+uint64_t Perimeter_get_size(int depth);
+
+/**
+ * Generates the deepest perimeter that fits in `max_bytes` of memory. Returns
+ * NULL if not even a perimeter of depth 1 fits. Free with `Perimeter_free()`.
+ */
+Perimeter* Perimeter_new(uint64_t max_bytes);
+void Perimeter_free(Perimeter* perimeter);
+
+/**
+ * Returns a perimeter of `PERIMETER_DEFAULT_MEMORY` that is generated once,
+ * by the first call, and then stays in memory for the life of the process.
+ * This is what `Cube_solve()` uses. It's 4 turns deep, takes 32 MB, and
+ * generating it takes about half a second.
+ */
+const Perimeter* Perimeter_get_resident();
+
+/**
+ * Returns the distance of `coords` from solved, or -1 if it's further than
+ * `perimeter->depth`. Unless the state is solved, the turn that brings it one
+ * turn closer is stored in `turn_out`, if it's not NULL.
+ */
+int Perimeter_get_dist(const Perimeter* perimeter, const Coords* coords,
+                       int* turn_out);
+
+#endif
@@ -0,0 +1,129 @@
+/**
+ * A solver context holds everything one solve needs: the heuristics to prune
+ * with, the options, and the statistics of the last solve. Solves that use
+ * different contexts don't share any mutable state, so they can run in
+ * parallel threads. Contexts can share one `Heuristics` set and one
+ * `Perimeter`, which are only ever read, and which must outlive every context
+ * that uses them.
+ *
+ * `Cube_solve()` and friends in mixupcube.h are wrappers that create a
+ * context, solve and free it again.
+ */
+
+#ifndef SOLVER_H
+#define SOLVER_H
+
+#include <stdbool.h>
+
+#include "mixupcube.h"
+#include "heuristics.h"
+#include "perimeter.h"
+#include "transposition.h"
+
+typedef struct {
+    int n_threads;  // 0 or less means one thread per CPU core
+    bool verbose;   // Print the progress of each iteration
+
+    // Weighted IDA*: prune with the heuristics times this, and take the first
+    // solution found at any depth. Solutions are at most `weight` times the
+    // optimal length, rounded up to a whole turn, and found much faster. 1 (or
+    // less) finds optimal solutions.
+    double weight;
+
+    // Bytes of memory for a transposition table, which cuts off states the
+    // search has already reached in fewer turns (see transposition.h). 0 for
+    // none. The table is allocated by the first solve that uses it, and kept
+    // by the context for the next ones.
+    uint64_t transposition_memory;
+    TranspositionReplacement transposition_replacement;
+} SolverOptions;
+
+typedef struct {
+    unsigned long long int nodes_visited;
+    int depth;       // Length of the solution found
+    double seconds;  // Time spent solving
+
+    // Iterations of iterative deepening searched. Depths that can't have a
+    // solution, by the heuristics, aren't searched at all.
+    int iterations;
+
+    // Nodes pruned by looking up the inverse state, that the state's own
+    // lookups didn't prune (see `Heuristics.dual`).
+    unsigned long long int dual_pruned;
+
+    // Lookups in the transposition table, if there is one
+    TranspositionStats transpositions;
+} SolverStats;
+
+typedef struct {
+    const Heuristics* heuristics;  // May be NULL for no heuristics
+    const Perimeter* perimeter;    // May be NULL for no perimeter
+    SolverOptions options;
+    SolverStats stats;
+
+    // Private: the table of `options.transposition_memory`, once a solve has
+    // used it
+    TranspositionTable* transpositions;
+} SolverContext;
+
+/**
+ * Returns a new context with default options: one thread, verbose, a weight
+ * of 1, no perimeter and no transposition table. Free with
+ * `SolverContext_free()`, which does not free `heuristics` or `perimeter`.
+ */
+SolverContext* SolverContext_new(const Heuristics* heuristics);
+void SolverContext_free(SolverContext* ctx);
+
+/**
+ * Same as `Cube_solve()`, using the heuristics and options in `ctx`.
+ * Statistics are stored in `ctx->stats`.
+ */
+int* SolverContext_solve(SolverContext* ctx, const Cube* cube);
+
+/**
+ * Same as `Cube_solve_to_cube_shape()`, using the heuristics and options in
+ * `ctx`. Only tables that are lower bounds for the cube shape are used (see
+ * `HeuristicGoal`), and the perimeter isn't used. Statistics are stored in
+ * `ctx->stats`.
+ */
+int* SolverContext_solve_to_cube_shape(SolverContext* ctx, const Cube* cube);
+
+/**
+ * Called by `SolverContext_solve_two_phase()` with each solution it finds, of
+ * `length` turns. `data` is passed through from the solve. Returns false to
+ * stop the solve.
+ */
+typedef bool (*SolutionCallback)(const int* solution, int length, void* data);
+
+/**
+ * Finds solutions quickly, but NOT optimal ones, by solving in two phases:
+ * phase 1 gets the cube into cube shape, and phase 2 solves it from there
+ * using only the turns that keep it in cube shape. Each phase is pruned with
+ * the tables that are lower bounds for its goal, and phase 2 ends in the
+ * perimeter.
+ *
+ * Ways of getting into cube shape are tried shortest first, with phase 2 as
+ * short as its lower bound allows. The shorter ways are then tried again
+ * with phase 2 up to 2 turns longer than that, but a solution whose phase 2
+ * is any longer is never found. Each solution found is shorter than the one
+ * before. Unless `callback` is NULL, it is called with each of them as
+ * they're found. The solve stops once a solution of at most `target_length`
+ * turns is found, `max_seconds` have passed, `callback` returns false, or no
+ * shorter solution is left. A `target_length` or `max_seconds` of 0 or less
+ * means no limit.
+ *
+ * Returns every solution found, longest first, in the format of
+ * `Cube_solve()`, or NULL if there was no solution in time. Always searches
+ * on one thread. Statistics are stored in `ctx->stats`, with `depth` the
+ * length of the shortest solution. Only phase 1 uses the transposition
+ * table, since each search of phase 2 starts from a different root.
+ */
+int* SolverContext_solve_two_phase(
+    SolverContext* ctx,
+    const Cube* cube,
+    int target_length,
+    double max_seconds,
+    SolutionCallback callback,
+    void* data);
+
+#endif
@@ -0,0 +1,171 @@
+#define _POSIX_C_SOURCE 200809L
+
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+
+#include "coords.h"
+#include "transposition.h"
+
+// Each entry is one word: the top 40 bits of the state's fingerprint, then
+// the depth the state was reached at, the `max_depth` of that iteration, and
+// the automaton state, in the low bits. The low bits of the fingerprint pick
+// the bucket, so they aren't stored. A fingerprint is never stored as 0,
+// which marks an empty entry.
+#define KEY_SHIFT 24
+#define DEPTH_SHIFT 18
+#define MAX_DEPTH_SHIFT 12
+#define DEPTH_MASK 0x3F
+#define AVOID_STATE_MASK 0xFFF
+#define EMPTY_ENTRY 0
+
+// Entries per bucket. A bucket is half a cache line, so looking a state up
+// costs one cache miss.
+#define BUCKET_SIZE 4
+#define BUCKET_ALIGNMENT 64
+
+// Private Prototypes
+static uint64_t fingerprint(const Coords* coords);
+static inline uint64_t mix(uint64_t h);
+
+
+/***** Public Functions *****/
+
+TranspositionTable* TranspositionTable_new(
+    uint64_t max_bytes,
+    TranspositionReplacement replacement)
+{
+    uint64_t bucket_bytes = BUCKET_SIZE * sizeof(uint64_t);
+    if(max_bytes < bucket_bytes) {
+        return NULL;
+    }
+    uint64_t n_buckets = 1;
+    while(n_buckets * 2 * bucket_bytes <= max_bytes) {
+        n_buckets *= 2;
+    }
+
+    void* entries;
+    if(posix_memalign(&entries, BUCKET_ALIGNMENT, n_buckets * bucket_bytes)) {
+        return NULL;
+    }
+    TranspositionTable* table = (TranspositionTable*) malloc(
+        sizeof(TranspositionTable));
+    table->max_bytes = max_bytes;
+    table->n_buckets = n_buckets;
+    table->entries = (uint64_t*) entries;
+    table->replacement = replacement;
+    TranspositionTable_clear(table);
+    return table;
+}
+
+void TranspositionTable_free(TranspositionTable* table) {
+    free(table->entries);
+    free(table);
+}
+
+void TranspositionTable_clear(TranspositionTable* table) {
+    memset(table->entries, 0,
+           table->n_buckets * BUCKET_SIZE * sizeof(uint64_t));
+}
+
+bool TranspositionTable_visit(
+    TranspositionTable* table,
+    const Coords* coords,
+    int depth,
+    int max_depth,
+    int avoid_state,
+    TranspositionStats* stats)
+{
+    uint64_t hash = fingerprint(coords);
+    uint64_t* bucket = &table->entries[
+        (hash & (table->n_buckets - 1)) * BUCKET_SIZE];
+    uint64_t key = hash >> KEY_SHIFT;
+    if(key == 0) {
+        key = 1;
+    }
+    uint64_t new_entry = (key << KEY_SHIFT) |
+                         ((uint64_t) depth << DEPTH_SHIFT) |
+                         ((uint64_t) max_depth << MAX_DEPTH_SHIFT) |
+                         avoid_state;
+
+    // The entry to replace if the state isn't in the bucket: an empty one,
+    // or else the one furthest from the root
+    int victim = 0;
+    int victim_depth = -1;
+    for(int i=0; i<BUCKET_SIZE; i++) {
+        uint64_t entry = __atomic_load_n(&bucket[i], __ATOMIC_RELAXED);
+        if(entry == EMPTY_ENTRY) {
+            if(victim_depth <= TRANSPOSITION_MAX_DEPTH) {
+                victim = i;
+                victim_depth = TRANSPOSITION_MAX_DEPTH+1;
+            }
+            continue;
+        }
+        int entry_depth = (entry >> DEPTH_SHIFT) & DEPTH_MASK;
+        if(entry >> KEY_SHIFT != key) {
+            if(entry_depth > victim_depth) {
+                victim = i;
+                victim_depth = entry_depth;
+            }
+            continue;
+        }
+
+        int entry_max_depth = (entry >> MAX_DEPTH_SHIFT) & DEPTH_MASK;
+        if(entry_depth < depth ||
+                (entry_depth == depth && entry_max_depth == max_depth &&
+                 (int) (entry & AVOID_STATE_MASK) == avoid_state)) {
+            stats->hits++;
+            return true;
+        }
+        // Keep the shortest distance, and the latest iteration to have
+        // reached the state at it. Another automaton state at the same
+        // depth and iteration leaves the entry as it was.
+        if(depth < entry_depth || entry_max_depth != max_depth) {
+            __atomic_store_n(&bucket[i], new_entry, __ATOMIC_RELAXED);
+        }
+        stats->misses++;
+        return false;
+    }
+
+    stats->misses++;
+    if(victim_depth <= TRANSPOSITION_MAX_DEPTH) {
+        if(table->replacement == TRANSPOSITION_REPLACE_SHALLOWER &&
+                victim_depth < depth) {
+            return false;
+        }
+        stats->evictions++;
+    }
+    __atomic_store_n(&bucket[victim], new_entry, __ATOMIC_RELAXED);
+    return false;
+}
+
+
+/***** Private Functions *****/
+
+/**
+ * A 64-bit hash of every field of `coords`.
+ */
+static uint64_t fingerprint(const Coords* coords) {
+    uint64_t words[(sizeof(Coords) + 7) / 8];
+    memset(words, 0, sizeof(words));
+    memcpy(words, coords, sizeof(Coords));
+    uint64_t h = 0;
+    for(size_t i=0; i<sizeof(words)/sizeof(words[0]); i++) {
+        h = mix(h ^ words[i]);
+    }
+    return h;
+}
+
+/**
+ * The finalizer of MurmurHash3, which spreads every bit of `h` over all the
+ * bits of the result.
+ */
+static inline uint64_t mix(uint64_t h) {
+    h ^= h >> 33;
+    h *= 0xFF51AFD7ED558CCDULL;
+    h ^= h >> 33;
+    h *= 0xC4CEB9FE1A85EC53ULL;
+    h ^= h >> 33;
+    return h;
+}
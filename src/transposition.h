@@ -0,0 +1,97 @@
+/**
+ * A transposition table remembers the states a search has reached, and the
+ * fewest turns from the root it reached each one in. Many different paths
+ * lead to the same state, and every one of them is the root of the same
+ * subtree, so the search cuts off a state it reaches again:
+ *
+ *   * In more turns than before. A shortest solution only passes through
+ *     states at their shortest distance from the root, so nothing is lost.
+ *     This holds across iterations, since the distance is from the root.
+ *   * In as many turns, in the same iteration, and in the same state of the
+ *     automaton in turn_avoid_table.h. The subtree below is exactly the one
+ *     searched before.
+ *
+ * The table has a fixed size, set by a memory budget, and each state is one
+ * 64-bit word that holds a 40-bit fingerprint of the state (see
+ * transposition.c). States are grouped in small buckets, and when a bucket is
+ * full a `TranspositionReplacement` picks which state is forgotten.
+ * Forgetting a state only means it's searched again. Two states with the
+ * same fingerprint in the same bucket would be taken for each other, which
+ * is rare enough to ignore: about once in a trillion lookups.
+ *
+ * Entries are read and written atomically without any lock, so every thread
+ * of a parallel search shares one table. A table holds the distances of one
+ * solve, from one root, so it's cleared before each solve and can't be shared
+ * by solves running at once.
+ */
+
+#ifndef TRANSPOSITION_H
+#define TRANSPOSITION_H
+
+#include <stdint.h>
+#include <stdbool.h>
+
+#include "coords.h"
+
+// The most states of the automaton in turn_avoid_table.h, depth or
+// `max_depth` an entry can hold
+#define TRANSPOSITION_MAX_AVOID_STATES 4096
+#define TRANSPOSITION_MAX_DEPTH 63
+
+/**
+ * Which state a full bucket forgets to make room for a new one.
+ */
+typedef enum {
+    // Always store the new state, in place of the state furthest from the
+    // root. Recent states are the ones near the part of the tree being
+    // searched, where they're most likely to be reached again.
+    TRANSPOSITION_REPLACE_ALWAYS,
+    // Only store the new state if it's no further from the root than the
+    // furthest state in the bucket. States near the root head the largest
+    // subtrees, so cutting them off saves the most.
+    TRANSPOSITION_REPLACE_SHALLOWER,
+} TranspositionReplacement;
+
+typedef struct {
+    uint64_t max_bytes;  // The memory budget it was created with
+    uint64_t n_buckets;  // A power of two
+    uint64_t* entries;
+    TranspositionReplacement replacement;
+} TranspositionTable;
+
+typedef struct {
+    unsigned long long int hits;       // States cut off
+    unsigned long long int misses;     // States searched
+    unsigned long long int evictions;  // Stored states that forgot another
+} TranspositionStats;
+
+/**
+ * Returns the largest empty table that fits in `max_bytes` of memory, or NULL
+ * if not even one bucket fits. Free with `TranspositionTable_free()`.
+ */
+TranspositionTable* TranspositionTable_new(
+    uint64_t max_bytes,
+    TranspositionReplacement replacement);
+void TranspositionTable_free(TranspositionTable* table);
+
+/**
+ * Forgets every state, for a search from another root.
+ */
+void TranspositionTable_clear(TranspositionTable* table);
+
+/**
+ * Called when the search reaches `coords`, `depth` turns from the root, in
+ * the iteration searching to `max_depth`, with the automaton in
+ * turn_avoid_table.h in `avoid_state`. Returns true if the state is cut off
+ * (see above). Otherwise the state is stored and false is returned. Counts
+ * the outcome in `stats`.
+ */
+bool TranspositionTable_visit(
+    TranspositionTable* table,
+    const Coords* coords,
+    int depth,
+    int max_depth,
+    int avoid_state,
+    TranspositionStats* stats);
+
+#endif
@@ -1,38 +1,165 @@
 
 /**
- * Possible next turns, given the previous turn.
+ * Avoids sequences of turns that can never be part of a shortest solution,
+ * because another sequence no longer than it reaches the same cube.
  *
- * This is an optimization which avoids sequences of turns than are never
- * optimal, or can't reach a solution faster than another move that this table
- * does allow.
+ * This is an automaton. The search keeps its state along the path it's
+ * searching, starting from `TURN_AVOID_START`. In each state,
+ * `turn_avoid_table` has a bit for each turn (from least to most significant
+ * bit), and a 1 means the turn would complete a sequence to avoid.
+ * `turn_avoid_next` is the state after each turn that isn't avoided:
  *
- * Each integer represents the previous turn, and each bit represents the next
- * turn (from least to most significant bit). A 1 means avoid this turn, while
- * a 0 means it's ok. You can use it like this:
- *
- *    if(turn_avoid_table[previous_turn] & (1L << next_turn)) {
+ *    if(turn_avoid_table[state] & (1ULL << next_turn)) {
  *      // Avoid the turn
  *    } else {
- *      // Make the turn
+ *      next_state = turn_avoid_next[state][next_turn];
  *    }
  *
- * When there is no last move, index 39 is used, which avoids nothing.
+ * The start state avoids nothing.
  *
- * DO NOT MODIFY THIS TABLE DIRECTLY. It is generated from
- * "generate_turn_avoid_table.py". See that file for a full description of
- * which turns are avoided and why.
+ * DO NOT MODIFY THESE TABLES DIRECTLY. They are generated by
+ * "generate_turn_avoid_table.py", from every sequence of up to 3
+ * turns. See that file for a full description of which turns are avoided
+ * and why.
  *
  */
-static const unsigned long long int turn_avoid_table[40] = {
-    0x24924830c3, 0x0000002082, 0x492490c30c, 0x0000008208, 0x1249270c30, 0x0000020820,
-    0x24924830c3, 0x0000002082, 0x492490c30c, 0x0000008208, 0x1249270c30, 0x0000020820,
-    0x24924830c3, 0x0000002082, 0x492490c30c, 0x0000008208, 0x1249270c30, 0x0000020820,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x1249260820, 0x2492482082, 0x4924908208,
-    0x0000000000,
+
+#ifndef TURN_AVOID_TABLE_H
+#define TURN_AVOID_TABLE_H
+
+#include <stdint.h>
+
+#define TURN_AVOID_START 0
+#define TURN_AVOID_N_STATES 106
+
+static const unsigned long long int turn_avoid_table[TURN_AVOID_N_STATES] = {
+    0x0000000000, 0x0400003041, 0x2492483083, 0x000080c104, 0x492490c20c, 0x0000230410,
+    0x1249270830, 0x04100030c3, 0x24924830c3, 0x002080c30c, 0x492490c30c, 0x0008230c30,
+    0x1249270c30, 0x04104030c3, 0x24924830c3, 0x082080c30c, 0x492490c30c, 0x0208230c30,
+    0x1249270c30, 0x1249270c30, 0x24924830c3, 0x492490c30c, 0x1249270c30, 0x24924830c3,
+    0x492490c30c, 0x1249270c30, 0x24924830c3, 0x492490c30c, 0x1249270c30, 0x249a4830c3,
+    0x493c90c30c, 0x1249270c30, 0x24924830c3, 0x492490c30c, 0x1249270c30, 0x24924830c3,
+    0x492490c30c, 0x1249270c30, 0x24924830c3, 0x492490c30c, 0x24924830c3, 0x24924830c3,
+    0x1259270c30, 0x492490c30c, 0x492490c30c, 0x1269270c30, 0x24ba4830c3, 0x1249270c30,
+    0x1249270c30, 0x1259270c30, 0x36db6f0cf0, 0x6dbed8c3cc, 0x1269270c30, 0x24ba4830c3,
+    0x5b6db70f30, 0x6dbed833c3, 0x36db6c3cc3, 0x5b7db4cf0c, 0x1259270c30, 0x1259270c30,
+    0x1269270c30, 0x24ba4830c3, 0x1269270c30, 0x24ba4830c3, 0x1259270c30, 0x1269270c30,
+    0x24ba4830c3, 0x1259270c30, 0x1269270c30, 0x24ba4830c3, 0x1259270c30, 0x1269270c30,
+    0x24ba4830c3, 0x36dbec3cc3, 0x5b7df4cf0c, 0x0208230c10, 0x1249270c30, 0x493c90c30c,
+    0x6dbef8c3cc, 0x493c90c30c, 0x04104030c1, 0x24924830c3, 0x0208230c10, 0x1249270c30,
+    0x1279270c30, 0x24ba4830c3, 0x1279270c30, 0x24ba4830c3, 0x36db6c3cc3, 0x5b7db4cf0c,
+    0x36db6f0cf0, 0x6dbed8c3cc, 0x5b6db70f30, 0x6dbed833c3, 0x36fb6c3cc3, 0x5b7db4cf0c,
+    0x36fb6f0cf0, 0x6dbed8c3cc, 0x5b7db70f30, 0x6dbed833c3, 0x36db6c3cc3, 0x5b7db4cf0c,
+    0x36db6f0cf0, 0x6dbed8c3cc, 0x5b6db70f30, 0x6dbed833c3,
+};
+
+static const uint16_t turn_avoid_next[TURN_AVOID_N_STATES][39] = {
+    {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39},
+    {0, 40, 3, 4, 5, 6, 0, 8, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 0, 36, 37, 38, 39},
+    {0, 0, 3, 4, 5, 6, 41, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 42, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 43, 5, 6, 7, 8, 0, 10, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 21, 22, 23, 0, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 44, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 45, 46, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 47, 7, 8, 9, 10, 0, 12, 13, 14, 15, 16, 0, 0, 19, 20, 21, 0, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 48, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 49, 0, 30, 31, 32, 33, 34, 0, 36, 37, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 50, 0, 51, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 21, 22, 23, 0, 25, 26, 27, 52, 53, 0, 31, 32, 33, 34, 35, 36, 37, 38, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 54, 55, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 19, 20, 21, 0, 23, 24, 25, 26, 27, 0, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 56, 57, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 20, 21, 22, 0, 24, 25, 26, 27, 58, 0, 30, 31, 32, 33, 34, 0, 36, 37, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 59, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 21, 22, 23, 0, 25, 26, 27, 60, 61, 0, 31, 32, 33, 34, 35, 0, 37, 38, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 62, 63, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 19, 20, 21, 0, 23, 24, 25, 26, 27, 0, 29, 30, 31, 32, 33, 0, 35, 36, 37, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 64, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 65, 66, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 67, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 68, 69, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 70, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 71, 72, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 78, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {80, 81, 0, 0, 82, 83, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 84, 85, 0, 25, 26, 0, 0, 0, 0, 31, 32, 0, 86, 87, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 88, 89, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 90, 0, 91, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 92, 93, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 94, 95, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 96, 0, 97, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 98, 99, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 100, 101, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 102, 0, 103, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 104, 105, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 42, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 49, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 45, 46, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 52, 53, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 0, 0, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 0, 21, 0, 0, 24, 0, 0, 27, 0, 0, 74, 0, 0, 33, 0, 0, 36, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 0, 0, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 0, 0, 84, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 86, 0, 0, 37, 0, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 0, 0, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 0, 0, 23, 0, 0, 26, 0, 0, 73, 0, 0, 32, 0, 0, 35, 0, 0, 38, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 0, 0, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 0, 22, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 34, 0, 0, 37, 0, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 0, 0, 0, 0, 15, 16, 17, 18, 0, 0, 21, 0, 0, 77, 0, 0, 27, 0, 0, 78, 0, 0, 33, 0, 0, 79, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 7, 8, 0, 0, 0, 0, 13, 14, 0, 0, 17, 18, 0, 20, 0, 0, 85, 0, 0, 26, 0, 0, 0, 0, 0, 32, 0, 0, 87, 0, 0, 38, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 74, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 73, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 77, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 79, 37, 0, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 0, 0, 0, 0, 15, 16, 17, 18, 0, 0, 21, 0, 0, 0, 0, 0, 27, 0, 0, 78, 0, 0, 33, 0, 0, 79, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 7, 8, 0, 0, 0, 0, 13, 14, 0, 0, 17, 18, 0, 20, 0, 0, 0, 0, 0, 26, 0, 0, 0, 0, 0, 32, 0, 0, 87, 0, 0, 38, 0},
+    {1, 2, 3, 4, 0, 47, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 19, 20, 21, 0, 23, 24, 25, 26, 27, 0, 29, 30, 31, 32, 33, 0, 35, 36, 37, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 0, 0, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {80, 81, 0, 0, 82, 83, 0, 0, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 0, 0, 0, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 86, 0, 0, 37, 0, 0},
+    {1, 2, 0, 0, 5, 6, 7, 8, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 20, 0, 22, 23, 0, 25, 26, 0, 0, 0, 0, 31, 32, 0, 34, 35, 0, 37, 38, 0},
+    {0, 40, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 20, 21, 22, 0, 24, 25, 26, 27, 28, 0, 30, 31, 32, 33, 34, 0, 36, 37, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 42, 0, 30, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 3, 4, 0, 47, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 19, 20, 21, 0, 23, 24, 25, 26, 27, 0, 29, 30, 31, 32, 33, 0, 35, 36, 37, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 29, 30, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {1, 2, 3, 4, 0, 0, 7, 8, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 21, 0, 23, 24, 0, 26, 27, 0, 0, 0, 0, 32, 33, 0, 35, 36, 0, 38, 39},
+    {0, 0, 3, 4, 5, 6, 0, 0, 9, 10, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 21, 22, 0, 24, 25, 0, 27, 0, 0, 0, 31, 0, 33, 34, 0, 36, 37, 0, 39},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 0, 0, 0, 0, 15, 16, 17, 18, 0, 0, 21, 0, 0, 77, 0, 0, 27, 0, 0, 78, 0, 0, 33, 0, 0, 79, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 7, 8, 0, 0, 0, 0, 13, 14, 0, 0, 17, 18, 0, 20, 0, 0, 85, 0, 0, 26, 0, 0, 0, 0, 0, 32, 0, 0, 87, 0, 0, 38, 0},
+    {1, 2, 3, 4, 0, 0, 0, 0, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 0, 21, 0, 0, 24, 0, 0, 27, 0, 0, 74, 0, 0, 33, 0, 0, 36, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 0, 0, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 0, 0, 84, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 86, 0, 0, 37, 0, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 0, 0, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 0, 0, 23, 0, 0, 26, 0, 0, 73, 0, 0, 32, 0, 0, 35, 0, 0, 38, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 0, 0, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 0, 22, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 34, 0, 0, 37, 0, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 0, 0, 0, 0, 15, 16, 17, 18, 0, 0, 21, 0, 0, 77, 0, 0, 27, 0, 0, 0, 0, 0, 33, 0, 0, 79, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 7, 8, 0, 0, 0, 0, 13, 14, 0, 0, 17, 18, 0, 20, 0, 0, 85, 0, 0, 26, 0, 0, 0, 0, 0, 32, 0, 0, 87, 0, 0, 38, 0},
+    {1, 2, 3, 4, 0, 0, 0, 0, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 0, 21, 0, 0, 24, 0, 0, 27, 0, 0, 0, 0, 0, 33, 0, 0, 36, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 0, 0, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 0, 0, 84, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 86, 0, 0, 37, 0, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 0, 0, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 0, 0, 23, 0, 0, 26, 0, 0, 0, 0, 0, 32, 0, 0, 35, 0, 0, 38, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 0, 0, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 0, 22, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 34, 0, 0, 37, 0, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 9, 10, 0, 0, 0, 0, 15, 16, 17, 18, 0, 0, 21, 0, 0, 77, 0, 0, 27, 0, 0, 78, 0, 0, 33, 0, 0, 79, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 7, 8, 0, 0, 0, 0, 13, 14, 0, 0, 17, 18, 0, 20, 0, 0, 85, 0, 0, 26, 0, 0, 0, 0, 0, 32, 0, 0, 87, 0, 0, 38, 0},
+    {1, 2, 3, 4, 0, 0, 0, 0, 9, 10, 0, 0, 13, 14, 15, 16, 0, 0, 0, 0, 21, 0, 0, 24, 0, 0, 27, 0, 0, 74, 0, 0, 33, 0, 0, 36, 0, 0, 39},
+    {80, 81, 0, 0, 82, 83, 0, 0, 0, 0, 11, 12, 13, 14, 0, 0, 17, 18, 19, 0, 0, 84, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 86, 0, 0, 37, 0, 0},
+    {1, 2, 3, 4, 0, 0, 7, 8, 0, 0, 0, 0, 13, 14, 15, 16, 0, 0, 0, 20, 0, 0, 23, 0, 0, 26, 0, 0, 73, 0, 0, 32, 0, 0, 35, 0, 0, 38, 0},
+    {0, 0, 3, 4, 75, 76, 0, 0, 0, 0, 11, 12, 0, 0, 15, 16, 17, 18, 19, 0, 0, 22, 0, 0, 25, 0, 0, 0, 0, 0, 31, 0, 0, 34, 0, 0, 37, 0, 0},
 };
+
+#endif
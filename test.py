@@ -1,7 +1,36 @@
 
+import ctypes
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
 import unittest
 
-from mixupcube import MixupCube, CubieMismatchError, _rotate_turn
+from mixupcube import MixupCube, MixupCubeException, CubieMismatchError, \
+    _rotate_turn, Heuristics, Perimeter, SolverContext, load_heuristics, _libcube, \
+    TURN_IDS, TURN_STRINGS
+from generate_turn_avoid_table import find_avoided, build_automaton, automaton_to_string
+
+def near_solved_cubes(n, max_turns=3):
+    """
+    Yields `n` random cubes, each with a number of turns it's solved in at
+    most: a solved cube with faces other than U turned, which
+    `MixupCube.is_solved()` ignores, then up to `max_turns` random turns.
+    """
+    rand = random.Random(0)
+    for i in range(n):
+        cube = MixupCube()
+        for slot in range(20, 25):
+            cube._cube.contents.cubies[slot].orient = rand.randrange(4)
+        length = rand.randint(0, max_turns)
+        cube.turn(''.join(rand.choice(list(TURN_IDS)) for j in range(length)))
+        yield cube, length
+
+def heuristic_dist(heuristics, cube):
+    _libcube.Heuristics_get_dist.restype = ctypes.c_uint8
+    return _libcube.Heuristics_get_dist(heuristics._heuristics, cube._cube)
 
 class TestCube(unittest.TestCase):
 
@@ -55,17 +84,18 @@ class TestCube(unittest.TestCase):
         cube.turn(turns)
         self.assertNotCubeShaped(cube)
 
-    def assertSolvedDist(self, cube, dist, msg=""):
-        solution = cube.solve(_return_turn_list=True)
+    def assertSolvedDist(self, cube, dist, msg="", threads=1):
+        solution = cube.solve(threads=threads, _return_turn_list=True)
         self.assertEqual(len(solution), dist, msg+'Solved with: "{}"'.format(solution))
 
         cube.turn(''.join(solution))
         self.assertSolved(cube, "Scrambled {} - Incorrect solution {}".format(msg, solution))
 
-    def assertTurnsSolvedDist(self, turns, dist):
+    def assertTurnsSolvedDist(self, turns, dist, threads=1):
         cube = MixupCube()
         cube.turn(turns)
-        self.assertSolvedDist(cube, dist, 'Turns "{}" '.format(turns))
+        self.assertSolvedDist(cube, dist, 'Turns "{}" '.format(turns),
+                              threads=threads)
 
     #
     # Tests
@@ -119,6 +149,49 @@ class TestCube(unittest.TestCase):
         self.assertTurnsEqual("SSSB", "BS3")
         self.assertTurnsEqual("", "S'S")
 
+    def test_repeated_turns(self):
+        # Each of the 39 turns is applied from its own table, so check every
+        # one against the basic turn it's made of.
+        for face in "UDFBLR":
+            self.assertTurnsEqual(face*2, face+"2")
+            self.assertTurnsEqual(face*3, face+"'")
+            self.assertTurnsEqual(face*4, "")
+            self.assertTurnsNotEqual(face, "")
+        for slice_ in "MES":
+            for n in range(2, 7):
+                self.assertTurnsEqual(slice_*n, slice_+str(n))
+            self.assertTurnsEqual(slice_*7, slice_+"'")
+            self.assertTurnsEqual(slice_*8, "")
+            self.assertTurnsNotEqual(slice_*4, "")
+
+    def test_cube_inverse(self):
+        def cubies(cube):
+            return [(c.id, c.orient) for c in cube.contents.cubies]
+
+        def inverse_turn(turn):
+            if turn < 18:
+                return (turn + 12) % 24 if turn < 6 or turn >= 12 else turn
+            axis_turns, slice_ = divmod(turn - 18, 3)
+            return 18 + 3*(6 - axis_turns) + slice_
+
+        # The inverse of a scramble is its inverse turns in reverse order
+        scramble = [0, 4, 18, 25, 2, 37, 11, 22, 15, 33, 7]
+        cube = _libcube.Cube_new_solved()
+        undo = _libcube.Cube_new_solved()
+        inverse = _libcube.Cube_new_solved()
+        again = _libcube.Cube_new_solved()
+        for turn in scramble:
+            _libcube.Cube_turn(cube, turn)
+        for turn in reversed(scramble):
+            _libcube.Cube_turn(undo, inverse_turn(turn))
+
+        _libcube.Cube_inverse(inverse, cube)
+        self.assertEqual(cubies(inverse), cubies(undo))
+        _libcube.Cube_inverse(again, inverse)
+        self.assertEqual(cubies(again), cubies(cube))
+        for c in (cube, undo, inverse, again):
+            _libcube.Cube_free(c)
+
     def test_solved_states(self):
         rotations = (
             "",          # Rot 0 degrees
@@ -218,6 +291,475 @@ class TestCube(unittest.TestCase):
         for turns, dist in tests:
             self.assertTurnsSolvedDist(turns, dist)
 
+    def test_solve_dist_threaded(self):
+        tests = (
+            ("R ", 1),
+            ("RUR", 3),
+            ("ML'F'D'", 4),
+            ("FRBLU", 5),
+            ("UB'SRD2", 5),
+        )
+        for threads in (2, 4):
+            for turns, dist in tests:
+                self.assertTurnsSolvedDist(turns, dist, threads=threads)
+
+    def test_solve_concurrent(self):
+        # Solves in different contexts share nothing but the read-only
+        # heuristics, so they should run side by side without interfering.
+        tests = ("RUR", "ML'F'D'", "FRBLU", "UB'SRD2", "L'FSD'", "UB'ERD2")
+        heuristics = Heuristics()
+
+        expected = {}
+        for turns in tests:
+            context = SolverContext(heuristics, verbose=False)
+            cube = MixupCube()
+            cube.turn(turns)
+            cube.solve(context=context)
+            expected[turns] = context.nodes_visited
+
+        results = {}
+        def solve(turns):
+            context = SolverContext(heuristics, verbose=False)
+            cube = MixupCube()
+            cube.turn(turns)
+            solution = cube.solve(context=context, _return_turn_list=True)
+            results[turns] = (solution, context.nodes_visited)
+        threads = [threading.Thread(target=solve, args=(turns,))
+                   for turns in tests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for turns in tests:
+            solution, nodes_visited = results[turns]
+            self.assertEqual(nodes_visited, expected[turns])
+            cube = MixupCube()
+            cube.turn(turns)
+            cube.turn(''.join(solution))
+            self.assertSolved(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+
+    def test_solve_symmetries(self):
+        # Looking tables up through symmetries only adds lower bounds, so
+        # solutions are just as short, and no more nodes are visited.
+        tests = ("RUR", "ML'F'D'", "FRBLU", "UB'SRD2", "L'FSD'", "UB'ERD2")
+        with Heuristics() as plain, Heuristics(symmetries=True) as symmetric:
+            self.assertGreaterEqual(len(symmetric), len(plain))
+            for turns in tests:
+                results = []
+                for heuristics in (plain, symmetric):
+                    context = SolverContext(heuristics, verbose=False)
+                    cube = MixupCube()
+                    cube.turn(turns)
+                    solution = cube.solve(context=context, _return_turn_list=True)
+                    cube.turn(''.join(solution))
+                    self.assertSolved(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+                    results.append((len(solution), context.nodes_visited))
+                self.assertEqual(results[0][0], results[1][0])
+                self.assertLessEqual(results[1][1], results[0][1])
+
+    def test_heuristics_admissible(self):
+        # Symmetries move U, the only face whose orientation counts, onto
+        # the others, so lookups through them can't count any face's.
+        with Heuristics() as plain, Heuristics(symmetries=True) as symmetric:
+            for heuristics in (plain, symmetric):
+                for cube, length in near_solved_cubes(200):
+                    self.assertLessEqual(heuristic_dist(heuristics, cube), length)
+
+    def test_solve_perimeter(self):
+        # The perimeter gives exact distances near solved, so solutions are
+        # just as short, including ones that end inside the perimeter.
+        tests = ("U", "RUR", "ML'F'D'", "FRBLU", "UB'SRD2", "L'FSD'", "UB'ERD2")
+        with Heuristics() as heuristics, Perimeter(Perimeter.DEFAULT_MEMORY) as perimeter:
+            self.assertEqual(perimeter.depth, 4)
+            for turns in tests:
+                results = []
+                for p in (None, perimeter):
+                    for threads in (1, 2):
+                        context = SolverContext(heuristics, threads=threads, verbose=False, perimeter=p)
+                        cube = MixupCube()
+                        cube.turn(turns)
+                        solution = cube.solve(context=context, _return_turn_list=True)
+                        cube.turn(''.join(solution))
+                        self.assertSolved(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+                        results.append(len(solution))
+                self.assertEqual(len(set(results)), 1, 'Turns "{}" - Lengths {}'.format(turns, results))
+        with self.assertRaises(MixupCubeException):
+            Perimeter(100)
+
+    def test_solve_face_orientation(self):
+        # This is one turn from solved, but the pieces the tables track are
+        # only solved with the faces in another orientation. Tables count
+        # any face orientation as solved, so the search starts low enough.
+        turns = "FRLF2R'L'FRLF2R'L'R"
+        self.assertTurnsSolvedDist(turns, 1)
+        with Heuristics() as heuristics, Heuristics(symmetries=True) as symmetric:
+            for h in (heuristics, symmetric):
+                context = SolverContext(h, verbose=False)
+                cube = MixupCube()
+                cube.turn(turns)
+                self.assertEqual(cube.solve(context=context, _return_turn_list=True), ["R'"])
+
+    def test_solve_skips_iterations(self):
+        # Depths the heuristics rule out aren't searched, without making
+        # solutions any longer.
+        tests = (("FRBLU", 5), ("RUF'LDMSE", 8), ("RUF'LDMSEU", 9))
+        with Heuristics() as heuristics, Perimeter() as perimeter:
+            for p in (None, perimeter):
+                context = SolverContext(heuristics, verbose=False, perimeter=p)
+                for turns, dist in tests:
+                    cube = MixupCube()
+                    cube.turn(turns)
+                    solution = cube.solve(context=context, _return_turn_list=True)
+                    self.assertEqual(len(solution), dist, 'Turns "{}" - Solved with {}'.format(turns, solution))
+                    self.assertEqual(context.depth, dist)
+                    self.assertLess(context.iterations, dist)
+
+    def test_solve_weighted(self):
+        # Solutions are at most `weight` times the optimal length, rounded up
+        tests = (("RUR", 3), ("FRBLU", 5), ("UB'SRD2", 5), ("RUF'LDMSE", 8))
+        with Heuristics() as heuristics, Perimeter() as perimeter:
+            for weight in (1, 1.5, 3):
+                for threads in (1, 2):
+                    context = SolverContext(heuristics, threads=threads, verbose=False, perimeter=perimeter, weight=weight)
+                    for turns, dist in tests:
+                        for kwargs in ({"context": context}, {"threads": threads, "weight": weight}):
+                            cube = MixupCube()
+                            cube.turn(turns)
+                            solution = cube.solve(_return_turn_list=True, **kwargs)
+                            self.assertGreaterEqual(len(solution), dist)
+                            self.assertLessEqual(len(solution), math.ceil(weight * dist),
+                                                 'Turns "{}" - Solved with {} at weight {}'.format(turns, solution, weight))
+                            cube.turn(''.join(solution))
+                            self.assertSolved(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+
+    def test_solve_transpositions(self):
+        # States reached again in more turns are cut off without making
+        # solutions any longer, however small the table.
+        turns = "S6F2DLE'U2L'F'M'L'E3"
+        with Heuristics() as heuristics, Perimeter() as perimeter:
+            context = SolverContext(heuristics, verbose=False, perimeter=perimeter)
+            cube = MixupCube()
+            cube.turn(turns)
+            dist = len(cube.solve(context=context, _return_turn_list=True))
+            nodes_visited = context.nodes_visited
+            self.assertEqual(context.transposition_misses, 0)
+
+            for memory, replacement, threads in ((16 << 20, "always", 1), (16 << 20, "always", 2),
+                                                 (4096, "always", 1), (4096, "shallower", 1)):
+                context = SolverContext(heuristics, threads=threads, verbose=False, perimeter=perimeter,
+                                        transposition_memory=memory, transposition_replacement=replacement)
+                cube = MixupCube()
+                cube.turn(turns)
+                solution = cube.solve(context=context, _return_turn_list=True)
+                self.assertEqual(len(solution), dist, 'Solved with {} by {} bytes, {}'.format(solution, memory, replacement))
+                cube.turn(''.join(solution))
+                self.assertSolved(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+                self.assertGreater(context.transposition_hits, 0)
+                self.assertGreater(context.transposition_misses, 0)
+                if threads == 1:
+                    self.assertLessEqual(context.nodes_visited, nodes_visited)
+                if memory == 4096:
+                    self.assertGreater(context.transposition_evictions, 0)
+
+    def test_solve_two_phase(self):
+        # Solutions solve the cube, are no shorter than optimal, and each one
+        # streamed is shorter than the last.
+        tests = (("", 0), ("RU", 2), ("M3UE5FS3RM", 7), ("RUF'LDMSE", 8))
+        with Heuristics() as heuristics, Perimeter() as perimeter:
+            context = SolverContext(heuristics, verbose=False, perimeter=perimeter)
+            for turns, dist in tests:
+                for kwargs in ({"context": context}, {}):
+                    lengths = []
+                    cube = MixupCube()
+                    cube.turn(turns)
+                    solution = cube.solve_two_phase(
+                        max_seconds=None, callback=lambda s: lengths.append(len(s)), **kwargs)
+                    self.assertGreaterEqual(len(solution), dist, 'Turns "{}" - Solved with {}'.format(turns, solution))
+                    self.assertEqual(lengths[-1], len(solution))
+                    self.assertEqual(lengths, sorted(set(lengths), reverse=True))
+                    cube.turn(''.join(solution))
+                    self.assertSolved(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+
+            # Stops at the first solution short enough, or when told to
+            cube = MixupCube()
+            cube.turn("RUF'LDMSE")
+            lengths = []
+            cube.solve_two_phase(max_length=100, context=context, callback=lambda s: lengths.append(len(s)))
+            self.assertEqual(len(lengths), 1)
+            lengths = []
+            cube.solve_two_phase(context=context, callback=lambda s: lengths.append(len(s)) or False)
+            self.assertEqual(len(lengths), 1)
+
+            # These are solved optimally only with phase 2 longer than its
+            # lower bound
+            for turns in ("L2UM6LBFU'", "FB2D'E4L'UM2"):
+                cube = MixupCube()
+                cube.turn(turns)
+                solution = cube.solve_two_phase(max_length=7, context=context, _return_turn_list=True)
+                self.assertEqual(len(solution), 7, 'Turns "{}" - Solved with {}'.format(turns, solution))
+
+    def test_solve_to_cube_shape_heuristics(self):
+        # Tables for solving aren't lower bounds for the cube shape, so only
+        # the shape table may prune, and solutions are as short as without.
+        tests = (("MES", 3), ("ME'SM3", 4), ("MFE3RS5U", 6))
+        with Heuristics([]) as none, Heuristics() as heuristics:
+            for turns, dist in tests:
+                for h in (none, heuristics):
+                    context = SolverContext(h, verbose=False)
+                    cube = MixupCube()
+                    cube.turn(turns)
+                    solution = cube.solve_to_cube_shape(context=context, _return_turn_list=True)
+                    self.assertEqual(len(solution), dist, 'Turns "{}" - Solved with {}'.format(turns, solution))
+                    cube.turn(''.join(solution))
+                    self.assertCubeShaped(cube, 'Turns "{}" - Incorrect solution {}'.format(turns, solution))
+
+    def test_heuristics_lifecycle(self):
+        # Solves without a context all share one set of tables, loaded once
+        load_heuristics()
+        resident = ctypes.addressof(_libcube.Heuristics_get_resident().contents)
+        self.assertTurnsSolvedDist("FRBLU", 5)
+        self.assertEqual(
+            ctypes.addressof(_libcube.Heuristics_get_resident().contents),
+            resident)
+
+        with Heuristics(hugepages=True) as heuristics:
+            context = SolverContext(heuristics, verbose=False)
+            cube = MixupCube()
+            cube.turn("UB'SRD2")
+            self.assertEqual(len(cube.solve(context=context, _return_turn_list=True)), 5)
+        self.assertRaises(MixupCubeException, cube.solve, context=context)
+        self.assertRaises(MixupCubeException, SolverContext, heuristics)
+
+class TestHeuristicFiles(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _libcube.Heuristic_generate.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_bool]
+        _libcube.Heuristic_generate.restype = ctypes.c_bool
+
+        # Tables are read from "heuristics/" under the working directory
+        cls.old_cwd = os.getcwd()
+        cls.tmp_dir = tempfile.mkdtemp()
+        os.chdir(cls.tmp_dir)
+        os.mkdir("heuristics")
+        generated = _libcube.Heuristic_generate(b"corners", 2, 1, False)
+        os.rename("heuristics/corners.ht", "corners.ht")
+        os.chdir(cls.old_cwd)
+        assert generated
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+        os.chdir(self.tmp_dir)
+        self.filename = os.path.join("heuristics", "corners.ht")
+        shutil.copy("corners.ht", self.filename)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+
+    def modify_file(self, offset, value):
+        with open(self.filename, "r+b") as f:
+            f.seek(offset)
+            f.write(bytes([value]))
+
+    def test_valid(self):
+        for validation in ("header", "background", "full"):
+            with Heuristics(["corners"], validation=validation) as heuristics:
+                heuristics.validate()
+                self.assertEqual(len(heuristics), 1)
+
+    def test_corrupt_table(self):
+        # Past the 4096 byte header
+        self.modify_file(4096 + 1000, 0xFF)
+
+        self.assertRaises(MixupCubeException, Heuristics, ["corners"],
+                          validation="full")
+        with Heuristics(["corners"], validation="background") as heuristics:
+            heuristics.validate()
+            self.assertEqual(len(heuristics), 0)
+        with Heuristics(["corners"], validation="header") as heuristics:
+            self.assertEqual(len(heuristics), 1)
+
+    def test_stale_header(self):
+        # Hash version
+        self.modify_file(12, 2)
+        self.assertRaises(MixupCubeException, Heuristics, ["corners"],
+                          validation="header")
+
+    def test_packed_generation(self):
+        # Mod3 tables are generated packed, and must match the byte table
+        self.assertTrue(_libcube.Heuristic_generate(b"corners", 0, 1, False))
+        with open(self.filename, "rb") as f:
+            distances = f.read()[4096:]
+        with open("corners.ht", "rb") as f:
+            packed = f.read()[4096:]
+        self.assertEqual(len(packed), (len(distances) + 3) // 4)
+        for i in range(0, len(distances), 997):
+            self.assertEqual((packed[i//4] >> (i%4)*2) & 0x3, distances[i] % 3)
+
+    def test_dual(self):
+        # A table of only some of the pieces is looked up on the inverse
+        # state too, which prunes what the state's own lookup misses.
+        self.assertTrue(_libcube.Heuristic_generate(b"edges1", 1, 1, False))
+        for turns, length in (("RUF'LDB", 6), ("M3UE5FS3RM", 7)):
+            nodes = []
+            for dual in (False, True):
+                with Heuristics(["edges1"], dual=dual) as heuristics:
+                    context = SolverContext(heuristics, verbose=False)
+                    cube = MixupCube()
+                    cube.turn(turns)
+                    solution = cube.solve(context=context)
+                    self.assertEqual(len(solution), length)
+                    cube.turn(''.join(solution))
+                    self.assertTrue(cube.is_solved())
+                    self.assertEqual(context.dual_pruned > 0, dual)
+                    nodes.append(context.nodes_visited)
+            self.assertLess(nodes[1], nodes[0])
+
+        # Looking the inverse up never gives more than the turns a cube is
+        # solved in, whichever way its faces end up turned.
+        with Heuristics(["edges1"], dual=True) as heuristics:
+            for cube, length in near_solved_cubes(200):
+                self.assertLessEqual(heuristic_dist(heuristics, cube), length)
+
+        # The inverse state is looked up through the symmetries too, which
+        # can't count any face's orientation either.
+        with Heuristics(["edges1"], symmetries=True, dual=True) as heuristics:
+            for cube, length in near_solved_cubes(200):
+                self.assertLessEqual(heuristic_dist(heuristics, cube), length)
+
+        # The mod3 corners table can't be decoded on the inverse state
+        with Heuristics(["corners"], dual=True) as heuristics:
+            context = SolverContext(heuristics, verbose=False)
+            cube = MixupCube()
+            cube.turn("RUF'LDB")
+            self.assertEqual(len(cube.solve(context=context)), 6)
+            self.assertEqual(context.dual_pruned, 0)
+
+    def test_truncated(self):
+        with open(self.filename, "r+b") as f:
+            f.truncate(os.path.getsize(self.filename) - 1)
+        self.assertRaises(MixupCubeException, Heuristics, ["corners"],
+                          validation="header")
+
+
+class _CoordsStruct(ctypes.Structure):
+    _fields_ = [("corner_perm", ctypes.c_uint16),
+                ("corner_orient", ctypes.c_uint16),
+                ("pieces", ctypes.c_uint8 * 18)]
+
+HEURISTICS_MAX_TABLES = 128
+
+class _HeuristicsOrderStruct(ctypes.Structure):
+    _fields_ = [("n_tables", ctypes.c_int),
+                ("tables", ctypes.c_uint8 * HEURISTICS_MAX_TABLES),
+                ("prunes", ctypes.c_ulonglong * HEURISTICS_MAX_TABLES),
+                ("prunes_since_sort", ctypes.c_int)]
+
+class TestHeuristicLookups(unittest.TestCase):
+    """Tests table lookups against the functions they're built from."""
+
+    @classmethod
+    def setUpClass(cls):
+        _libcube.Coords_from_cube.argtypes = [ctypes.POINTER(_CoordsStruct), ctypes.c_void_p]
+        _libcube.Heuristics_get_dists_coords.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(_CoordsStruct), ctypes.c_void_p, ctypes.c_void_p]
+        _libcube.Heuristics_get_dists_coords.restype = ctypes.c_uint8
+        _libcube.HeuristicsOrder_init.argtypes = [ctypes.POINTER(_HeuristicsOrderStruct), ctypes.c_void_p, ctypes.c_int]
+        _libcube.Heuristics_get_dists_bounded.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(_HeuristicsOrderStruct), ctypes.POINTER(_CoordsStruct),
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        _libcube.Heuristics_get_dists_bounded.restype = ctypes.c_uint8
+
+    # The cubie IDs each heuristic in heuristics.c tracks
+    HEURISTIC_CUBIES = {
+        "edges1": (19, 7, 18, 12), "edges2": (21, 11, 10, 17), "edges3": (24, 15, 8, 13),
+        "edges4": (23, 14, 16, 9), "edges5": (20, 15, 14, 8), "edges6": (22, 9, 13, 16),
+        "faces1": (19, 24, 21, 23), "faces2": (19, 24, 20, 22),
+        "pieces1": (19, 20, 7, 8, 14), "pieces2": (24, 22, 17, 18, 12),
+    }
+
+    @staticmethod
+    def rank(positions, orients, n_positions, n_orients):
+        """
+        Ranks a partial permutation the way hashes used to: by lowering every
+        later position that's larger than each one.
+        """
+        positions = list(positions)
+        result, place = 0, 1
+        for i in range(len(positions)):
+            result += place * positions[i]
+            place *= n_positions - i
+            for j in range(i+1, len(positions)):
+                if positions[j] > positions[i]:
+                    positions[j] -= 1
+        for orient in orients:
+            result += place * orient
+            place *= n_orients
+        return result
+
+    def test_hashes(self):
+        # Ranking each position directly gives the same hashes as rewriting
+        # the positions did.
+        _libcube.Heuristic_get_hash.argtypes = [ctypes.c_char_p, ctypes.c_void_p]
+        _libcube.Heuristic_get_hash.restype = ctypes.c_uint64
+        rand = random.Random(0)
+        for i in range(200):
+            cube = MixupCube()
+            cube.turn(''.join(rand.choice(list(TURN_IDS)) for j in range(30)))
+            cubies = cube._cube.contents.cubies
+
+            corners = [cubies[slot] for slot in range(6)]
+            corner_perm = self.rank([c.id for c in corners], [], 7, 3)
+            corner_hash = self.rank([c.id for c in corners], [c.orient for c in corners], 7, 3)
+            coords = _CoordsStruct()
+            _libcube.Coords_from_cube(ctypes.byref(coords), cube._cube)
+            self.assertEqual(coords.corner_perm, corner_perm)
+            self.assertEqual(_libcube.Heuristic_get_hash(b"corners", cube._cube), corner_hash)
+
+            slots = {cubies[slot].id: slot for slot in range(7, 25)}
+            for name, ids in self.HEURISTIC_CUBIES.items():
+                positions = [slots[cubie_id] - 7 for cubie_id in ids]
+                orients = [cubies[slots[cubie_id]].orient for cubie_id in ids]
+                self.assertEqual(_libcube.Heuristic_get_hash(name.encode(), cube._cube),
+                                 self.rank(positions, orients, 18, 4), name)
+
+    def test_bounded_dists(self):
+        # Stopping at the first table over the bound prunes exactly the
+        # states the largest distance would, and otherwise gives the same
+        # distances, however the tables get re-sorted.
+        random.seed(0)
+        for symmetries in (False, True):
+            with Heuristics(symmetries=symmetries) as heuristics:
+                n_tables = len(heuristics)
+                order = _HeuristicsOrderStruct()
+                _libcube.HeuristicsOrder_init(ctypes.byref(order), heuristics._heuristics, 0)
+                coords = _CoordsStruct()
+                cube = MixupCube()
+                _libcube.Coords_from_cube(ctypes.byref(coords), cube._cube)
+                parent_dists = (ctypes.c_uint8 * HEURISTICS_MAX_TABLES)()
+                _libcube.Heuristics_get_dists_coords(heuristics._heuristics, 0, ctypes.byref(coords), None, parent_dists)
+                for i in range(300):
+                    cube.turn(random.choice(list(TURN_IDS)))
+                    _libcube.Coords_from_cube(ctypes.byref(coords), cube._cube)
+                    dists = (ctypes.c_uint8 * HEURISTICS_MAX_TABLES)()
+                    dist = _libcube.Heuristics_get_dists_coords(
+                        heuristics._heuristics, 0, ctypes.byref(coords), parent_dists, dists)
+                    for bound in range(dist+2):
+                        bounded_dists = (ctypes.c_uint8 * HEURISTICS_MAX_TABLES)()
+                        bounded = _libcube.Heuristics_get_dists_bounded(
+                            heuristics._heuristics, ctypes.byref(order), ctypes.byref(coords),
+                            parent_dists, bounded_dists, bound)
+                        self.assertEqual(bounded > bound, dist > bound)
+                        if bounded <= bound:
+                            self.assertEqual(bounded, dist)
+                            self.assertEqual(bounded_dists[:n_tables], dists[:n_tables])
+                    parent_dists = dists
+
+
 class TestAxisTurns(unittest.TestCase):
     """Tests internal functions `_simplify_axis_turns` and `_rotate_turn`."""
 
@@ -237,5 +779,42 @@ class TestAxisTurns(unittest.TestCase):
             self.assertEqual(_rotate_turn(axis_turn, turn), result)
 
 
+class TestTurnAvoidTable(unittest.TestCase):
+    """Tests the automaton in "src/turn_avoid_table.h"."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.avoided = set(find_avoided(3))
+        cls.avoid, cls.transitions = build_automaton(sorted(cls.avoided))
+
+    def rejects(self, turns):
+        state = 0
+        for turn in turns:
+            if self.avoid[state] & (1 << turn):
+                return True
+            state = self.transitions[state][turn]
+        return False
+
+    def test_generated(self):
+        with open(os.path.join("src", "turn_avoid_table.h")) as f:
+            header = f.read()
+        self.assertEqual(header.strip(), automaton_to_string(self.avoid, self.transitions, 3).strip())
+
+    def test_rejects_avoided(self):
+        # A sequence is rejected exactly when part of it is avoided
+        sequences = [()]
+        for length in range(1, 4):
+            sequences = [seq + (turn,) for seq in sequences for turn in range(len(TURN_IDS))]
+            for seq in sequences:
+                avoided = any(seq[i:j] in self.avoided
+                              for i in range(length) for j in range(i+1, length+1))
+                self.assertEqual(self.rejects(seq), avoided, [TURN_STRINGS[t] for t in seq])
+
+    def test_examples(self):
+        for turns, rejected in ((["U", "U"], True), (["M", "M"], True), (["D", "U"], True), (["R", "L"], True),
+                                (["U", "D"], False), (["L", "R"], False), (["U", "R", "U"], False)):
+            self.assertEqual(self.rejects([TURN_IDS[t] for t in turns]), rejected, turns)
+
+
 if __name__ == "__main__":
     unittest.main()